@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .cache_local import CacheTTL
+from apps.tokens.revogacao import token_revogado
+
+'''
+    Autenticação JWT sem a consulta do usuário a cada requisição
+
+    O JWTAuthentication do simplejwt busca o User no banco em toda requisição autenticada.
+    Aqui o usuário é montado a partir das claims do token já validado (TokenUser do simplejwt)
+    e somente a verificação de que o usuário ainda existe e está ativo vai ao banco,
+    com o resultado guardado em memória por AUTENTICACAO_CACHE_TTL segundos.
+
+    Alterações no usuário feitas neste processo (post_save/post_delete) descartam o cache na hora,
+    nos demais processos valem após o TTL.
+
+    Tokens revogados são recusados pela verificação em memória de apps/tokens/revogacao.py.
+'''
+
+# Situação dos usuários já verificados, pelo id como string (como na claim do token)
+situacao_usuarios = CacheTTL(getattr(settings, 'AUTENTICACAO_CACHE_TTL', 60))
+
+'''
+    Situação do usuário do token: (is_staff, is_superuser) se ele existe e está ativo, ou False
+    Consulta o banco somente fora do cache
+'''
+def situacao_usuario(user_id):
+    situacao = situacao_usuarios.get(str(user_id))
+    if situacao is None:
+        situacao = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id, 'is_active': True}
+        ).values_list('is_staff', 'is_superuser').first() or False
+        situacao_usuarios.set(str(user_id), situacao)
+    return situacao
+
+'''
+    Autenticação JWT que confia nas claims do token validado, sem buscar o User no banco
+    request.user é um TokenUser (id e username a partir das claims, is_staff/is_superuser da situação em cache),
+    suficiente para o IsAuthenticated e o IsAdminUser
+'''
+class JWTStatelessAuthentication(JWTStatelessUserAuthentication):
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+
+        if token_revogado(validated_token):
+            raise InvalidToken('O token foi revogado.')
+
+        return validated_token
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        situacao = situacao_usuario(user.id)
+        if not situacao:
+            raise AuthenticationFailed('O usuário está inativo ou não existe.', code='user_inactive')
+
+        user.is_staff, user.is_superuser = situacao
+        return user
+
+'''
+    Descarta a situação em cache do usuário alterado ou removido
+'''
+def _invalida_usuario(sender, instance, **kwargs):
+    situacao_usuarios.remove(str(getattr(instance, api_settings.USER_ID_FIELD)))
+
+post_save.connect(_invalida_usuario, sender=settings.AUTH_USER_MODEL, dispatch_uid='autenticacao_invalida_usuario_save')
+post_delete.connect(_invalida_usuario, sender=settings.AUTH_USER_MODEL, dispatch_uid='autenticacao_invalida_usuario_delete')
@@ -0,0 +1,32 @@
+import statistics
+import time
+from contextlib import contextmanager
+from django.db import connection
+
+'''
+    Utilitários para os comandos de benchmark (manage.py benchmark_*)
+'''
+
+'''
+    Cria um banco de testes temporário (o mesmo do "manage.py test") para que os benchmarks
+    não alterem os dados do banco configurado no .env
+'''
+@contextmanager
+def banco_de_testes():
+    nome_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+'''
+    Executa a função "repeticoes" vezes e retorna a mediana do tempo em milissegundos
+'''
+def mediana_ms(funcao, repeticoes=50):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
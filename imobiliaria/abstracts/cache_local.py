@@ -0,0 +1,38 @@
+import time
+from threading import Lock
+
+'''
+    Dict em memória (por processo) com expiração das chaves e limite de tamanho
+'''
+class CacheTTL:
+
+    def __init__(self, ttl, maximo=10000):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._valores = {}
+        self._lock = Lock()
+
+    '''
+        Retorna o valor da chave, ou "padrao" se a chave não existe ou expirou
+    '''
+    def get(self, chave, padrao=None):
+        item = self._valores.get(chave)
+        if item is None or item[1] < time.monotonic():
+            return padrao
+        return item[0]
+
+    def set(self, chave, valor):
+        with self._lock:
+            # Ao atingir o limite, descarta as chaves expiradas (ou todas, se nenhuma expirou)
+            if len(self._valores) >= self.maximo:
+                agora = time.monotonic()
+                self._valores = {chave: item for chave, item in self._valores.items() if item[1] >= agora}
+                if len(self._valores) >= self.maximo:
+                    self._valores = {}
+            self._valores[chave] = (valor, time.monotonic() + self.ttl)
+
+    def remove(self, chave):
+        self._valores.pop(chave, None)
+
+    def limpa(self):
+        self._valores = {}
@@ -0,0 +1,138 @@
+import hashlib
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+from .condicional import nao_modificada, define_validadores
+
+'''
+    Cache das respostas dos endpoints de leitura, no cache do Django (RESPOSTAS_CACHE, locmem por padrão)
+
+    A chave é a rota com os parâmetros da query string e a versão do model da view:
+        - listagem: versão do model (ex: "anuncios.plataformaanuncio"), alterada a cada objeto salvo
+        - detalhe: versão do objeto (ex: "imoveis.imovel:5"), alterada somente quando ele é salvo
+    A invalidação incrementa a versão (post_save/post_delete dos models e soft delete em massa, ver invalida_respostas),
+    então as respostas antigas apenas deixam de ser lidas e expiram sozinhas.
+    O ETag / Last-Modified da resposta (ver abstracts/condicional.py) é guardado junto, e as requisições
+    condicionais respondidas pelo cache também recebem 304.
+
+    Com mais de um processo a versão precisa estar em um cache compartilhado (Redis/Memcached),
+    com o locmem cada processo invalida somente as próprias respostas.
+'''
+
+# Acertos e falhas do cache neste processo
+contadores = Counter(hits=0, misses=0)
+
+def _cache():
+    return caches[settings.RESPOSTAS_CACHE]
+
+def _chave_versao(namespace):
+    return 'respostas:versao:%s' % namespace
+
+'''
+    Versão atual do namespace (model ou objeto)
+'''
+def versao(namespace):
+    return _cache().get_or_set(_chave_versao(namespace), 1, None)
+
+def _incrementa(namespace):
+    cache = _cache()
+    try:
+        cache.incr(_chave_versao(namespace))
+    except ValueError:
+        # Versão ainda não criada (ou descartada pelo cache): nenhuma resposta usa a versão atual
+        cache.set(_chave_versao(namespace), 1, None)
+
+'''
+    Invalida as respostas em cache que dependem do objeto: o detalhe dele e as listagens do model
+    A versão é incrementada na hora e novamente após o commit, para descartar respostas montadas
+    por outras requisições com os dados anteriores enquanto a transação não terminava
+'''
+def invalida_respostas(sender, instance, **kwargs):
+    _invalida(sender, [instance.pk])
+
+'''
+    Invalida as respostas dos objetos desativados em massa (sinal abstracts.models.desativados)
+'''
+def invalida_respostas_em_massa(sender, ids, **kwargs):
+    _invalida(sender, ids)
+
+def _invalida(model, ids):
+    namespaces = [model._meta.label_lower] + ['%s:%s' % (model._meta.label_lower, id) for id in ids]
+
+    def incrementa():
+        for namespace in namespaces:
+            _incrementa(namespace)
+
+    incrementa()
+    transaction.on_commit(incrementa)
+
+'''
+    Mixin para as ViewSets com respostas em cache nas actions "cache_actions" (list e/ou retrieve)
+    Somente para views cuja resposta depende apenas do próprio model (ver invalida_respostas)
+'''
+class CacheRespostaMixin:
+
+    cache_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.resposta_em_cache(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.resposta_em_cache(super().retrieve, request, *args, **kwargs)
+
+    def resposta_em_cache(self, action, request, *args, **kwargs):
+        if self.action not in self.cache_actions:
+            return action(request, *args, **kwargs)
+
+        model = self.get_queryset().model
+        namespace = model._meta.label_lower
+        if self.action == 'retrieve':
+            # A invalidação usa o pk do objeto ("imoveis.imovel:1"), então somente o id na forma canônica usa o cache:
+            # "/imoveis/01/" encontraria o mesmo objeto, mas em uma chave que nunca seria invalidada
+            valor = kwargs[self.lookup_url_kwarg or self.lookup_field]
+            try:
+                pk = model._meta.pk.to_python(valor)
+            except DjangoValidationError:
+                pk = None
+            if pk is None or str(pk) != valor:
+                return action(request, *args, **kwargs)
+            namespace = '%s:%s' % (namespace, pk)
+
+        rota = '%s?%s' % (request.path, '&'.join(sorted(request.GET.urlencode().split('&'))))
+        chave = 'respostas:%s:%s:%s' % (namespace, versao(namespace), hashlib.md5(rota.encode()).hexdigest())
+
+        cache = _cache()
+        em_cache = cache.get(chave)
+        if em_cache is not None:
+            contadores['hits'] += 1
+            dados, etag, last_modified = em_cache
+            if etag is None:
+                return Response(dados)
+
+            response = nao_modificada(request, etag, last_modified)
+            if response is not None:
+                return response
+            return define_validadores(Response(dados), etag, last_modified)
+
+        contadores['misses'] += 1
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200:
+            last_modified = response.get('Last-Modified')
+            em_cache = (response.data, response.get('ETag'), parse_http_date(last_modified) if last_modified else None)
+            cache.set(chave, em_cache, settings.RESPOSTAS_CACHE_TIMEOUT)
+        return response
+
+'''
+    Acertos e falhas do cache de respostas neste processo
+'''
+def estatisticas_cache():
+    total = contadores['hits'] + contadores['misses']
+    return {
+        'hits': contadores['hits'],
+        'misses': contadores['misses'],
+        'taxa_acerto': contadores['hits'] / total if total else None,
+    }
@@ -0,0 +1,71 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+'''
+    Requisições condicionais (ETag / Last-Modified) para os endpoints de leitura
+
+    A versão de uma resposta é calculada no banco, sem serializar nada: o maior data_hora_atualizacao
+    do queryset (e dos relacionamentos retornados na resposta) e o número de linhas.
+    Alterações e soft deletes atualizam o data_hora_atualizacao (auto_now) e o número de linhas ativas,
+    então mudam a versão. Com If-None-Match / If-Modified-Since iguais à versão atual a resposta é 304.
+
+    O Last-Modified (somente a data) é enviado na busca por id e nas versões das tabelas inteiras (versao_tabela,
+    que inclui os inativos). Nas listagens com a versão do queryset uma linha removida sai do queryset sem aumentar
+    a maior data, então somente o ETag, que inclui o número de linhas, identifica a versão.
+'''
+
+'''
+    Retorna (maior data_hora_atualizacao, número de linhas) do queryset, considerando também os relacionamentos
+    (caminhos do select_related, ex: 'anuncio__imovel') que fazem parte da resposta
+'''
+def versao_queryset(queryset, relacoes=()):
+    campos = ['data_hora_atualizacao'] + ['%s__data_hora_atualizacao' % relacao for relacao in relacoes]
+    agregados = {'atualizacao_%d' % i: Max(campo) for i, campo in enumerate(campos)}
+
+    dados = queryset.order_by().aggregate(total=Count('pk'), **agregados)
+    datas = [dados['atualizacao_%d' % i] for i in range(len(campos)) if dados['atualizacao_%d' % i] is not None]
+
+    return (max(datas) if datas else None), dados['total']
+
+'''
+    Versão das tabelas inteiras dos models: o maior data_hora_atualizacao, inclusive dos inativos (o soft delete também
+    atualiza a data), lido pelo índice (data_hora_atualizacao, id) de cada tabela sem percorrer as linhas.
+    Mais grosseira que a versão do queryset (qualquer alteração nas tabelas muda a versão), para as buscas
+    em que agregar todas as linhas encontradas custaria mais que a própria página.
+'''
+def versao_tabela(*models):
+    datas = [model.all_objects.aggregate(ultima=Max('data_hora_atualizacao'))['ultima'] for model in models]
+    datas = [data for data in datas if data is not None]
+    return (max(datas) if datas else None), None
+
+'''
+    Monta o ETag e o Last-Modified (timestamp) da resposta a partir da versão do queryset
+    O ETag inclui a rota com a query string (campos, filtros, página) e o formato da resposta
+'''
+def validadores(request, ultima_atualizacao, total):
+    assinatura = '%s|%s|%s|%s' % (
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', ''),
+        ultima_atualizacao.isoformat() if ultima_atualizacao else '',
+        total
+    )
+    etag = '"%s"' % hashlib.md5(assinatura.encode()).hexdigest()
+    last_modified = int(ultima_atualizacao.timestamp()) if ultima_atualizacao else None
+    return etag, last_modified
+
+'''
+    Retorna a resposta 304 se os cabeçalhos condicionais da requisição correspondem aos validadores, ou None
+'''
+def nao_modificada(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        define_validadores(response, etag, last_modified)
+    return response
+
+def define_validadores(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,67 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+'''
+    Exportação de tabelas em streaming (CSV ou NDJSON), com memória constante independente do tamanho da tabela
+'''
+
+# Quantidade de linhas buscadas por consulta
+TAMANHO_BLOCO = 2000
+
+'''
+    Percorre o queryset (de .values()) em blocos ordenados por id, buscando cada bloco com "WHERE id > <último id>".
+    O .iterator() não serve aqui porque o driver do MySQL carrega o resultado inteiro na memória do cliente,
+    enquanto a paginação por chave mantém no máximo um bloco em memória em qualquer banco.
+'''
+def itera_em_blocos(queryset, tamanho=None):
+    tamanho = tamanho or TAMANHO_BLOCO
+    ultimo_id = None
+    while True:
+        bloco = queryset.order_by('id')
+        if ultimo_id is not None:
+            bloco = bloco.filter(id__gt=ultimo_id)
+        bloco = list(bloco[:tamanho])
+
+        yield from bloco
+
+        if len(bloco) < tamanho:
+            return
+        ultimo_id = bloco[-1]['id']
+
+'''
+    Objeto com a interface de arquivo que apenas devolve o que foi escrito, para gerar o CSV linha a linha
+'''
+class _Eco:
+    def write(self, valor):
+        return valor
+
+def _linhas_csv(linhas, colunas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(colunas)
+    for linha in linhas:
+        yield writer.writerow([linha[coluna] for coluna in colunas])
+
+def _linhas_ndjson(linhas, colunas):
+    for linha in linhas:
+        yield json.dumps({coluna: linha[coluna] for coluna in colunas}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+'''
+    Monta a resposta em streaming do queryset (de .values()) no formato informado ('csv' ou 'ndjson').
+    "colunas" é um dict {nome da coluna no arquivo: campo do .values()}
+'''
+def exporta(queryset, colunas, formato, nome_arquivo):
+    campos = dict.fromkeys(['id', *colunas.values()])
+    linhas = (
+        {coluna: linha[campo] for coluna, campo in colunas.items()}
+        for linha in itera_em_blocos(queryset.values(*campos))
+    )
+
+    if formato == 'csv':
+        response = StreamingHttpResponse(_linhas_csv(linhas, list(colunas)), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(_linhas_ndjson(linhas, list(colunas)), content_type='application/x-ndjson')
+
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (nome_arquivo, formato)
+    return response
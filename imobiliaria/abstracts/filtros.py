@@ -0,0 +1,130 @@
+from functools import lru_cache
+from django.db.models import Value
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+'''
+    Filtros e ordenação das listagens por query string, restritos às combinações cobertas por índices compostos
+
+    A ViewSet declara:
+        - filtros: {campo: 'intervalo' | 'booleano'}
+            'intervalo' aceita ?campo=<valor> (igualdade), ?campo_min=<valor> (>=) e ?campo_max=<valor> (<=)
+            'booleano' aceita ?campo=true|false
+        - buscas_indexadas: nomes dos índices do model (Meta.indexes), no formato (ativo, <campos>, id)
+
+    Uma busca só é aceita quando algum desses índices começa pelos campos filtrados por igualdade (em qualquer ordem),
+    seguidos do campo filtrado por intervalo (no máximo um): assim o banco lê somente um trecho contínuo do índice.
+    A ordenação (?ordering=campo ou -campo, sempre com o id como desempate) precisa ser a que o índice já entrega:
+    a coluna logo após as igualdades, ou o id quando as igualdades cobrem o índice inteiro. Assim cada página lê
+    somente as suas linhas do índice, sem ordenar todo o resultado. Outras combinações são recusadas com 400,
+    em vez de virarem uma varredura ou uma ordenação da tabela.
+
+    Os filtros valem somente para a listagem (action "list"); a paginação por cursor usa a ordenação da busca.
+'''
+
+'''
+    Serializer que valida os parâmetros dos filtros da view, com os tipos dos campos do model
+'''
+@lru_cache(maxsize=None)
+def _serializer_filtros(model, filtros):
+    campos = {}
+    for nome, tipo in filtros:
+        campo_model = model._meta.get_field(nome)
+        classe = serializers.ModelSerializer.serializer_field_mapping[type(campo_model)]
+
+        parametros = (nome,) if tipo == 'booleano' else (nome, nome + '_min', nome + '_max')
+        for parametro in parametros:
+            campos[parametro] = classe(required=False, error_messages={'invalid': 'O valor de "%s" é inválido.' % parametro})
+
+    return type('FiltrosSerializer', (serializers.Serializer,), campos)
+
+'''
+    Campos de cada índice da busca, sem o ativo (filtrado pelo manager padrão) e sem o id (desempate)
+'''
+def _indices(model, nomes):
+    indices = []
+    for indice in model._meta.indexes:
+        if indice.name in nomes:
+            campos = [campo for campo in indice.fields if campo not in ('ativo', 'id')]
+            indices.append(tuple(campos))
+    return indices
+
+'''
+    Busca validada da requisição: (filtros do queryset, ordenação) ou None quando não há filtros nem ordenação
+'''
+def busca_da_requisicao(request, queryset, view):
+    if hasattr(request, '_busca_indexada'):
+        return request._busca_indexada
+
+    filtros = getattr(view, 'filtros', {})
+    parametros = {chave: valor for chave, valor in request.query_params.items() if chave != 'ordering'}
+
+    serializer = _serializer_filtros(queryset.model, tuple(filtros.items()))(data=parametros)
+    serializer.is_valid(raise_exception=True)
+    dados = serializer.validated_data
+
+    igualdades = {}
+    intervalos = {}
+    for nome in filtros:
+        if nome in dados:
+            # Booleanos com Value, para gerar a igualdade "campo = true" também no SQLite dos testes de EXPLAIN (ver SoftDeletionManager)
+            igualdades[nome] = Value(dados[nome]) if filtros[nome] == 'booleano' else dados[nome]
+        if nome + '_min' in dados:
+            intervalos[nome + '__gte'] = dados[nome + '_min']
+        if nome + '_max' in dados:
+            intervalos[nome + '__lte'] = dados[nome + '_max']
+
+    ordenacao = request.query_params.get('ordering')
+    if not igualdades and not intervalos and not ordenacao:
+        request._busca_indexada = None
+        return None
+
+    campos_intervalo = {filtro.rsplit('__', 1)[0] for filtro in intervalos} - set(igualdades)
+    indices = _indices(queryset.model, getattr(view, 'buscas_indexadas', ()))
+
+    # Colunas que o índice entrega em ordem depois de aplicar a busca: a coluna logo após as igualdades
+    # (o campo do intervalo, se houver) ou o id, quando as igualdades cobrem todas as colunas do índice
+    ordenacoes = [] if igualdades or intervalos else ['id']
+    compativel = not (igualdades or intervalos)
+    for campos in indices:
+        quantidade = len(igualdades)
+        if set(campos[:quantidade]) != set(igualdades):
+            continue
+        if campos_intervalo and (len(campos_intervalo) > 1 or campos[quantidade:quantidade + 1] != tuple(campos_intervalo)):
+            continue
+        compativel = True
+        coluna = campos[quantidade] if quantidade < len(campos) else 'id'
+        if coluna not in ordenacoes:
+            ordenacoes.append(coluna)
+
+    if not compativel:
+        aceitas = '; '.join(', '.join(campos) for campos in indices)
+        raise serializers.ValidationError({'filtros': ['Combinação de filtros não suportada. Combinações aceitas (igualdades seguidas de no máximo um intervalo): %s.' % aceitas]})
+
+    # Sem ?ordering= a listagem segue pelo id quando possível, senão pela coluna do índice
+    campo_ordem = ordenacao.lstrip('-') if ordenacao else ('id' if 'id' in ordenacoes else ordenacoes[0])
+    if campo_ordem not in ordenacoes:
+        raise serializers.ValidationError({'ordering': ['Ordenação não suportada para estes filtros. Ordenações aceitas: %s.' % ', '.join(ordenacoes)]})
+
+    sinal = '-' if ordenacao and ordenacao.startswith('-') else ''
+    ordem = (sinal + campo_ordem,) if campo_ordem == 'id' else (sinal + campo_ordem, sinal + 'id')
+
+    request._busca_indexada = ({**igualdades, **intervalos}, ordem)
+    return request._busca_indexada
+
+'''
+    Filtro das listagens pelas buscas indexadas da view (ver o início do arquivo)
+    Também informa a ordenação para a paginação por cursor (KeysetPagination usa o get_ordering dos filtros)
+'''
+class BuscaIndexadaFilter(BaseFilterBackend):
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) != 'list':
+            return queryset
+
+        busca = busca_da_requisicao(request, queryset, view)
+        return queryset if busca is None else queryset.filter(**busca[0])
+
+    def get_ordering(self, request, queryset, view):
+        busca = busca_da_requisicao(request, queryset, view) if getattr(view, 'action', None) == 'list' else None
+        return ('id',) if busca is None else busca[1]
@@ -0,0 +1,138 @@
+from django.db import connections, router
+from django.utils import timezone
+from rest_framework import serializers, status
+
+'''
+    Funções comuns dos endpoints de criação/atualização em massa (POST e PATCH em <recurso>/bulk/)
+
+    Cada lote é validado com um número fixo de consultas, independente do seu tamanho: os campos de cada linha
+    são validados sem acessar o banco, os ids referenciados são buscados com uma consulta IN por model e
+    as linhas válidas são gravadas com bulk_create/bulk_update em blocos de TAMANHO_LOTE.
+    As linhas são numeradas a partir de 1, na ordem da lista, e as inválidas são retornadas com os seus erros.
+'''
+
+# Quantidade de objetos por INSERT/UPDATE
+TAMANHO_LOTE = 1000
+
+'''
+    Serializer da identificação de cada linha da atualização em massa
+'''
+class IdLinhaSerializer(serializers.Serializer):
+
+    id = serializers.IntegerField(required=True, error_messages={
+        'required': 'Por favor, forneça o ID do objeto a ser atualizado.',
+        'invalid': 'O ID deve ser um número inteiro.'
+    })
+
+'''
+    Valida os campos de cada linha com o serializer (sem acessar o banco)
+    Retorna ([(linha, dados validados)], [erros])
+'''
+def valida_linhas(serializer, linhas):
+    validas = []
+    erros = []
+    for linha, dados in enumerate(linhas, start=1):
+        try:
+            validas.append((linha, serializer.run_validation(dados)))
+        except serializers.ValidationError as e:
+            erros.append({'linha': linha, 'erros': e.detail})
+    return validas, erros
+
+'''
+    Valida o id de cada linha da atualização (sem acessar o banco), recusando ids repetidos no lote
+    Retorna ([(linha, id, dados)], [erros])
+'''
+def identifica_linhas(linhas):
+    serializer = IdLinhaSerializer()
+    identificadas = []
+    erros = []
+    vistos = set()
+    for linha, dados in enumerate(linhas, start=1):
+        try:
+            id = serializer.run_validation(dados)['id']
+        except serializers.ValidationError as e:
+            erros.append({'linha': linha, 'erros': e.detail})
+            continue
+        if id in vistos:
+            erros.append({'linha': linha, 'erros': {'id': ['O objeto já foi informado em outra linha do lote.']}})
+            continue
+        vistos.add(id)
+        identificadas.append((linha, id, dados))
+    return identificadas, erros
+
+'''
+    Busca e bloqueia (até o fim da transação) os objetos ativos com os ids informados, em uma consulta
+    (em ordem de id, para evitar deadlock com outras atualizações em massa)
+'''
+def bloqueia_por_id(model, ids):
+    return {objeto.pk: objeto for objeto in model.objects.select_for_update().filter(pk__in=ids).order_by('id')}
+
+'''
+    Cria os objetos com bulk_create em blocos, preenchendo o id de cada objeto criado
+
+    Nos bancos sem RETURNING no INSERT em massa (MySQL) o bulk_create não preenche os ids: cada bloco é um único
+    INSERT com várias linhas, que no InnoDB recebe ids consecutivos (com o passo do auto_increment_increment) a partir
+    do LAST_INSERT_ID(), o id da primeira linha do último INSERT da conexão.
+'''
+def cria_em_blocos(model, objetos):
+    conexao = connections[router.db_for_write(model)]
+    if conexao.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objetos, batch_size=TAMANHO_LOTE)
+        return
+
+    for posicao in range(0, len(objetos), TAMANHO_LOTE):
+        bloco = objetos[posicao:posicao + TAMANHO_LOTE]
+        model.objects.bulk_create(bloco, batch_size=len(bloco))
+
+        primeiro, passo = _primeiro_id(conexao)
+        for indice, objeto in enumerate(bloco):
+            objeto.pk = primeiro + indice * passo
+            objeto._state.adding = False
+
+'''
+    (id da primeira linha do último INSERT da conexão, incremento entre os ids)
+'''
+def _primeiro_id(conexao):
+    with conexao.cursor() as cursor:
+        cursor.execute('SELECT LAST_INSERT_ID(), @@auto_increment_increment')
+        primeiro, passo = cursor.fetchone()
+    return int(primeiro), int(passo)
+
+'''
+    Grava com bulk_update somente as colunas alteradas de cada objeto, junto com o data_hora_atualizacao
+    (que o bulk_update não preenche sozinho). "alteracoes" é uma lista de (objeto, [campos alterados]);
+    objetos sem alteração não são gravados e os demais são agrupados pelo conjunto de campos alterados.
+'''
+def atualiza_em_blocos(model, alteracoes):
+    agora = timezone.now()
+    grupos = {}
+    for objeto, campos in alteracoes:
+        if not campos:
+            continue
+        objeto.data_hora_atualizacao = agora
+        grupos.setdefault(tuple(sorted(campos)), []).append(objeto)
+
+    for campos, objetos in grupos.items():
+        model.objects.bulk_update(objetos, list(campos) + ['data_hora_atualizacao'], batch_size=TAMANHO_LOTE)
+
+'''
+    Aplica os dados validados no objeto e retorna a lista dos campos que realmente mudaram
+'''
+def aplica_alteracoes(objeto, dados):
+    campos = []
+    for nome, valor in dados.items():
+        campo = objeto._meta.get_field(nome)
+        if getattr(objeto, campo.attname) != valor:
+            setattr(objeto, campo.attname, valor)
+            campos.append(campo.name)
+    return campos
+
+'''
+    Status da resposta: sucesso se todas as linhas foram gravadas, 207 se somente algumas e 400 se nenhuma
+'''
+def status_importacao(gravados, erros, sucesso=status.HTTP_201_CREATED):
+    if not erros:
+        return sucesso
+    if gravados:
+        return status.HTTP_207_MULTI_STATUS
+    return status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,267 @@
+import json
+import logging
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from django.conf import settings
+from django.db import connections
+
+'''
+    Instrumentação das requisições (InstrumentacaoMiddleware, o primeiro do settings.MIDDLEWARE)
+
+    Para cada requisição são medidos o número de consultas e o tempo no banco (execute_wrapper em todas as conexões),
+    o tempo de serialização (render da resposta e os trechos marcados com mede_serializacao), o tempo total e o tamanho
+    do corpo. Os valores são enviados:
+        - no cabeçalho Server-Timing (db, ser e total), somente para administradores (is_staff), ou para todos
+          com settings.INSTRUMENTACAO_SERVER_TIMING (desabilitado por padrão: expõe detalhes internos das requisições)
+        - no log "imobiliaria.instrumentacao" (nível INFO), uma linha JSON por requisição
+        - nos histogramas por rota (ex: "GET reserva-reserva_byimovel") da janela móvel dos últimos
+          INSTRUMENTACAO_JANELA segundos, lidos em GET /api/metricas/ (somente administradores)
+
+    Os histogramas ficam na memória de cada processo. Nas respostas em streaming (exportações) o corpo e as consultas
+    feitas durante o envio não são medidos.
+'''
+
+logger = logging.getLogger('imobiliaria.instrumentacao')
+
+# Limites (ms) das faixas dos histogramas de duração, a última faixa recebe as durações acima do último limite
+FAIXAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Número de intervalos em que a janela é dividida: a cada intervalo o mais antigo é descartado
+INTERVALOS = 15
+
+# Medição da requisição atual
+_medicao = ContextVar('instrumentacao_medicao', default=None)
+
+'''
+    Medição de uma requisição. Também é o execute_wrapper das conexões, contando as consultas e o tempo no banco
+'''
+class Medicao:
+
+    def __init__(self):
+        self.consultas = 0
+        self.banco = 0.0
+        self.serializacao = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.banco += time.perf_counter() - inicio
+
+'''
+    Soma o tempo do bloco na serialização da requisição atual (ex: montagem dos dados da listagem)
+'''
+@contextmanager
+def mede_serializacao():
+    medicao = _medicao.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if medicao is not None:
+            medicao.serializacao += time.perf_counter() - inicio
+
+'''
+    Histograma da duração das requisições de uma rota, com os totais das demais medidas
+'''
+class Histograma:
+
+    def __init__(self):
+        self.faixas = [0] * (len(FAIXAS_MS) + 1)
+        self.requisicoes = 0
+        self.erros = 0
+        self.duracao_ms = 0.0
+        self.maximo_ms = 0.0
+        self.consultas = 0
+        self.maximo_consultas = 0
+        self.banco_ms = 0.0
+        self.serializacao_ms = 0.0
+        self.bytes = 0
+
+    def registra(self, duracao_ms, consultas, banco_ms, serializacao_ms, tamanho, status):
+        faixa = 0
+        while faixa < len(FAIXAS_MS) and duracao_ms > FAIXAS_MS[faixa]:
+            faixa += 1
+        self.faixas[faixa] += 1
+
+        self.requisicoes += 1
+        self.erros += status >= 500
+        self.duracao_ms += duracao_ms
+        self.maximo_ms = max(self.maximo_ms, duracao_ms)
+        self.consultas += consultas
+        self.maximo_consultas = max(self.maximo_consultas, consultas)
+        self.banco_ms += banco_ms
+        self.serializacao_ms += serializacao_ms
+        self.bytes += tamanho or 0
+
+    def soma(self, outro):
+        self.faixas = [a + b for a, b in zip(self.faixas, outro.faixas)]
+        self.requisicoes += outro.requisicoes
+        self.erros += outro.erros
+        self.duracao_ms += outro.duracao_ms
+        self.maximo_ms = max(self.maximo_ms, outro.maximo_ms)
+        self.consultas += outro.consultas
+        self.maximo_consultas = max(self.maximo_consultas, outro.maximo_consultas)
+        self.banco_ms += outro.banco_ms
+        self.serializacao_ms += outro.serializacao_ms
+        self.bytes += outro.bytes
+
+    '''
+        Percentil aproximado pelo limite da faixa (limitado à maior duração registrada)
+    '''
+    def percentil(self, fracao):
+        alvo = fracao * self.requisicoes
+        acumulado = 0
+        for faixa, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if acumulado >= alvo and quantidade:
+                return min(FAIXAS_MS[faixa], self.maximo_ms) if faixa < len(FAIXAS_MS) else self.maximo_ms
+        return self.maximo_ms
+
+    def resumo(self):
+        media = lambda valor: round(valor / self.requisicoes, 2)
+        return {
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'duracao_ms': {
+                'media': media(self.duracao_ms),
+                'p50': round(self.percentil(0.5), 2),
+                'p95': round(self.percentil(0.95), 2),
+                'p99': round(self.percentil(0.99), 2),
+                'maximo': round(self.maximo_ms, 2),
+            },
+            'consultas': {'media': media(self.consultas), 'maximo': self.maximo_consultas},
+            'banco_ms': {'media': media(self.banco_ms)},
+            'serializacao_ms': {'media': media(self.serializacao_ms)},
+            'bytes': {'media': media(self.bytes)},
+            'histograma_ms': {
+                ('<=%d' % limite if posicao < len(FAIXAS_MS) else '>%d' % FAIXAS_MS[-1]): quantidade
+                for posicao, (limite, quantidade) in enumerate(zip(FAIXAS_MS + (None,), self.faixas))
+            },
+        }
+
+'''
+    Histogramas por rota na janela móvel dos últimos "janela" segundos (por processo)
+    Cada rota guarda um histograma por intervalo (janela / INTERVALOS), somados na leitura
+'''
+class MetricasRotas:
+
+    def __init__(self, janela):
+        self.janela = janela
+        self.duracao_intervalo = janela / INTERVALOS
+        self._rotas = {}
+        self._lock = Lock()
+
+    def _intervalo(self):
+        return int(time.monotonic() // self.duracao_intervalo)
+
+    def registra(self, rota, **valores):
+        intervalo = self._intervalo()
+        with self._lock:
+            fila = self._rotas.setdefault(rota, deque())
+            if not fila or fila[-1][0] != intervalo:
+                fila.append((intervalo, Histograma()))
+                while fila[0][0] <= intervalo - INTERVALOS:
+                    fila.popleft()
+            fila[-1][1].registra(**valores)
+
+    def estatisticas(self):
+        inicio = self._intervalo() - INTERVALOS
+        rotas = {}
+        with self._lock:
+            for rota, fila in list(self._rotas.items()):
+                while fila and fila[0][0] <= inicio:
+                    fila.popleft()
+                if not fila:
+                    del self._rotas[rota]
+                    continue
+                total = Histograma()
+                for _, histograma in fila:
+                    total.soma(histograma)
+                rotas[rota] = total.resumo()
+        return {'janela_segundos': self.janela, 'rotas': dict(sorted(rotas.items()))}
+
+    def limpa(self):
+        with self._lock:
+            self._rotas = {}
+
+metricas = MetricasRotas(getattr(settings, 'INSTRUMENTACAO_JANELA', 900))
+
+'''
+    Middleware que mede cada requisição (ver o início do arquivo)
+'''
+class InstrumentacaoMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as wrappers:
+                for conexao in connections.all():
+                    wrappers.enter_context(conexao.execute_wrapper(medicao))
+                response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        banco_ms = medicao.banco * 1000
+        serializacao_ms = medicao.serializacao * 1000
+        tamanho = None if response.streaming else len(response.content)
+
+        # Rota pelo nome da URL (ex: "GET imovel-list"), sem os ids do caminho, para agrupar as requisições
+        match = getattr(request, 'resolver_match', None)
+        rota = '%s %s' % (request.method, match.view_name if match is not None and match.view_name else '<sem rota>')
+
+        # O usuário autenticado pelo DRF (JWT) também é atribuído à requisição do Django
+        usuario = getattr(request, 'user', None)
+        if getattr(settings, 'INSTRUMENTACAO_SERVER_TIMING', False) or getattr(usuario, 'is_staff', False):
+            response['Server-Timing'] = 'db;dur=%.2f;desc="%d consultas", ser;dur=%.2f, total;dur=%.2f' % (
+                banco_ms, medicao.consultas, serializacao_ms, duracao_ms
+            )
+
+        metricas.registra(
+            rota,
+            duracao_ms=duracao_ms,
+            consultas=medicao.consultas,
+            banco_ms=banco_ms,
+            serializacao_ms=serializacao_ms,
+            tamanho=tamanho,
+            status=response.status_code
+        )
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'rota': rota,
+                'caminho': request.path,
+                'status': response.status_code,
+                'duracao_ms': round(duracao_ms, 2),
+                'consultas': medicao.consultas,
+                'banco_ms': round(banco_ms, 2),
+                'serializacao_ms': round(serializacao_ms, 2),
+                'bytes': tamanho,
+            }, ensure_ascii=False))
+
+        return response
+
+    '''
+        Mede o render da resposta (ex: JSON do DRF), feito pelo Django depois da view, como parte da serialização
+    '''
+    def process_template_response(self, request, response):
+        medicao = _medicao.get()
+        if medicao is not None:
+            inicio = time.perf_counter()
+
+            def renderizada(response):
+                medicao.serializacao += time.perf_counter() - inicio
+
+            response.add_post_render_callback(renderizada)
+        return response
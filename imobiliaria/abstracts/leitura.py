@@ -0,0 +1,203 @@
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+'''
+    Leitura plana (rápida) para os endpoints de listagem
+
+    Em vez de instanciar os models e passar cada objeto pelos campos do serializer (3 níveis no caso das reservas),
+    a listagem é feita com .values() e cada linha é montada a partir de um plano pré-compilado por serializer:
+    a lista de colunas do .values(), e para cada campo de saída a coluna de origem e a conversão necessária (ex: datas).
+
+    É selecionada por requisição com os parâmetros:
+        ?fields=id,data_checkin,anuncio.imovel.limite_hospedes  campos retornados (caminhos com "." para os objetos aninhados)
+        ?expand=anuncio,anuncio.plataforma                       relacionamentos retornados como objetos aninhados
+    Um relacionamento não expandido é retornado apenas com o id (ex: "anuncio": 5), sem JOIN.
+    Relacionamentos citados em "fields" (ex: anuncio.imovel.limite_hospedes) são expandidos automaticamente.
+'''
+
+# Campos do DRF cuja representação é o próprio valor retornado pelo banco, dispensando conversão
+CAMPOS_SEM_CONVERSAO = (
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+'''
+    Conversões pré-compiladas dos campos que precisam de conversão, recebendo (valor, fuso horário da requisição)
+    Datas e datas/horas no formato ISO 8601 (padrão do DRF) são convertidas diretamente, com o mesmo resultado
+    do to_representation do campo, mas sem resolver o fuso horário a cada valor.
+'''
+def _conversao(campo):
+    if isinstance(campo, CAMPOS_SEM_CONVERSAO):
+        return None
+
+    if isinstance(campo, serializers.DateTimeField) and settings.USE_TZ and getattr(campo, 'timezone', None) is None \
+            and getattr(campo, 'format', api_settings.DATETIME_FORMAT) == ISO_8601:
+        def conversao(valor, fuso):
+            valor = valor.astimezone(fuso).isoformat()
+            return valor[:-6] + 'Z' if valor.endswith('+00:00') else valor
+        return conversao
+
+    if isinstance(campo, serializers.DateField) and not isinstance(campo, serializers.DateTimeField) \
+            and getattr(campo, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+        return lambda valor, fuso: valor.isoformat()
+
+    return lambda valor, fuso: campo.to_representation(valor)
+
+'''
+    Plano de leitura de um nível (serializer) da resposta
+'''
+class PlanoLeitura:
+
+    def __init__(self, prefixo):
+        self.prefixo = prefixo
+        self.colunas = [prefixo + 'id']
+        self.campos = []
+        self.aninhados = []
+
+    '''
+        Monta a lista de dicts de saída a partir das linhas do .values()
+    '''
+    def monta_lista(self, linhas):
+        fuso = timezone.get_current_timezone()
+        return [self.monta(linha, fuso) for linha in linhas]
+
+    '''
+        Monta o dict de saída a partir de uma linha do .values()
+    '''
+    def monta(self, linha, fuso):
+
+        # Relacionamento opcional (null) sem objeto
+        if linha[self.colunas[0]] is None:
+            return None
+
+        saida = {}
+        for chave, coluna, conversao in self.campos:
+            valor = linha[coluna]
+            saida[chave] = valor if conversao is None or valor is None else conversao(valor, fuso)
+        for chave, plano in self.aninhados:
+            saida[chave] = plano.monta(linha, fuso)
+        return saida
+
+    '''
+        Todas as colunas do .values() necessárias para este nível e os aninhados
+    '''
+    def valores(self):
+        colunas = list(self.colunas)
+        for _, plano in self.aninhados:
+            colunas.extend(plano.valores())
+        return list(dict.fromkeys(colunas))
+
+    '''
+        Relacionamentos expandidos (para o select_related), ex: ['anuncio', 'anuncio__imovel']
+    '''
+    def relacoes(self):
+        relacoes = []
+        for _, plano in self.aninhados:
+            relacoes.append(plano.prefixo[:-2])
+            relacoes.extend(plano.relacoes())
+        return relacoes
+
+'''
+    Lê os parâmetros ?fields= e ?expand= da requisição.
+    Retorna (fields, expand) como frozensets de caminhos, ou (None, None) se nenhum dos dois foi informado
+'''
+def parametros_leitura(request):
+    fields = request.query_params.get('fields')
+    expand = request.query_params.get('expand')
+
+    if fields is None and expand is None:
+        return None, None
+
+    def caminhos(valor):
+        return frozenset(caminho.strip() for caminho in (valor or '').split(',') if caminho.strip())
+
+    return caminhos(fields), caminhos(expand)
+
+'''
+    Para o nível atual, separa os caminhos em: nomes deste nível e sub-caminhos por nome (ex: "anuncio.id" -> {"anuncio": {"id"}})
+'''
+def _divide_caminhos(caminhos):
+    nomes = set()
+    filhos = {}
+    for caminho in caminhos:
+        nome, _, resto = caminho.partition('.')
+        nomes.add(nome)
+        if resto:
+            filhos.setdefault(nome, set()).add(resto)
+    return nomes, filhos
+
+'''
+    Compila o plano de leitura do serializer para os parâmetros fields/expand (None = padrão do serializer)
+    Lança serializers.ValidationError para campos ou relacionamentos desconhecidos
+'''
+@lru_cache(maxsize=256)
+def compila_plano(serializer_class, fields=None, expand=None):
+    return _compila(serializer_class, fields, expand, '', '')
+
+def _compila(serializer_class, fields, expand, prefixo, caminho):
+    plano = PlanoLeitura(prefixo)
+    campos = {nome: campo for nome, campo in serializer_class().fields.items() if not campo.write_only}
+
+    for nome, campo, expansao in seleciona_campos(campos, fields, expand, caminho):
+
+        if expansao:
+            sub_fields, sub_expand = expansao
+            plano.aninhados.append((nome, _compila(type(campo), sub_fields, sub_expand, prefixo + campo.source + '__', caminho + nome + '.')))
+        elif expansao is False:
+            # Relacionamento não expandido: somente o id, lido da própria chave estrangeira (sem JOIN)
+            plano.colunas.append(prefixo + campo.source)
+            plano.campos.append((nome, prefixo + campo.source, None))
+        else:
+            plano.colunas.append(prefixo + campo.source)
+            plano.campos.append((nome, prefixo + campo.source, _conversao(campo)))
+
+    return plano
+
+'''
+    Aplica os parâmetros fields/expand (None = padrão do serializer) aos campos de um nível do serializer
+    Retorna a lista de (nome, campo, expansão) dos campos selecionados, onde a expansão é:
+        None                    campo simples
+        False                   relacionamento não expandido (somente o id)
+        (sub_fields, sub_expand) relacionamento expandido, com os parâmetros do nível seguinte
+    Lança serializers.ValidationError para campos ou relacionamentos desconhecidos
+'''
+def seleciona_campos(campos, fields, expand, caminho=''):
+
+    # Sem fields/expand: todos os campos, com os relacionamentos expandidos como no serializer
+    padrao = fields is None and expand is None
+    nomes_fields, filhos_fields = _divide_caminhos(fields or ())
+    nomes_expand, filhos_expand = _divide_caminhos(expand or ())
+
+    for nome in (nomes_fields | nomes_expand) - set(campos):
+        raise serializers.ValidationError({'fields': ["Campo desconhecido: '%s'." % (caminho + nome)]})
+
+    selecionados = []
+    for nome, campo in campos.items():
+
+        # Campo não selecionado em ?fields= nem em ?expand= (sem ?fields= todos os campos são retornados)
+        if nomes_fields and nome not in nomes_fields and nome not in nomes_expand:
+            continue
+
+        aninhado = isinstance(campo, serializers.ModelSerializer)
+
+        if not aninhado and (nome in nomes_expand or nome in filhos_fields):
+            raise serializers.ValidationError({'expand': ["O campo '%s' não pode ser expandido." % (caminho + nome)]})
+
+        if not aninhado:
+            selecionados.append((nome, campo, None))
+        elif padrao:
+            selecionados.append((nome, campo, (None, None)))
+        elif nome in nomes_expand or nome in filhos_fields:
+            sub_fields = frozenset(filhos_fields[nome]) if nome in filhos_fields else None
+            sub_expand = frozenset(filhos_expand.get(nome, ()))
+            selecionados.append((nome, campo, (sub_fields, sub_expand)))
+        else:
+            selecionados.append((nome, campo, False))
+
+    return selecionados
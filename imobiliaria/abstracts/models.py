@@ -1,14 +1,116 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.dispatch import Signal
+from django.utils import timezone
+
+'''
+    Enviado após um soft delete em massa (SoftDeletionQuerySet.delete), que não passa pelo save de cada objeto
+    e portanto não dispara o post_save. Argumentos: sender (model) e ids (lista dos ids desativados).
+'''
+desativados = Signal()
+
+'''
+    Campos gravados pelo soft delete: somente o ativo e, quando o model possui, o data_hora_atualizacao
+    (usado pela sincronização incremental e pelos ETags para enxergar a remoção)
+'''
+def _campos_soft_delete(model):
+    campos = ['ativo']
+    if any(campo.name == 'data_hora_atualizacao' for campo in model._meta.concrete_fields):
+        campos.append('data_hora_atualizacao')
+    return campos
+
+'''
+    Relacionamentos reversos com on_delete=CASCADE para models com soft delete (ex: Imovel -> Anuncio -> Reserva),
+    que são desativados junto com o objeto
+'''
+def _cascatas(model):
+    return [
+        relacao for relacao in model._meta.related_objects
+        if relacao.on_delete is models.CASCADE and issubclass(relacao.related_model, SoftDeletionModel)
+    ]
+
+'''
+    Desativa, em cascata, os objetos ativos que dependem dos ids desativados do model
+    Cada relacionamento custa um SELECT dos ids e um UPDATE, independente do número de objetos
+'''
+def _desativa_dependentes(model, ids, agora, removidos):
+    for relacao in _cascatas(model):
+        dependentes = relacao.related_model.objects.filter(**{'%s__in' % relacao.field.name: ids})
+        _desativa(dependentes, agora, removidos)
+
+def _desativa(queryset, agora, removidos):
+    model = queryset.model
+    ids = list(queryset.filter(ativo=Value(True)).values_list('pk', flat=True))
+    if not ids:
+        return
+
+    valores = {'ativo': False}
+    if 'data_hora_atualizacao' in _campos_soft_delete(model):
+        valores['data_hora_atualizacao'] = agora
+    total = model.all_objects.filter(pk__in=ids).update(**valores)
+
+    removidos[model._meta.label] = removidos.get(model._meta.label, 0) + total
+    desativados.send(sender=model, ids=ids)
+    _desativa_dependentes(model, ids, agora, removidos)
+
+'''
+    QuerySet com soft delete em massa: queryset.delete() executa um UPDATE ... SET ativo = 0 (e data_hora_atualizacao)
+    para todos os objetos, em vez de um save por objeto, e desativa os dependentes em cascata.
+    Assim como o delete do Django, retorna (total, {model: quantidade}).
+    Os UPDATEs da cascata e os receptores do sinal "desativados" rodam em uma transação: se algum falhar, nada é desativado.
+    A exclusão física continua disponível pelo all_objects, que usa o QuerySet padrão.
+'''
+class SoftDeletionQuerySet(models.QuerySet):
+
+    def delete(self):
+        removidos = {}
+        with transaction.atomic(using=self.db):
+            _desativa(self, timezone.now(), removidos)
+        return sum(removidos.values()), removidos
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+'''
+    Manager padrão dos models com Soft Delete: somente os objetos ativos
+'''
+class SoftDeletionManager(models.Manager.from_queryset(SoftDeletionQuerySet)):
+    def get_queryset(self):
+        # No MySQL o filtro ativo=True já é gerado como "ativo = 1". Somente no SQLite (usado nos testes) ele vira
+        # "WHERE ativo", que o planejador não usa como igualdade nos índices (fk, ativo, ...): com Value o filtro é
+        # sempre uma igualdade ("ativo = true"), e os testes de EXPLAIN (assertUsaIndice) escolhem o mesmo índice do MySQL
+        return super().get_queryset().filter(ativo=Value(True))
 
 '''
     Classe abstrata para usar do método de Soft Delete
+    "objects" retorna somente os objetos ativos e "all_objects" todos, inclusive os deletados
+    (o acesso pelos relacionamentos, ex: reserva.anuncio, usa o manager base e encontra também os inativos)
 '''
 class SoftDeletionModel(models.Model):
     ativo = models.BooleanField(default=True)
 
+    objects = SoftDeletionManager()
+    all_objects = models.Manager()
+
+    '''
+        Soft delete do objeto: grava somente o ativo e o data_hora_atualizacao (o post_save é disparado normalmente)
+        e desativa os dependentes em cascata com um UPDATE por relacionamento, tudo na mesma transação
+    '''
     def delete(self):
-        self.ativo = False
-        self.save()
+        removidos = {}
+        ativo = self.ativo
+        try:
+            with transaction.atomic(using=self._state.db):
+                if self.ativo:
+                    self.ativo = False
+                    self.save(update_fields=_campos_soft_delete(type(self)))
+                    removidos[self._meta.label] = 1
+                _desativa_dependentes(type(self), [self.pk], timezone.now(), removidos)
+        except Exception:
+            # A transação foi desfeita, então o objeto em memória volta a refletir o banco
+            self.ativo = ativo
+            raise
+        return sum(removidos.values()), removidos
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
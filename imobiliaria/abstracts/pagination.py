@@ -0,0 +1,128 @@
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+'''
+    Paginação por cursor (keyset) usada em todas as listagens da API.
+    A próxima página é buscada com "WHERE id > <último id>" em vez de OFFSET, então o custo
+    de cada página não depende da posição e inserções concorrentes não duplicam/pulam registros.
+
+    O tamanho padrão da página é definido em REST_FRAMEWORK['PAGE_SIZE'] e pode ser alterado
+    por requisição com ?page_size= (limitado a max_page_size)
+
+    Uma action pode paginar em outra ordem definindo view.ordenacao_paginacao (ex: ('limite_hospedes', 'id')),
+    desde que ela seja a ordem de um índice usado pela consulta. A ordenação sempre termina pelo id.
+
+    O cursor guarda a posição completa do último registro, com todas as colunas da ordenação
+    (ex: limite_hospedes e id), e a página seguinte compara a linha inteira:
+        WHERE limite_hospedes >= 4 AND (limite_hospedes > 4 OR (limite_hospedes = 4 AND id > 1234))
+    O CursorPagination do DRF guarda somente a primeira coluna e um deslocamento entre os registros com o mesmo valor
+    (limitado a 1000), o que repete páginas quando muitos registros compartilham o valor da coluna.
+'''
+class KeysetPagination(CursorPagination):
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordenacao = getattr(view, 'ordenacao_paginacao', None)
+        if ordenacao:
+            return ordenacao
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        assert self.ordering[-1].lstrip('-') == 'id', 'A ordenação da paginação precisa terminar pelo id.'
+
+        self.cursor = self.decode_cursor(request)
+        reverso = self.cursor is not None and self.cursor.reverse
+        posicao = self._valores_posicao(queryset.model, self.cursor.position) if self.cursor else None
+
+        # Na página anterior a consulta percorre a ordem inversa e a página é invertida depois
+        ordenacao = _inverte(self.ordering) if reverso else self.ordering
+        queryset = queryset.order_by(*ordenacao)
+        if posicao is not None:
+            queryset = queryset.filter(_depois_de(ordenacao, posicao))
+
+        resultados = list(queryset[:self.page_size + 1])
+        self.page = resultados[:self.page_size]
+        mais = len(resultados) > self.page_size
+
+        if reverso:
+            self.page.reverse()
+            self.has_next, self.has_previous = posicao is not None, mais
+        else:
+            self.has_next, self.has_previous = mais, posicao is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        posicao = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=posicao))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        posicao = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=posicao))
+
+    '''
+        Posição de um registro (instância ou dict da leitura por .values()): os valores de todas as colunas da ordenação
+    '''
+    def _get_position_from_instance(self, instance, ordering):
+        valores = []
+        for campo in ordering:
+            campo = campo.lstrip('-')
+            valor = instance[campo] if isinstance(instance, dict) else getattr(instance, campo)
+            valores.append(str(valor))
+        return json.dumps(valores)
+
+    '''
+        Valores da posição do cursor, convertidos pelos campos do model (404 quando o cursor é inválido)
+    '''
+    def _valores_posicao(self, model, posicao):
+        if posicao is None:
+            return None
+        try:
+            valores = json.loads(posicao)
+            if not isinstance(valores, list) or len(valores) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(self.ordering, valores)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+def _inverte(ordenacao):
+    return tuple(campo[1:] if campo.startswith('-') else '-' + campo for campo in ordenacao)
+
+'''
+    Registros depois da posição na ordenação, comparando a linha inteira (ver o início do arquivo)
+'''
+def _depois_de(ordenacao, posicao):
+    campos = [(campo.lstrip('-'), '__lt' if campo.startswith('-') else '__gt') for campo in ordenacao]
+
+    filtro = Q()
+    for indice, (campo, comparacao) in enumerate(campos):
+        iguais = {anterior: valor for (anterior, _), valor in zip(campos[:indice], posicao)}
+        filtro |= Q(**iguais, **{campo + comparacao: posicao[indice]})
+
+    # A primeira coluna também como intervalo, para que o banco leia o índice a partir da posição
+    if len(campos) > 1:
+        campo, comparacao = campos[0]
+        filtro &= Q(**{campo + comparacao + 'e': posicao[0]})
+    return filtro
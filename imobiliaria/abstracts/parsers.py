@@ -0,0 +1,26 @@
+import json
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+'''
+    Parser para corpo NDJSON (um objeto JSON por linha), usado nos endpoints de importação em massa
+'''
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return list(parse_ndjson(stream))
+
+'''
+    Lê as linhas de um arquivo (ou stream) NDJSON, ignorando linhas em branco
+'''
+def parse_ndjson(linhas):
+    for numero, linha in enumerate(linhas, start=1):
+        if isinstance(linha, bytes):
+            linha = linha.decode('utf-8')
+        if not linha.strip():
+            continue
+        try:
+            yield json.loads(linha)
+        except ValueError:
+            raise ParseError('Linha %d: JSON inválido.' % numero)
@@ -0,0 +1,241 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import raise_errors_on_nested_writes
+from .leitura import parametros_leitura, seleciona_campos
+
+'''
+    Percorre os serializers aninhados de um serializer e monta a lista de relacionamentos
+    que devem ser carregados com select_related, evitando uma consulta extra por objeto (N+1)
+
+    Ex: ReservaSerializer -> ['anuncio', 'anuncio__imovel', 'anuncio__plataforma']
+'''
+@lru_cache(maxsize=None)
+def get_select_related(serializer_class):
+    return tuple(_select_related(serializer_class, serializer_class.Meta.model, ''))
+
+def _select_related(serializer_class, model, prefixo):
+    relacoes = []
+
+    for campo in serializer_class().fields.values():
+
+        # Somente os serializers aninhados de um único objeto podem ser resolvidos com JOIN
+        if campo.write_only or not isinstance(campo, serializers.ModelSerializer):
+            continue
+
+        try:
+            relacao = model._meta.get_field(campo.source)
+        except FieldDoesNotExist:
+            continue
+
+        # Somente ForeignKey/OneToOne "para frente" podem ser carregados via select_related
+        if not (relacao.many_to_one or relacao.one_to_one) or relacao.auto_created:
+            continue
+
+        caminho = prefixo + campo.source
+        relacoes.append(caminho)
+        relacoes.extend(_select_related(type(campo), relacao.related_model, caminho + '__'))
+
+    return relacoes
+
+'''
+    Mixin para os serializers de leitura que aceitam ?fields= e ?expand= (mesmas regras de abstracts/leitura.py)
+    nas requisições GET: os campos não selecionados são removidos e os relacionamentos não expandidos
+    são retornados somente com o id, lido da chave estrangeira do objeto (sem JOIN e sem o serializer aninhado).
+
+    O serializer raiz lê os parâmetros da requisição do contexto, os aninhados recebem os do seu nível via fields/expand.
+'''
+class CamposDinamicosMixin:
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._campos_dinamicos = (fields, expand)
+
+    def get_fields(self):
+        campos = super().get_fields()
+
+        fields, expand = self._campos_dinamicos
+        request = self._context.get('request')
+        if fields is None and expand is None and request is not None and request.method in SAFE_METHODS:
+            fields, expand = parametros_leitura(request)
+
+        if fields is None and expand is None:
+            return campos
+
+        # Os campos somente de escrita não fazem parte da resposta e são mantidos como estão
+        leitura = {nome: campo for nome, campo in campos.items() if not campo.write_only}
+        selecionados = {nome: campo for nome, campo in campos.items() if campo.write_only}
+
+        for nome, campo, expansao in seleciona_campos(leitura, fields, expand):
+
+            if expansao is False:
+                campo = serializers.PrimaryKeyRelatedField(read_only=True, source=campo.source)
+            elif expansao and expansao != (None, None) and isinstance(campo, CamposDinamicosMixin):
+                sub_fields, sub_expand = expansao
+                campo = type(campo)(*campo._args, **{**campo._kwargs, 'fields': sub_fields, 'expand': sub_expand})
+
+            selecionados[nome] = campo
+
+        return selecionados
+
+'''
+    Campo de id de um relacionamento (como o PrimaryKeyRelatedField) que valida que o objeto existe e está ativo
+    (manager padrão do model) e guarda o objeto buscado no cache da requisição: o mesmo id validado novamente
+    na requisição, em outro campo ou serializer, não é buscado de novo, e a view recebe o objeto em validated_data.
+    Sem requisição no contexto (ex: validação de várias linhas com o mesmo serializer), o cache fica no serializer raiz.
+
+    "select_related" carrega junto os relacionamentos do objeto usados depois (ex: na resposta).
+    Com many=True, ou chamando carrega(ids) antes de validar várias linhas, todos os ids são buscados em uma consulta IN.
+'''
+class RelacionadoField(serializers.PrimaryKeyRelatedField):
+
+    def __init__(self, model, select_related=(), **kwargs):
+        self.model = model
+        self.select_related = tuple(select_related)
+        if not kwargs.get('read_only'):
+            kwargs['queryset'] = model.objects.all()
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return RelacionadosField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.select_related(*self.select_related) if self.select_related else queryset
+
+    def _cache(self):
+        dono = self.context.get('request') or self.root
+        cache = getattr(dono, '_relacionados', None)
+        if cache is None:
+            cache = dono._relacionados = {}
+        return cache
+
+    def _chave(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            raise TypeError
+        return (self.model._meta.label, self.model._meta.pk.to_python(data))
+
+    '''
+        Busca em uma consulta os objetos dos ids que ainda não estão no cache (ids inválidos são ignorados aqui
+        e recusados na validação de cada um)
+    '''
+    def carrega(self, ids):
+        cache = self._cache()
+        faltando = set()
+        for data in ids:
+            try:
+                chave = self._chave(data)
+            except (TypeError, ValueError, DjangoValidationError):
+                continue
+            if chave not in cache:
+                faltando.add(chave[1])
+
+        if faltando:
+            encontrados = self.get_queryset().in_bulk(faltando)
+            for pk in faltando:
+                cache[(self.model._meta.label, pk)] = encontrados.get(pk)
+
+    def to_internal_value(self, data):
+        try:
+            chave = self._chave(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        cache = self._cache()
+        if chave not in cache:
+            cache[chave] = self.get_queryset().filter(pk=chave[1]).first()
+
+        if cache[chave] is None:
+            self.fail('does_not_exist', pk_value=data)
+        return cache[chave]
+
+'''
+    Lista de ids de um RelacionadoField (many=True), resolvidos com uma única consulta
+'''
+class RelacionadosField(serializers.ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        self.child_relation.carrega(data)
+        return [self.child_relation.to_internal_value(item) for item in data]
+
+'''
+    Mixin para os serializers de PATCH: grava somente as colunas que realmente mudaram (save(update_fields=...),
+    junto com o data_hora_atualizacao) e não grava nada quando nenhum valor mudou
+'''
+class AtualizacaoParcialMixin:
+
+    def update(self, instance, validated_data):
+        raise_errors_on_nested_writes('update', self, validated_data)
+
+        alterados = []
+        for nome, valor in validated_data.items():
+            campo = instance._meta.get_field(nome)
+            novo = valor.pk if campo.is_relation and valor is not None else valor
+            if getattr(instance, campo.attname) != novo:
+                setattr(instance, nome, valor)
+                alterados.append(campo.name)
+
+        if alterados:
+            # Os campos auto_now (data_hora_atualizacao) só são gravados quando fazem parte do update_fields
+            alterados += [campo.name for campo in instance._meta.concrete_fields if getattr(campo, 'auto_now', False)]
+            instance.save(update_fields=alterados)
+        return instance
+
+'''
+    Serializer responsável por validar os parâmetros dos endpoints de exportação
+'''
+class ExportacaoSerializer(serializers.Serializer):
+
+    formato = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson', error_messages={
+        'invalid_choice': 'O formato deve ser "ndjson" ou "csv".'
+    })
+
+    inicio = serializers.DateField(required=False, error_messages={
+        'invalid': 'A data inicial deve estar no formato AAAA-MM-DD.'
+    })
+
+    fim = serializers.DateField(required=False, error_messages={
+        'invalid': 'A data final deve estar no formato AAAA-MM-DD.'
+    })
+
+    imovel = serializers.IntegerField(required=False, error_messages={
+        'invalid': 'O ID do imóvel deve ser um número inteiro.'
+    })
+
+    def validate(self, attrs):
+        if 'inicio' in attrs and 'fim' in attrs and attrs['inicio'] >= attrs['fim']:
+            raise serializers.ValidationError("A data inicial deve ser anterior à data final.")
+        return attrs
+
+'''
+    Serializer responsável por validar os parâmetros dos endpoints de sincronização incremental
+'''
+class SincronizacaoSerializer(serializers.Serializer):
+
+    since = serializers.DateTimeField(required=False, error_messages={
+        'invalid': 'A data/hora "since" deve estar no formato ISO 8601 (ex: 2023-07-01T00:00:00Z).'
+    })
+
+    cursor = serializers.CharField(required=False, error_messages={
+        'blank': 'O cursor não pode estar em branco.'
+    })
+
+    page_size = serializers.IntegerField(required=False, default=100, min_value=1, max_value=1000, error_messages={
+        'invalid': 'O tamanho da página deve ser um número inteiro.',
+        'min_value': 'O tamanho da página deve ser no mínimo 1.',
+        'max_value': 'O tamanho da página deve ser no máximo 1000.'
+    })
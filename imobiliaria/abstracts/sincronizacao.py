@@ -0,0 +1,79 @@
+import base64
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+'''
+    Sincronização incremental (endpoints "changes/")
+
+    Retorna os registros criados, alterados ou removidos (soft delete) após uma marca d'água, em ordem de
+    (data_hora_atualizacao, id), usando o índice (data_hora_atualizacao, id) de cada tabela.
+    Os removidos são retornados como "tombstones" ({"id": ..., "removido": true}) para que o cliente os apague.
+
+    O cursor de continuação codifica a posição (data_hora_atualizacao, id) do último registro retornado:
+    o cliente guarda o cursor e o envia na próxima chamada, inclusive quando não há mais registros.
+
+    Registros alterados nos últimos SINCRONIZACAO_ATRASO segundos ainda não são retornados, para que uma transação
+    mais lenta, com data_hora_atualizacao anterior ao cursor, não seja perdida ao terminar depois da leitura.
+'''
+
+def codifica_cursor(data_hora, id):
+    return base64.urlsafe_b64encode(('%s|%d' % (data_hora.isoformat(), id)).encode()).decode()
+
+def decodifica_cursor(cursor):
+    try:
+        data_hora, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        data_hora = parse_datetime(data_hora)
+        if data_hora is None:
+            raise ValueError
+        return data_hora, int(id)
+    except ValueError:
+        raise serializers.ValidationError({'cursor': ['O cursor informado é inválido.']})
+
+'''
+    Lista a próxima página de alterações do queryset (incluindo os registros inativos) a partir da marca d'água
+    "desde" (data/hora) ou do cursor de uma chamada anterior, montando cada registro com o plano de leitura
+'''
+def lista_alteracoes(queryset, plano, desde=None, cursor=None, tamanho=100):
+    posicao = decodifica_cursor(cursor) if cursor else None
+
+    if posicao is not None:
+        data_hora, id = posicao
+        queryset = queryset.filter(Q(data_hora_atualizacao__gt=data_hora) | Q(data_hora_atualizacao=data_hora, id__gt=id))
+    elif desde is not None:
+        queryset = queryset.filter(data_hora_atualizacao__gt=desde)
+
+    atraso = getattr(settings, 'SINCRONIZACAO_ATRASO', 0)
+    if atraso:
+        queryset = queryset.filter(data_hora_atualizacao__lte=timezone.now() - timedelta(seconds=atraso))
+
+    colunas = list(dict.fromkeys(plano.valores() + ['data_hora_atualizacao', 'ativo']))
+    linhas = list(queryset.order_by('data_hora_atualizacao', 'id').values(*colunas)[:tamanho + 1])
+
+    mais = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+
+    fuso = timezone.get_current_timezone()
+    resultados = []
+    for linha in linhas:
+        if linha['ativo']:
+            registro = plano.monta(linha, fuso)
+            registro['removido'] = False
+        else:
+            registro = {'id': linha['id'], 'removido': True}
+        resultados.append(registro)
+
+    if linhas:
+        cursor = codifica_cursor(linhas[-1]['data_hora_atualizacao'], linhas[-1]['id'])
+    elif posicao is None and desde is not None:
+        # Nenhuma alteração após "desde": o cursor continua da mesma marca d'água
+        cursor = codifica_cursor(desde, 0)
+
+    return {
+        'results': resultados,
+        'cursor': cursor,
+        'has_more': mais,
+    }
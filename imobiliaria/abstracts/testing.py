@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+'''
+    Asserções auxiliares para os testes das APIs
+'''
+class QueryCountAssertionsMixin:
+
+    '''
+        Verifica que o número de consultas de um endpoint de listagem não cresce junto com o resultado.
+        Faz um GET na url, cria mais registros com a função "cria_registros" e faz o GET novamente:
+        se o número de consultas mudar, a listagem possui uma consulta por objeto (N+1).
+    '''
+    def assertQueryCountConstant(self, url, cria_registros, quantidade=5):
+
+        # Requisição inicial para preencher os caches em memória (ex: situação do usuário na autenticação)
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as antes:
+            response_antes = self.client.get(url)
+        self.assertEqual(response_antes.status_code, 200)
+
+        cria_registros(quantidade)
+
+        with CaptureQueriesContext(connection) as depois:
+            response_depois = self.client.get(url)
+        self.assertEqual(response_depois.status_code, 200)
+
+        # Garante que a segunda requisição realmente retornou mais objetos
+        self.assertGreater(len(response_depois.data['results']), len(response_antes.data['results']))
+
+        self.assertEqual(
+            len(antes), len(depois),
+            "O número de consultas de '%s' cresceu de %d para %d com o número de resultados:\n%s" % (
+                url, len(antes), len(depois), '\n'.join(query['sql'] for query in depois.captured_queries)
+            )
+        )
+
+    '''
+        Verifica pelo plano de execução (EXPLAIN) que a consulta do queryset usa o índice informado
+    '''
+    def assertUsaIndice(self, queryset, indice):
+        plano = queryset.explain()
+        self.assertIn(indice, plano, "A consulta não usa o índice '%s':\n%s\n%s" % (indice, queryset.query, plano))
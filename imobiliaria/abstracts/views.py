@@ -0,0 +1,188 @@
+from django.core.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .autenticacao import JWTStatelessAuthentication
+from .cache_respostas import estatisticas_cache
+from .instrumentacao import metricas, mede_serializacao
+from rest_framework.decorators import action
+from .serializers import get_select_related, SincronizacaoSerializer
+from .sincronizacao import lista_alteracoes
+from .leitura import compila_plano, parametros_leitura
+from .condicional import versao_queryset, validadores, nao_modificada, define_validadores
+
+'''
+    Mixin para as ViewSets que aplica automaticamente o select_related derivado
+    dos serializers aninhados usados na resposta
+    Com ?fields= ou ?expand= somente os relacionamentos expandidos são carregados (ver abstracts/leitura.py)
+'''
+class EagerLoadingMixin:
+
+    '''
+        Aplica o plano de carregamento do serializer (por padrão o serializer da action atual) no queryset
+    '''
+    def eager_load(self, queryset, serializer_class=None):
+        relacoes = self.relacoes_carregadas(serializer_class)
+        if relacoes:
+            queryset = queryset.select_related(*relacoes)
+        return queryset
+
+    '''
+        Relacionamentos retornados na resposta do serializer, que são carregados com select_related
+    '''
+    def relacoes_carregadas(self, serializer_class=None):
+        if serializer_class is None:
+            serializer_class = self.get_serializer_class()
+
+        relacoes = get_select_related(serializer_class)
+
+        request = getattr(self, 'request', None)
+        if request is not None and request.method in SAFE_METHODS:
+            fields, expand = parametros_leitura(request)
+            if fields is not None or expand is not None:
+                expandidas = compila_plano(serializer_class, fields, expand).relacoes()
+                relacoes = tuple(relacao for relacao in relacoes if relacao in expandidas)
+
+        return relacoes
+
+'''
+    Mixin para as ViewSets com ETag no list e ETag / Last-Modified no retrieve (ver abstracts/condicional.py)
+    A versão da resposta é calculada com uma agregação no banco antes de serializar,
+    e uma requisição com If-None-Match / If-Modified-Since da versão atual recebe 304 sem corpo.
+'''
+class RespostaCondicionalMixin(EagerLoadingMixin):
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.resposta_condicional(queryset, None, lambda: super(RespostaCondicionalMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        gera_resposta = lambda: super(RespostaCondicionalMixin, self).retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, ValidationError):
+            # Id inválido: o get_object responde 404
+            return gera_resposta()
+
+        return self.resposta_condicional(queryset, None, gera_resposta, detalhe=True)
+
+    '''
+        Responde 304 se a versão do queryset corresponde aos cabeçalhos condicionais da requisição,
+        caso contrário gera a resposta (gera_resposta) com o ETag e o Last-Modified
+    '''
+    def resposta_condicional(self, queryset, serializer_class, gera_resposta, detalhe=False):
+        ultima_atualizacao, total = self.versao_resposta(queryset, serializer_class)
+        etag, last_modified = validadores(self.request, ultima_atualizacao, total)
+
+        # Uma linha que sai da listagem (ex: soft delete) não aumenta a maior data do queryset: nas listagens
+        # com a versão do queryset (com o número de linhas) somente o ETag é enviado (ver abstracts/condicional.py)
+        if not detalhe and total is not None:
+            last_modified = None
+
+        response = nao_modificada(self.request, etag, last_modified)
+        if response is not None:
+            return response
+
+        response = gera_resposta()
+        if response.status_code == 200:
+            define_validadores(response, etag, last_modified)
+        return response
+
+    '''
+        Versão (maior data_hora_atualizacao, número de linhas) da resposta do queryset
+    '''
+    def versao_resposta(self, queryset, serializer_class):
+        return versao_queryset(queryset, self.relacoes_carregadas(serializer_class))
+
+'''
+    Mixin para as ViewSets com listagens que aceitam a leitura plana (ver abstracts/leitura.py)
+    Quando a requisição informa ?fields= ou ?expand=, a listagem é montada a partir do .values(),
+    caso contrário segue pelo serializer normalmente.
+'''
+class LeituraPlanaMixin(RespostaCondicionalMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.lista(self.filter_queryset(self.get_queryset()))
+
+    '''
+        Pagina e serializa o queryset de uma listagem (usado pelo list e pelas actions de listagem),
+        com ETag / Last-Modified
+    '''
+    def lista(self, queryset, serializer_class=None):
+        if serializer_class is None:
+            serializer_class = self.get_serializer_class()
+
+        return self.resposta_condicional(queryset, serializer_class, lambda: self._pagina(queryset, serializer_class))
+
+    def _pagina(self, queryset, serializer_class):
+        fields, expand = parametros_leitura(self.request)
+
+        if fields is None and expand is None:
+            page = self.paginate_queryset(self.eager_load(queryset, serializer_class))
+            with mede_serializacao():
+                data = serializer_class(page, many=True, context=self.get_serializer_context()).data
+        else:
+            plano = compila_plano(serializer_class, fields, expand)
+
+            # As colunas da ordenação são lidas junto para a posição do cursor, mesmo fora do ?fields=
+            colunas = plano.valores()
+            if self.paginator is not None:
+                colunas += [campo.lstrip('-') for campo in self.paginator.get_ordering(self.request, queryset, self)]
+            page = self.paginate_queryset(queryset.values(*dict.fromkeys(colunas)))
+            with mede_serializacao():
+                data = plano.monta_lista(page)
+
+        return self.get_paginated_response(data)
+
+'''
+    Mixin para as ViewSets com o endpoint de sincronização incremental "changes/" (ver abstracts/sincronizacao.py)
+    Os registros são montados com o plano de leitura do serializer da ViewSet, com os relacionamentos somente pelo id
+    (ou conforme ?fields= / ?expand=)
+'''
+class SincronizacaoMixin:
+
+    @action(detail=False, methods=['GET'], url_path='changes', url_name='changes')
+    def changes(self, request):
+
+        # Usa o Serializer para validar a entrada
+        serializer = SincronizacaoSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        fields, expand = parametros_leitura(request)
+        plano = compila_plano(self.get_serializer_class(), fields or frozenset(), expand or frozenset())
+
+        # Todos os registros, inclusive os inativos (retornados como removidos)
+        queryset = self.get_queryset().model.all_objects.all()
+
+        return Response(lista_alteracoes(
+            queryset,
+            plano,
+            desde=serializer.validated_data.get('since'),
+            cursor=serializer.validated_data.get('cursor'),
+            tamanho=serializer.validated_data['page_size']
+        ))
+
+'''
+    Acertos e falhas do cache de respostas deste processo (somente administradores)
+'''
+class EstatisticasCacheView(APIView):
+
+    authentication_classes = [JWTStatelessAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(estatisticas_cache())
+
+'''
+    Histogramas de duração, consultas e tamanho das respostas por rota neste processo (somente administradores)
+    (ver abstracts/instrumentacao.py)
+'''
+class MetricasRotasView(APIView):
+
+    authentication_classes = [JWTStatelessAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metricas.estatisticas())
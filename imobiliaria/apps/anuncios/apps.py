@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AnunciosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.anuncios'
+
+    def ready(self):
+        # Registra os signals do app
+        from . import signals
@@ -0,0 +1,117 @@
+from django.db import transaction
+from rest_framework import serializers
+from abstracts.importacao import valida_linhas, identifica_linhas, bloqueia_por_id, cria_em_blocos, atualiza_em_blocos, aplica_alteracoes
+from abstracts.cache_respostas import invalida_respostas_em_massa
+from apps.imoveis.models import Imovel
+from .models import Anuncio, PlataformaAnuncio
+
+'''
+    Criação e atualização em massa de anúncios (POST e PATCH em /anuncios/bulk/), ver abstracts/importacao.py
+    Os imóveis e plataformas referenciados pelo lote são validados com uma consulta IN cada, em vez de uma por linha.
+    O bulk_create/bulk_update não dispara o post_save, então as respostas em cache dos anúncios são invalidadas no final.
+'''
+
+'''
+    Serializer responsável por validar os campos de cada linha da criação em massa (sem acessar o banco)
+'''
+class AnuncioImportacaoSerializer(serializers.Serializer):
+
+    imovel_id = serializers.IntegerField(required=True, error_messages={
+        'required': 'Por favor, forneça o ID do imóvel que o anúncio pertence.',
+        'invalid': 'O ID do imóvel deve ser um número inteiro.'
+    })
+
+    plataforma_id = serializers.IntegerField(required=True, error_messages={
+        'required': 'Por favor, forneça o ID da plataforma que o anúncio foi publicado.',
+        'invalid': 'O ID da plataforma deve ser um número inteiro.'
+    })
+
+'''
+    Serializer responsável por validar os campos de cada linha da atualização em massa (sem acessar o banco)
+    Assim como no PATCH, somente a plataforma do anúncio pode ser alterada
+'''
+class AnuncioAtualizacaoSerializer(serializers.Serializer):
+
+    plataforma_id = serializers.IntegerField(required=True, error_messages={
+        'required': 'Por favor, forneça o ID da plataforma que o anúncio foi publicado.',
+        'invalid': 'O ID da plataforma deve ser um número inteiro.'
+    })
+
+'''
+    Ids das plataformas ativas entre as informadas, em uma consulta
+'''
+def _plataformas(ids):
+    return set(PlataformaAnuncio.objects.filter(pk__in=ids).values_list('id', flat=True))
+
+'''
+    Cria uma lista de anúncios (dicts) e retorna o relatório com os anúncios criados e os erros de cada linha
+    (com o id de cada criado, inclusive no MySQL, ver cria_em_blocos)
+'''
+def importa_anuncios(linhas):
+    validas, erros = valida_linhas(AnuncioImportacaoSerializer(), linhas)
+
+    imoveis = set(Imovel.objects.filter(pk__in={dados['imovel_id'] for _, dados in validas}).values_list('id', flat=True))
+    plataformas = _plataformas({dados['plataforma_id'] for _, dados in validas})
+
+    criados = []
+    for linha, dados in validas:
+        if dados['imovel_id'] not in imoveis:
+            erros.append({'linha': linha, 'erros': {'imovel_id': ['O imóvel especificado não existe.']}})
+        elif dados['plataforma_id'] not in plataformas:
+            erros.append({'linha': linha, 'erros': {'plataforma_id': ['A plataforma especificada não existe.']}})
+        else:
+            criados.append((linha, Anuncio(imovel_id=dados['imovel_id'], plataforma_id=dados['plataforma_id'])))
+
+    with transaction.atomic():
+        cria_em_blocos(Anuncio, [anuncio for _, anuncio in criados])
+
+    invalida_respostas_em_massa(Anuncio, ids=[anuncio.pk for _, anuncio in criados])
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {
+        'criados': len(criados),
+        'anuncios': [{'linha': linha, 'id': anuncio.pk} for linha, anuncio in criados],
+        'erros': erros
+    }
+
+'''
+    Atualiza uma lista de anúncios (dicts com o id e o plataforma_id) e retorna o relatório
+    Somente os anúncios cuja plataforma mudou são gravados (ver atualiza_em_blocos)
+'''
+def atualiza_anuncios(linhas):
+    identificadas, erros = identifica_linhas(linhas)
+
+    serializer = AnuncioAtualizacaoSerializer()
+    validas = []
+    for linha, id, dados in identificadas:
+        try:
+            validas.append((linha, id, serializer.run_validation(dados)))
+        except serializers.ValidationError as e:
+            erros.append({'linha': linha, 'erros': e.detail})
+
+    plataformas = _plataformas({dados['plataforma_id'] for _, _, dados in validas})
+
+    atualizados = []
+    with transaction.atomic():
+        anuncios = bloqueia_por_id(Anuncio, [id for _, id, _ in validas])
+
+        alteracoes = []
+        for linha, id, dados in validas:
+            if id not in anuncios:
+                erros.append({'linha': linha, 'erros': {'id': ['O anúncio especificado não existe.']}})
+            elif dados['plataforma_id'] not in plataformas:
+                erros.append({'linha': linha, 'erros': {'plataforma_id': ['A plataforma especificada não existe.']}})
+            else:
+                alteracoes.append((anuncios[id], aplica_alteracoes(anuncios[id], dados)))
+                atualizados.append((linha, id))
+
+        atualiza_em_blocos(Anuncio, alteracoes)
+
+    invalida_respostas_em_massa(Anuncio, ids=[anuncio.pk for anuncio, campos in alteracoes if campos])
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {
+        'atualizados': len(atualizados),
+        'anuncios': [{'linha': linha, 'id': id} for linha, id in atualizados],
+        'erros': erros
+    }
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anuncios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anuncio',
+            index=models.Index(fields=['data_hora_atualizacao', 'id'], name='anuncio_atualizacao_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anuncios', '0002_anuncio_anuncio_atualizacao_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anuncio',
+            index=models.Index(fields=['imovel', 'ativo', 'id'], name='anuncio_imovel_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='anuncio',
+            index=models.Index(fields=['plataforma', 'ativo', 'id'], name='anuncio_plataforma_ativo_idx'),
+        ),
+    ]
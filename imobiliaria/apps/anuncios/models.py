@@ -20,4 +20,12 @@ class Anuncio(SoftDeletionModel):
     plataforma = models.ForeignKey(PlataformaAnuncio, on_delete=models.CASCADE, null=False, verbose_name="Plataforma que o anuncio foi publicado")
     
     class Meta:
-        db_table = 'anuncio'
\ No newline at end of file
+        db_table = 'anuncio'
+        indexes = [
+            # Listagens por imóvel e por plataforma (somente os ativos, paginados por id)
+            models.Index(fields=['imovel', 'ativo', 'id'], name='anuncio_imovel_ativo_idx'),
+            models.Index(fields=['plataforma', 'ativo', 'id'], name='anuncio_plataforma_ativo_idx'),
+            
+            # Índice usado na sincronização incremental (ver abstracts/sincronizacao.py)
+            models.Index(fields=['data_hora_atualizacao', 'id'], name='anuncio_atualizacao_idx'),
+        ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from abstracts.serializers import CamposDinamicosMixin, AtualizacaoParcialMixin, RelacionadoField
 from .models import Anuncio, PlataformaAnuncio
 from apps.imoveis.serializers import ImovelSerializer
 from apps.imoveis.models import Imovel
@@ -6,7 +7,7 @@ from apps.imoveis.models import Imovel
 '''
     Serializer para as plataformas do anúncio
 '''
-class PlataformaAnuncioSerializer(serializers.ModelSerializer):
+class PlataformaAnuncioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     
     class Meta:
         model = PlataformaAnuncio
@@ -18,9 +19,9 @@ class PlataformaAnuncioSerializer(serializers.ModelSerializer):
 class AnuncioCreateSerializer(serializers.ModelSerializer):
     
     # Validação do imóvel informado na criação do anúncio
-    imovel_id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=Imovel.objects.filter(ativo=True), # Para validar que seja um id existente
+    imovel_id = RelacionadoField(
+        Imovel, # Para validar que seja um id existente (e ativo)
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID do imóvel que o anúncio pertence.',
             'does_not_exist': 'O imóvel especificado não existe'
@@ -30,9 +31,9 @@ class AnuncioCreateSerializer(serializers.ModelSerializer):
     )
     
     # Validação da plataforma informado na criação do anúncio
-    plataforma_id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=PlataformaAnuncio.objects.filter(ativo=True), # Para validar que seja um id existente
+    plataforma_id = RelacionadoField(
+        PlataformaAnuncio, # Para validar que seja um id existente (e ativo)
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID da plataforma que o anúncio foi publicado.',
             'does_not_exist': 'A plataforma especificada não existe'
@@ -48,17 +49,17 @@ class AnuncioCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Anuncio
         fields = '__all__' # Retorna todos dados da tabela
-        read_only_fields = ('id', 'data_criacao', 'data_hora_atualizacao') # Define que esses campos não serão incluídos na criação 
+        read_only_fields = ('id', 'ativo', 'data_criacao', 'data_hora_atualizacao') # Define que esses campos não serão incluídos na criação 
         
 '''
     Serializer responsável por validar os parâmetros do PARTIAL_UPDATE e retornar os dados para os métodos GET
 '''
-class AnuncioSerializer(serializers.ModelSerializer):
+class AnuncioSerializer(AtualizacaoParcialMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     
     # Validação da plataforma informado no update do anúncio
-    plataforma_id = serializers.PrimaryKeyRelatedField(
-        required=False, 
-        queryset=PlataformaAnuncio.objects.filter(ativo=True), # Para validar que seja um id existente
+    plataforma_id = RelacionadoField(
+        PlataformaAnuncio, # Para validar que seja um id existente (e ativo)
+        required=False,
         error_messages={
             'required': 'Por favor, forneça o ID da plataforma que o anúncio foi publicado.',
             'does_not_exist': 'A plataforma especificada não existe'
@@ -74,15 +75,15 @@ class AnuncioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Anuncio
         fields = '__all__' # Retorna todos dados da tabela
-        read_only_fields = ('id', 'data_criacao', 'data_hora_atualizacao', 'imovel') # Define que esses campos não serão incluídos na criação
+        read_only_fields = ('id', 'ativo', 'data_criacao', 'data_hora_atualizacao', 'imovel') # O ativo só é alterado pela desativação em cascata do imóvel
         
 '''
     By Imovel Serializer (validar parâmetros)
 '''
 class ImovelIdSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=Imovel.objects.filter(ativo=True), # Para validar que seja um id existente
+    id = RelacionadoField(
+        Imovel, # Para validar que seja um id existente (e ativo)
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID do imóvel que deseja listar os anuncios.',
             'does_not_exist': 'O imóvel especificado não existe'
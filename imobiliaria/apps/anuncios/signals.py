@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from abstracts.cache_respostas import invalida_respostas, invalida_respostas_em_massa
+from abstracts.models import desativados
+from .models import Anuncio, PlataformaAnuncio
+
+'''
+    Invalida as respostas em cache dos anúncios e plataformas a cada alteração, inclusive o soft delete
+    (SoftDeletionModel.delete salva o objeto)
+'''
+for model in (Anuncio, PlataformaAnuncio):
+    post_save.connect(invalida_respostas, sender=model, dispatch_uid='%s_invalida_respostas' % model._meta.model_name)
+    post_delete.connect(invalida_respostas, sender=model, dispatch_uid='%s_invalida_respostas' % model._meta.model_name)
+    desativados.connect(invalida_respostas_em_massa, sender=model, dispatch_uid='%s_invalida_respostas' % model._meta.model_name)
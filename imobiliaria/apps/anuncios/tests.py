@@ -5,11 +5,15 @@ from rest_framework import status
 from django.utils import timezone
 from apps.imoveis.models import Imovel
 from .models import Anuncio, PlataformaAnuncio
+from apps.reservas.models import Reserva
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import AccessToken
+from abstracts.testing import QueryCountAssertionsMixin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
-class AnuncioApiTest(TestCase):
+class AnuncioApiTest(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         
@@ -72,6 +76,23 @@ class AnuncioApiTest(TestCase):
         # Testa se a resposta contém os dados corretos
         self.assertEqual(response.data['id'], self.anuncio1.id)
         
+    '''
+        Teste que verifica ?fields= e ?expand= na busca de um anúncio por id
+    '''
+    def test_get_single_anuncio_fields_expand(self):
+        
+        url = reverse('anuncio-detail', kwargs={'pk': self.anuncio1.id})
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,imovel,plataforma', 'expand': 'plataforma'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['imovel'], self.anuncio1.imovel_id)
+        self.assertEqual(response.data['plataforma']['id'], self.anuncio1.plataforma_id)
+        
+        # Somente a plataforma (expandida) é carregada com JOIN
+        self.assertEqual(queries.captured_queries[-1]['sql'].count('JOIN'), 1)
+        
     '''
         Teste que verifica se está funcionando a busca pelos anúncios que retorna a lista
     '''
@@ -85,10 +106,10 @@ class AnuncioApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Testa se dois anúncios são retornados
-        self.assertEqual(len(response.data), 3) 
+        self.assertEqual(len(response.data['results']), 3) 
 
         # Verifica se os ids dos anúncios na resposta correspondem aos anúncios criados
-        response_ids = [anuncio['id'] for anuncio in response.data]
+        response_ids = [anuncio['id'] for anuncio in response.data['results']]
         self.assertListEqual(response_ids, [self.anuncio1.id, self.anuncio2.id, self.anuncio3.id])
         
     '''
@@ -140,6 +161,19 @@ class AnuncioApiTest(TestCase):
         # Verifica se os dados do anúncio foram atualizados corretamente
         self.assertEqual(self.anuncio1.plataforma.id, new_data['plataforma_id'])
         
+        # Reenviar a mesma plataforma não grava nada
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, new_data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('UPDATE')])
+        
+        # O ativo não é alterado pelo PATCH (desativaria o anúncio sem desativar as reservas em cascata)
+        reserva = Reserva.objects.create(anuncio=self.anuncio1, data_checkin="2030-07-01", data_checkout="2030-07-05")
+        response = self.client.patch(url, {'ativo': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Anuncio.objects.filter(pk=self.anuncio1.pk).exists())
+        self.assertTrue(Reserva.objects.filter(pk=reserva.pk).exists())
+        
     '''
         Teste que verifica se o delete realmente está bloqueado
     '''
@@ -165,5 +199,134 @@ class AnuncioApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Verifica se os ids dos anúncios na resposta correspondem aos anúncios do imóvel 1
-        response_ids = [anuncio['id'] for anuncio in response.data]
-        self.assertListEqual(response_ids, [self.anuncio1.id, self.anuncio2.id])
\ No newline at end of file
+        response_ids = [anuncio['id'] for anuncio in response.data['results']]
+        self.assertListEqual(response_ids, [self.anuncio1.id, self.anuncio2.id])
+        
+    '''
+        Teste que verifica que a listagem de anúncios não faz uma consulta por anúncio (N+1)
+    '''
+    def test_list_anuncios_query_count(self):
+        
+        def cria_anuncios(quantidade):
+            for i in range(quantidade):
+                imovel = Imovel.objects.create(limite_hospedes=2)
+                plataforma = PlataformaAnuncio.objects.create(nome="Plataforma %d" % i)
+                Anuncio.objects.create(imovel=imovel, plataforma=plataforma)
+        
+        self.assertQueryCountConstant(reverse('anuncio-list'), cria_anuncios)
+        
+    '''
+        Teste que verifica que a listagem de anúncios de um imóvel não faz uma consulta por anúncio (N+1)
+    '''
+    def test_list_by_imovel_query_count(self):
+        
+        def cria_anuncios(quantidade):
+            for i in range(quantidade):
+                plataforma = PlataformaAnuncio.objects.create(nome="Plataforma %d" % i)
+                Anuncio.objects.create(imovel=self.imovel, plataforma=plataforma)
+        
+        url = reverse('anuncio-anuncio_byimovel', kwargs={'id_imovel': self.imovel.id})
+        self.assertQueryCountConstant(url, cria_anuncios)
+        
+    '''
+        Teste que verifica a exportação dos anúncios de um imóvel em CSV
+    '''
+    def test_export_anuncios_csv(self):
+        
+        # Faz uma requisição GET para o endpoint
+        url = reverse('anuncio-anuncio_export')
+        response = self.client.get(url, {'formato': 'csv', 'imovel': self.imovel.id})
+        
+        # Testa se a resposta tem status code 200 (OK)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Verifica o cabeçalho e os anúncios do imóvel 1
+        linhas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[0], 'id,imovel_id,plataforma_id,plataforma,taxa,data_criacao,data_hora_atualizacao')
+        self.assertListEqual([int(linha.split(',')[0]) for linha in linhas[1:]], [self.anuncio1.id, self.anuncio2.id])
+        
+    '''
+        Teste que verifica o cache da listagem de plataformas e a sua invalidação somente ao alterar uma plataforma
+    '''
+    def test_list_plataformas_cache(self):
+        
+        url = reverse('plataforma-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        
+        # Alterar um anúncio não invalida a listagem de plataformas
+        self.anuncio1.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        # Uma nova plataforma invalida a listagem
+        PlataformaAnuncio.objects.create(nome="Booking")
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 3)
+        
+        # O soft delete também
+        self.plataforma_anuncio2.delete()
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+        
+    '''
+        Teste que verifica que a listagem de anúncios de um imóvel não retorna os anúncios deletados,
+        usando o índice composto (imovel, ativo, id)
+    '''
+    def test_list_by_imovel_somente_ativos(self):
+        
+        self.anuncio1.delete()
+        
+        response = self.client.get(reverse('anuncio-anuncio_byimovel', kwargs={'id_imovel': self.imovel.id}))
+        self.assertNotIn(self.anuncio1.id, [anuncio['id'] for anuncio in response.data['results']])
+        
+        self.assertUsaIndice(Anuncio.objects.filter(imovel_id=self.imovel.id).order_by('id'), 'anuncio_imovel_ativo_idx')
+        self.assertUsaIndice(Anuncio.objects.filter(plataforma_id=self.plataforma_anuncio1.id).order_by('id'), 'anuncio_plataforma_ativo_idx')
+        
+    '''
+        Teste que verifica a criação e a atualização em massa de anúncios, validando os ids referenciados
+        com um número de consultas que não cresce com o tamanho do lote
+    '''
+    def test_bulk_anuncios(self):
+        
+        url = reverse('anuncio-anuncio_bulk')
+        
+        data = [
+            # Linha 1: válida
+            {'imovel_id': self.imovel.id, 'plataforma_id': self.plataforma_anuncio2.id},
+            # Linha 2: imóvel inexistente
+            {'imovel_id': 999, 'plataforma_id': self.plataforma_anuncio1.id},
+            # Linha 3: plataforma inexistente
+            {'imovel_id': self.imovel2.id, 'plataforma_id': 999},
+            # Linha 4: sem a plataforma
+            {'imovel_id': self.imovel2.id},
+        ]
+        response = self.client.post(url, data, format='json')
+        
+        # Verifica se a resposta tem status code 207 (somente parte dos anúncios foi criada)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['criados'], 1)
+        self.assertListEqual([erro['linha'] for erro in response.data['erros']], [2, 3, 4])
+        self.assertIn('imovel_id', response.data['erros'][0]['erros'])
+        self.assertIn('plataforma_id', response.data['erros'][1]['erros'])
+        self.assertEqual(Anuncio.objects.filter(plataforma=self.plataforma_anuncio2).count(), 1)
+        
+        # Atualização da plataforma de todos os anúncios
+        data = [{'id': anuncio.id, 'plataforma_id': self.plataforma_anuncio2.id} for anuncio in Anuncio.objects.all()]
+        response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['atualizados'], 4)
+        self.assertEqual(Anuncio.objects.filter(plataforma=self.plataforma_anuncio1).count(), 0)
+        
+        # O número de consultas não cresce com o tamanho do lote
+        def lote(tamanho):
+            return [{'imovel_id': self.imovel.id, 'plataforma_id': self.plataforma_anuncio1.id} for _ in range(tamanho)]
+        
+        with CaptureQueriesContext(connection) as pequeno:
+            self.client.post(url, lote(2), format='json')
+        with CaptureQueriesContext(connection) as grande:
+            response = self.client.post(url, lote(50), format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(pequeno), len(grande))
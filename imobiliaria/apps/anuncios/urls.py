@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
-router.register(r'', views.AnuncioViewSet, basename='anuncio')
+# As plataformas são registradas antes para que "plataformas/" não seja interpretado como o id de um anúncio
 router.register(r'plataformas', views.PlataformaAnuncioViewSet, basename='plataforma')
+router.register(r'', views.AnuncioViewSet, basename='anuncio')
 
 urlpatterns = [
     path('', include(router.urls)),
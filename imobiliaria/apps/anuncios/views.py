@@ -1,18 +1,39 @@
 from rest_framework import viewsets
 from .models import Anuncio
 from .serializers import *
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from abstracts.autenticacao import JWTStatelessAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from abstracts.views import LeituraPlanaMixin, RespostaCondicionalMixin, SincronizacaoMixin
+from abstracts.cache_respostas import CacheRespostaMixin
+from abstracts.serializers import ExportacaoSerializer
+from abstracts.exportacao import exporta
+from rest_framework.parsers import JSONParser
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from abstracts.parsers import NDJSONParser
+from abstracts.importacao import status_importacao
+from .importacao import importa_anuncios, atualiza_anuncios
+
+# Colunas da exportação de anúncios: {coluna no arquivo: campo}
+COLUNAS_EXPORTACAO = {
+    'id': 'id',
+    'imovel_id': 'imovel_id',
+    'plataforma_id': 'plataforma_id',
+    'plataforma': 'plataforma__nome',
+    'taxa': 'plataforma__taxa',
+    'data_criacao': 'data_criacao',
+    'data_hora_atualizacao': 'data_hora_atualizacao',
+}
 
 '''
     CRUD de anúncio, sem incluir DELETE
 '''
-class AnuncioViewSet(viewsets.ModelViewSet):
+class AnuncioViewSet(LeituraPlanaMixin, SincronizacaoMixin, viewsets.ModelViewSet):
     
     # Definindo a classe de autenticação
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTStatelessAuthentication]
 
     # Somente usuários autenticados podem acessar os métodos da AnuncioViewSet
     permission_classes = [IsAuthenticated]
@@ -21,10 +42,11 @@ class AnuncioViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch']
     
     '''
-        Definição do queryset para considerar que os que tenham ativo=0 "não existem"
+        Definição do queryset para considerar que os que tenham ativo=0 "não existem" (o manager padrão retorna somente os ativos)
+        (já carregando imóvel e plataforma no mesmo SELECT)
     '''
     def get_queryset(self):
-        return Anuncio.objects.filter(ativo=True)
+        return self.eager_load(Anuncio.objects.all())
     
     '''
         Definição dos serializers para cada método da VIEW
@@ -45,21 +67,64 @@ class AnuncioViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         # Busca os anúncios pertencentes ao imóvel
-        id_imovel = serializer.validated_data['id']
-        anuncios = Anuncio.objects.filter(imovel_id=id_imovel)
+        imovel = serializer.validated_data['id'] # Objeto já buscado e validado pelo RelacionadoField
+        anuncios = Anuncio.objects.filter(imovel=imovel)
+        
+        # Pagina (por cursor) e serializa os dados para retornar
+        return self.lista(anuncios, AnuncioSerializer)
+    
+    '''
+        View referente a exportação (CSV ou NDJSON) dos anúncios ativos, em streaming
+        Filtros opcionais: ?imovel=<id>&inicio=<data>&fim=<data> (anúncios criados em [inicio, fim))
+    '''
+    @action(detail=False, methods=['GET'], url_path='export', url_name='anuncio_export')
+    def export(self, request):
+        
+        # Usa o Serializer para validar a entrada
+        serializer = ExportacaoSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        parametros = serializer.validated_data
         
-        # Serializa os dados para retornar
-        serializer = AnuncioSerializer(anuncios, many=True)
+        anuncios = Anuncio.objects.all()
+        if 'imovel' in parametros:
+            anuncios = anuncios.filter(imovel_id=parametros['imovel'])
+        if 'inicio' in parametros:
+            anuncios = anuncios.filter(data_criacao__gte=parametros['inicio'])
+        if 'fim' in parametros:
+            anuncios = anuncios.filter(data_criacao__lt=parametros['fim'])
         
-        return Response(serializer.data)
+        return exporta(anuncios, COLUNAS_EXPORTACAO, parametros['formato'], 'anuncios')
+
+    '''
+        View referente a criação (POST) e atualização (PATCH) em massa de anúncios, recebendo uma lista JSON ou um corpo NDJSON
+        As linhas válidas são gravadas e as inválidas são retornadas com os seus erros (ver apps/anuncios/importacao.py)
+    '''
+    @action(detail=False, methods=['POST', 'PATCH'], url_path='bulk', url_name='anuncio_bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        
+        if not isinstance(request.data, list):
+            raise ValidationError("Por favor, forneça uma lista de anúncios.")
+        
+        # 201/200 se todas as linhas foram gravadas, 207 se somente algumas e 400 se nenhuma
+        if request.method == 'POST':
+            relatorio = importa_anuncios(request.data)
+            status_code = status_importacao(relatorio['criados'], relatorio['erros'])
+        else:
+            relatorio = atualiza_anuncios(request.data)
+            status_code = status_importacao(relatorio['atualizados'], relatorio['erros'], status.HTTP_200_OK)
+        
+        return Response(relatorio, status=status_code)
 
 '''
     GET das plataformas
 '''
-class PlataformaAnuncioViewSet(viewsets.ModelViewSet):
+class PlataformaAnuncioViewSet(CacheRespostaMixin, RespostaCondicionalMixin, viewsets.ModelViewSet):
+    
+    # Listagem e busca por id com a resposta em cache (ver abstracts/cache_respostas.py)
+    cache_actions = ('list', 'retrieve')
     
     # Definindo a classe de autenticação
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTStatelessAuthentication]
 
     # Somente usuários autenticados podem acessar os métodos da PlataformaAnuncioViewSet
     permission_classes = [IsAuthenticated]
@@ -67,10 +132,10 @@ class PlataformaAnuncioViewSet(viewsets.ModelViewSet):
     http_method_names = ['get']
     
     '''
-        Definição do queryset para considerar que os que tenham ativo=0 "não existem"
+        Definição do queryset para considerar que os que tenham ativo=0 "não existem" (o manager padrão retorna somente os ativos)
     '''
     def get_queryset(self):
-        return PlataformaAnuncio.objects.filter(ativo=True)
+        return PlataformaAnuncio.objects.all()
     
     '''
         Definição dos serializers para cada método da VIEW
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ImoveisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.imoveis'
+
+    def ready(self):
+        # Registra os signals do app
+        from . import signals
@@ -0,0 +1,72 @@
+from django.db import transaction
+from rest_framework import serializers
+from abstracts.importacao import valida_linhas, identifica_linhas, bloqueia_por_id, cria_em_blocos, atualiza_em_blocos, aplica_alteracoes
+from abstracts.cache_respostas import invalida_respostas_em_massa
+from .models import Imovel
+from .serializers import ImovelCreateSerializer, ImovelSerializer
+
+'''
+    Criação e atualização em massa de imóveis (POST e PATCH em /imoveis/bulk/), ver abstracts/importacao.py
+    O bulk_create/bulk_update não dispara o post_save, então as respostas em cache dos imóveis são invalidadas no final.
+'''
+
+'''
+    Cria uma lista de imóveis (dicts) e retorna o relatório com os imóveis criados e os erros de cada linha
+    (com o id de cada criado, inclusive no MySQL, ver cria_em_blocos)
+'''
+def importa_imoveis(linhas):
+    validas, erros = valida_linhas(ImovelCreateSerializer(), linhas)
+    criados = [(linha, Imovel(**dados)) for linha, dados in validas]
+
+    with transaction.atomic():
+        cria_em_blocos(Imovel, [imovel for _, imovel in criados])
+
+    invalida_respostas_em_massa(Imovel, ids=[imovel.pk for _, imovel in criados])
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {
+        'criados': len(criados),
+        'imoveis': [{'linha': linha, 'id': imovel.pk} for linha, imovel in criados],
+        'erros': erros
+    }
+
+'''
+    Atualiza uma lista de imóveis (dicts com o id e os campos alterados, como no PATCH) e retorna o relatório
+    Somente as colunas que mudaram são gravadas (ver atualiza_em_blocos)
+'''
+def atualiza_imoveis(linhas):
+    identificadas, erros = identifica_linhas(linhas)
+
+    # Serializer do PATCH, validando cada linha com o imóvel correspondente (ver ImovelSerializer.validate_data_ativacao)
+    serializer = ImovelSerializer(partial=True)
+
+    atualizados = []
+    with transaction.atomic():
+        imoveis = bloqueia_por_id(Imovel, [id for _, id, _ in identificadas])
+
+        alteracoes = []
+        for linha, id, dados in identificadas:
+            if id not in imoveis:
+                erros.append({'linha': linha, 'erros': {'id': ['O imóvel especificado não existe.']}})
+                continue
+
+            serializer.instance = imoveis[id]
+            try:
+                validados = serializer.run_validation(dados)
+            except serializers.ValidationError as e:
+                erros.append({'linha': linha, 'erros': e.detail})
+                continue
+
+            alteracoes.append((imoveis[id], aplica_alteracoes(imoveis[id], validados)))
+            atualizados.append((linha, id))
+
+        atualiza_em_blocos(Imovel, alteracoes)
+
+    invalida_respostas_em_massa(Imovel, ids=[imovel.pk for imovel, campos in alteracoes if campos])
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {
+        'atualizados': len(atualizados),
+        'imoveis': [{'linha': linha, 'id': id} for linha, id in atualizados],
+        'erros': erros
+    }
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imoveis', '0002_imovel_imovel_atualizacao_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['ativo', 'limite_hospedes', 'id'], name='imovel_busca_hospedes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['ativo', 'aceita_animais', 'limite_hospedes', 'id'], name='imovel_busca_animais_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['ativo', 'quant_banheiros', 'limite_hospedes', 'id'], name='imovel_busca_banheiros_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['ativo', 'valor_limpeza', 'id'], name='imovel_busca_limpeza_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['ativo', 'aceita_animais', 'valor_limpeza', 'id'], name='imovel_busca_animais_limp_idx'),
+        ),
+    ]
@@ -12,4 +12,16 @@ class Imovel(SoftDeletionModel):
     data_ativacao = models.DateField(null=True)
     
     class Meta:
-        db_table = 'imovel'
\ No newline at end of file
+        db_table = 'imovel'
+        indexes = [
+            # Índices das buscas da listagem (ver ImovelViewSet.buscas_indexadas e abstracts/filtros.py):
+            # igualdades primeiro, depois o campo filtrado por intervalo e o id (desempate da paginação)
+            models.Index(fields=['ativo', 'limite_hospedes', 'id'], name='imovel_busca_hospedes_idx'),
+            models.Index(fields=['ativo', 'aceita_animais', 'limite_hospedes', 'id'], name='imovel_busca_animais_idx'),
+            models.Index(fields=['ativo', 'quant_banheiros', 'limite_hospedes', 'id'], name='imovel_busca_banheiros_idx'),
+            models.Index(fields=['ativo', 'valor_limpeza', 'id'], name='imovel_busca_limpeza_idx'),
+            models.Index(fields=['ativo', 'aceita_animais', 'valor_limpeza', 'id'], name='imovel_busca_animais_limp_idx'),
+            
+            # Índice usado na sincronização incremental (ver abstracts/sincronizacao.py)
+            models.Index(fields=['data_hora_atualizacao', 'id'], name='imovel_atualizacao_idx'),
+        ]
\ No newline at end of file
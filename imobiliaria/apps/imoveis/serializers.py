@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from abstracts.serializers import CamposDinamicosMixin, AtualizacaoParcialMixin
 from .models import Imovel
 from django.utils import timezone
 
@@ -39,12 +40,12 @@ class ImovelCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Imovel
         fields = '__all__' # Retorna todos dados da tabela
-        read_only_fields = ('id', 'data_criacao', 'data_hora_atualizacao') # Define que esses campos não serão incluídos na criação
+        read_only_fields = ('id', 'ativo', 'data_criacao', 'data_hora_atualizacao') # Define que esses campos não serão incluídos na criação
         
 '''
     Serializer responsável por validar os parâmetros do PARTIAL_UPDATE e retornar os dados para os métodos GET
 '''
-class ImovelSerializer(serializers.ModelSerializer):
+class ImovelSerializer(AtualizacaoParcialMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     
     limite_hospedes = serializers.IntegerField(required=False, min_value=1, error_messages={
         'required': 'Por favor, forneça o número de hóspedes.',
@@ -70,7 +71,10 @@ class ImovelSerializer(serializers.ModelSerializer):
     def validate_data_ativacao(self, value):
         """
         Verifica se a data de ativação fornecida é maior ou igual que a data/hora atual.
+        A data já gravada no imóvel pode ser reenviada sem alteração, mesmo que já tenha passado.
         """
+        if value == getattr(self.instance, 'data_ativacao', None):
+            return value
         if value < timezone.now().date():
             raise serializers.ValidationError("A data de ativação não pode ser no passado.")
         return value
@@ -78,4 +82,57 @@ class ImovelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Imovel
         fields = '__all__' # Retorna todos dados da tabela   
-        read_only_fields = ('id', 'data_criacao', 'data_hora_atualizacao') # Define que esses campos não serão incluídos na criação 
\ No newline at end of file
+        read_only_fields = ('id', 'ativo', 'data_criacao', 'data_hora_atualizacao') # O ativo só é alterado pelo DELETE, que desativa em cascata
+        
+'''
+    Serializer responsável por validar os parâmetros da consulta de disponibilidade
+'''
+class DisponibilidadeSerializer(serializers.Serializer):
+    
+    # Maior período que pode ser consultado em uma requisição
+    MAX_DIAS = 731
+    
+    inicio = serializers.DateField(required=True, error_messages={
+        'required': 'Por favor, forneça a data inicial do período.',
+        'invalid': 'A data inicial deve estar no formato AAAA-MM-DD.'
+    })
+    
+    fim = serializers.DateField(required=True, error_messages={
+        'required': 'Por favor, forneça a data final do período.',
+        'invalid': 'A data final deve estar no formato AAAA-MM-DD.'
+    })
+    
+    def validate(self, attrs):
+        if attrs['inicio'] >= attrs['fim']:
+            raise serializers.ValidationError("A data inicial deve ser anterior à data final.")
+        if (attrs['fim'] - attrs['inicio']).days > self.MAX_DIAS:
+            raise serializers.ValidationError("O período consultado não pode ser maior que %d dias." % self.MAX_DIAS)
+        return attrs
+
+'''
+    Serializer responsável por validar os parâmetros da busca de imóveis disponíveis
+'''
+class ImoveisDisponiveisSerializer(serializers.Serializer):
+    
+    hospedes = serializers.IntegerField(required=True, min_value=1, error_messages={
+        'required': 'Por favor, forneça o número de hóspedes.',
+        'min_value': 'O número de hóspedes deve ser um número inteiro válido.',
+        'invalid': 'O número de hóspedes deve ser um número inteiro válido.'
+    })
+    
+    data_checkin = serializers.DateField(required=True, error_messages={
+        'required': 'Por favor, forneça a data de checkin.',
+        'invalid': 'A data de checkin deve estar no formato AAAA-MM-DD.'
+    })
+    
+    data_checkout = serializers.DateField(required=True, error_messages={
+        'required': 'Por favor, forneça a data de checkout.',
+        'invalid': 'A data de checkout deve estar no formato AAAA-MM-DD.'
+    })
+    
+    def validate(self, attrs):
+        if attrs['data_checkin'] >= attrs['data_checkout']:
+            raise serializers.ValidationError("A data de check-in deve ser anterior à data de check-out.")
+        if (attrs['data_checkout'] - attrs['data_checkin']).days > DisponibilidadeSerializer.MAX_DIAS:
+            raise serializers.ValidationError("O período consultado não pode ser maior que %d dias." % DisponibilidadeSerializer.MAX_DIAS)
+        return attrs
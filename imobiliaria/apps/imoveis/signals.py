@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from abstracts.cache_respostas import invalida_respostas, invalida_respostas_em_massa
+from abstracts.models import desativados
+from .models import Imovel
+
+'''
+    Invalida as respostas em cache do imóvel a cada alteração, inclusive o soft delete (SoftDeletionModel.delete salva o objeto)
+'''
+post_save.connect(invalida_respostas, sender=Imovel, dispatch_uid='imovel_invalida_respostas')
+post_delete.connect(invalida_respostas, sender=Imovel, dispatch_uid='imovel_invalida_respostas')
+desativados.connect(invalida_respostas_em_massa, sender=Imovel, dispatch_uid='imovel_invalida_respostas')
@@ -1,17 +1,37 @@
+import json
+from unittest import mock
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from .models import Imovel
+from apps.reservas.disponibilidade import imoveis_disponiveis
 from apps.anuncios.models import Anuncio, PlataformaAnuncio
 from apps.reservas.models import Reserva
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import AccessToken
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta, date
+from django.db import connection
+from django.db.models import Value
+from django.test.utils import CaptureQueriesContext
+from abstracts.cache_respostas import estatisticas_cache
+from abstracts.instrumentacao import metricas
+from abstracts.models import desativados
+from abstracts.pagination import KeysetPagination, _depois_de
+from abstracts.testing import QueryCountAssertionsMixin
+from abstracts.serializers import RelacionadoField
+from rest_framework import serializers
 
-class ImovelApiTest(TestCase):
+class ImovelApiTest(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         
+        # Descarta os mapas de ocupação e as respostas em cache de outros testes
+        cache.clear()
+        self.addCleanup(cache.clear)
+        
         # Configuração do JWT
         self.user = User.objects.create_user(username='user_teste', password='teste@123')
         self.access_token = AccessToken.for_user(self.user)
@@ -44,6 +64,21 @@ class ImovelApiTest(TestCase):
         # Testa se a resposta contém os dados corretos
         self.assertEqual(response.data['id'], self.imovel1.id)
         
+    '''
+        Teste que verifica ?fields= na busca de um imóvel por id
+    '''
+    def test_get_single_imovel_fields(self):
+        
+        url = reverse('imovel-detail', kwargs={'pk': self.imovel1.id})
+        response = self.client.get(url, {'fields': 'id,limite_hospedes'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.imovel1.id, 'limite_hospedes': 2})
+        
+        # O imóvel não possui relacionamentos a expandir
+        response = self.client.get(url, {'expand': 'limite_hospedes'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
     '''
         Teste que verifica se está funcionando a busca pelos imóveis que retorna a lista
     '''
@@ -57,10 +92,10 @@ class ImovelApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Testa se dois imóveis são retornados
-        self.assertEqual(len(response.data), 2) 
+        self.assertEqual(len(response.data['results']), 2) 
 
         # Verifica se os ids dos imóveis na resposta correspondem aos imóveis criados
-        response_ids = [imovel['id'] for imovel in response.data]
+        response_ids = [imovel['id'] for imovel in response.data['results']]
         self.assertListEqual(response_ids, [self.imovel1.id, self.imovel2.id])
         
     '''
@@ -116,6 +151,40 @@ class ImovelApiTest(TestCase):
         self.assertEqual(self.imovel1.limite_hospedes, new_data['limite_hospedes'])
         self.assertEqual(self.imovel1.aceita_animais, new_data['aceita_animais'])
         
+    '''
+        Teste que verifica se o PATCH grava somente as colunas alteradas (e nada quando nenhum valor mudou)
+    '''
+    def test_update_imovel_somente_alterados(self):
+        
+        # data_ativacao já passada, gravada antes
+        Imovel.objects.filter(pk=self.imovel1.pk).update(data_ativacao=timezone.now().date() - timedelta(days=30))
+        self.imovel1.refresh_from_db()
+        
+        def updates(data):
+            url = reverse('imovel-detail', kwargs={'pk': self.imovel1.id})
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(url, data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        
+        # Somente o limite_hospedes mudou (valor_limpeza e data_ativacao são os mesmos)
+        sqls = updates({
+            'limite_hospedes': 6,
+            'valor_limpeza': 100,
+            'data_ativacao': self.imovel1.data_ativacao.isoformat()
+        })
+        self.assertEqual(len(sqls), 1)
+        colunas = sqls[0].split(' SET ')[1].split(' WHERE ')[0]
+        self.assertEqual(colunas.count('='), 2)
+        self.assertIn('"limite_hospedes"', colunas)
+        self.assertIn('"data_hora_atualizacao"', colunas)
+        
+        # Nenhum valor mudou: nenhuma escrita
+        self.assertEqual(updates({'limite_hospedes': 6, 'aceita_animais': True}), [])
+        
+        self.imovel1.refresh_from_db()
+        self.assertEqual(self.imovel1.limite_hospedes, 6)
+        
     '''
         Teste que verifica se está funcionando o delete de um imóvel
     '''
@@ -170,4 +239,601 @@ class ImovelApiTest(TestCase):
         self.assertEqual(imovel.ativo, False)
         
         # Verifica se agora possui 2 imóveis, considerando que 1 foi "deletado"
-        self.assertEqual(Imovel.objects.filter(ativo=True).count(), 2)
\ No newline at end of file
+        self.assertEqual(Imovel.objects.filter(ativo=True).count(), 2)
+        
+        # Verifica se o anúncio e a reserva do imóvel foram desativados em cascata
+        self.assertEqual(anuncio.ativo, False)
+        self.assertEqual(reserva.ativo, False)
+        
+    '''
+        Teste que verifica se o soft delete em massa usa um número fixo de comandos, independente do número de objetos,
+        e grava somente o ativo e o data_hora_atualizacao
+    '''
+    def test_delete_imoveis_em_massa(self):
+        
+        plataforma_anuncio = PlataformaAnuncio.objects.create(taxa=50, nome="Airbnb")
+        
+        def cria(quantidade):
+            for _ in range(quantidade):
+                imovel = Imovel.objects.create(limite_hospedes=4, valor_limpeza=80)
+                anuncio = Anuncio.objects.create(imovel=imovel, plataforma=plataforma_anuncio)
+                Reserva.objects.create(anuncio=anuncio, data_checkin="2030-07-01", data_checkout="2030-07-05")
+        
+        cria(2)
+        with CaptureQueriesContext(connection) as poucos:
+            total, removidos = Imovel.objects.filter(valor_limpeza=80).delete()
+        
+        self.assertEqual(total, 6)
+        self.assertEqual(removidos, {'imoveis.Imovel': 2, 'anuncios.Anuncio': 2, 'reservas.Reserva': 2})
+        
+        cria(10)
+        with CaptureQueriesContext(connection) as muitos:
+            total, _ = Imovel.objects.filter(valor_limpeza=80).delete()
+        
+        self.assertEqual(total, 30)
+        self.assertEqual(len(poucos), len(muitos))
+        
+        # Os UPDATEs alteram somente o ativo e o data_hora_atualizacao
+        updates = [query['sql'] for query in muitos.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+        for sql in updates:
+            colunas = sql.split(' SET ')[1].split(' WHERE ')[0]
+            self.assertEqual(colunas.count('='), 2)
+            self.assertIn('"ativo"', colunas)
+            self.assertIn('"data_hora_atualizacao"', colunas)
+        
+        self.assertEqual(Reserva.objects.filter(anuncio__plataforma=plataforma_anuncio).count(), 0)
+        self.assertEqual(Imovel.objects.count(), 2)
+        
+    '''
+        Teste que verifica que o soft delete em cascata é desfeito por inteiro quando uma etapa falha
+    '''
+    def test_delete_imovel_cascata_atomica(self):
+        
+        plataforma_anuncio = PlataformaAnuncio.objects.create(taxa=50, nome="Airbnb")
+        anuncio = Anuncio.objects.create(imovel=self.imovel1, plataforma=plataforma_anuncio)
+        Reserva.objects.create(anuncio=anuncio, data_checkin="2030-07-01", data_checkout="2030-07-05")
+        
+        def falha(sender, ids, **kwargs):
+            raise RuntimeError('falha no receptor')
+        
+        desativados.connect(falha, sender=Reserva, dispatch_uid='teste_falha_cascata')
+        self.addCleanup(desativados.disconnect, sender=Reserva, dispatch_uid='teste_falha_cascata')
+        
+        with self.assertRaises(RuntimeError):
+            self.imovel1.delete()
+        with self.assertRaises(RuntimeError):
+            Imovel.objects.filter(pk=self.imovel1.pk).delete()
+        
+        # Nada foi desativado, nem o objeto em memória
+        self.assertTrue(self.imovel1.ativo)
+        self.assertTrue(Imovel.objects.filter(pk=self.imovel1.pk).exists())
+        self.assertTrue(Anuncio.objects.filter(pk=anuncio.pk).exists())
+        self.assertEqual(Reserva.objects.filter(anuncio=anuncio).count(), 1)
+        
+    '''
+        Teste que verifica se o soft delete de um objeto grava somente o ativo e o data_hora_atualizacao
+    '''
+    def test_delete_imovel_update_fields(self):
+        
+        # Alteração feita por outro processo, que não pode ser sobrescrita pelo delete
+        Imovel.objects.filter(pk=self.imovel1.pk).update(valor_limpeza=999)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.imovel1.delete()
+        
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "imovel"'))
+        self.assertNotIn('valor_limpeza', update)
+        
+        self.imovel1.refresh_from_db()
+        self.assertEqual(self.imovel1.ativo, False)
+        self.assertEqual(self.imovel1.valor_limpeza, 999)
+        
+    '''
+        Teste que verifica a paginação por cursor da listagem de imóveis
+    '''
+    def test_list_imoveis_pagination(self):
+        
+        url = reverse('imovel-list')
+        response = self.client.get(url, {'page_size': 1})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel1.id])
+        
+        response = self.client.get(response.data['next'])
+        
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel2.id])
+        self.assertIsNone(response.data['next'])
+        
+    '''
+        Teste que verifica o calendário de disponibilidade do imóvel e a sua atualização ao criar/cancelar reservas
+    '''
+    def test_disponibilidade_imovel(self):
+        
+        hoje = timezone.now().date()
+        plataforma_anuncio = PlataformaAnuncio.objects.create(taxa=50, nome="Airbnb")
+        anuncio = Anuncio.objects.create(imovel=self.imovel1, plataforma=plataforma_anuncio)
+        Reserva.objects.create(anuncio=anuncio, data_checkin=hoje + timedelta(days=2), data_checkout=hoje + timedelta(days=4))
+        
+        url = reverse('imovel-disponibilidade', kwargs={'pk': self.imovel1.id})
+        params = {'inicio': str(hoje), 'fim': str(hoje + timedelta(days=7))}
+        
+        # Faz uma requisição GET para o endpoint
+        response = self.client.get(url, params)
+        
+        # Testa se a resposta tem status code 200 (OK)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # As noites dos dias 2 e 3 estão ocupadas (o dia do checkout fica livre)
+        self.assertFalse(response.data['disponivel'])
+        self.assertListEqual([dia['disponivel'] for dia in response.data['dias']], [True, True, False, False, True, True, True])
+        
+        # O mapa em cache é lido sem consultar as reservas novamente
+        # (somente o imóvel é consultado, o usuário já está no cache da autenticação)
+        with self.assertNumQueries(1):
+            self.client.get(url, params)
+        
+        # Uma nova reserva é marcada no mapa em cache após o commit, sem reconstruí-lo
+        with self.captureOnCommitCallbacks() as callbacks:
+            reserva = Reserva.objects.create(anuncio=anuncio, data_checkin=str(hoje + timedelta(days=5)), data_checkout=str(hoje + timedelta(days=6)))
+        response = self.client.get(url, params)
+        self.assertListEqual([dia['disponivel'] for dia in response.data['dias']], [True, True, False, False, True, True, True])
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertListEqual([dia['disponivel'] for dia in response.data['dias']], [True, True, False, False, True, False, True])
+        
+        # Uma reserva cancelada libera as noites
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertListEqual([dia['disponivel'] for dia in response.data['dias']], [True, True, False, False, True, True, True])
+        
+        # Reservas canceladas em cascata (anúncio desativado) também
+        with self.captureOnCommitCallbacks(execute=True):
+            anuncio.delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertTrue(response.data['disponivel'])
+        
+        # Período fora das reservas
+        response = self.client.get(url, {'inicio': str(hoje + timedelta(days=10)), 'fim': str(hoje + timedelta(days=12))})
+        self.assertTrue(response.data['disponivel'])
+        
+        # Parâmetros inválidos
+        response = self.client.get(url, {'inicio': str(hoje + timedelta(days=3)), 'fim': str(hoje)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'inicio': str(hoje)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que a autenticação JWT não consulta o usuário a cada requisição,
+        mas deixa de aceitar o token quando o usuário é desativado ou removido
+    '''
+    def test_autenticacao_sem_consulta_usuario(self):
+        
+        url = reverse('imovel-list')
+        
+        # A primeira requisição verifica o usuário, as seguintes usam o cache
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries.captured_queries if 'auth_user' in query['sql']])
+        
+        # Usuário desativado
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        # Usuário reativado
+        self.user.is_active = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Usuário removido
+        self.user.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    '''
+        Teste que verifica o cache da busca de um imóvel por id e a sua invalidação ao alterar ou deletar o imóvel
+    '''
+    def test_get_single_imovel_cache(self):
+        
+        url = reverse('imovel-detail', kwargs={'pk': self.imovel1.id})
+        self.client.get(url)
+        
+        # A segunda busca é respondida pelo cache, sem consultas
+        estatisticas = estatisticas_cache()
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['limite_hospedes'], 2)
+        self.assertEqual(estatisticas_cache()['hits'], estatisticas['hits'] + 1)
+        
+        # Requisição condicional respondida pelo cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # Parâmetros diferentes são outra entrada do cache
+        response = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(response.data, {'id': self.imovel1.id})
+        
+        # Alterar outro imóvel não invalida a resposta
+        self.imovel2.valor_limpeza = 200
+        self.imovel2.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        # Um id fora da forma canônica ("01") não usa o cache, que não seria invalidado pelo PATCH
+        url_zero = '/imoveis/0%d/' % self.imovel1.id
+        self.assertEqual(self.client.get(url_zero).data['limite_hospedes'], 2)
+        
+        # O PATCH invalida a resposta do imóvel
+        self.client.patch(url, {'limite_hospedes': 5})
+        response = self.client.get(url)
+        self.assertEqual(response.data['limite_hospedes'], 5)
+        self.assertEqual(self.client.get(url_zero).data['limite_hospedes'], 5)
+        
+        # O soft delete também
+        self.client.delete(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+    '''
+        Teste que verifica que as estatísticas do cache são restritas aos administradores
+    '''
+    def test_estatisticas_cache(self):
+        
+        url = reverse('cache_estatisticas')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', response.data)
+        self.assertIn('misses', response.data)
+        
+    '''
+        Teste que verifica as medidas das requisições: cabeçalho Server-Timing, log estruturado
+        e histogramas por rota, restritos aos administradores
+    '''
+    def test_instrumentacao(self):
+        
+        metricas.limpa()
+        url = reverse('imovel-list')
+        
+        with self.assertLogs('imobiliaria.instrumentacao', 'INFO') as logs, self.settings(INSTRUMENTACAO_SERVER_TIMING=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'fields': 'id'})
+        consultas = len(queries)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="%d consultas", ser;dur=[\d.]+, total;dur=[\d.]+$' % consultas)
+        
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['rota'], 'GET imovel-list')
+        self.assertEqual(registro['consultas'], consultas)
+        self.assertEqual(registro['bytes'], len(response.content))
+        
+        # Por padrão o Server-Timing não é enviado para quem não é administrador
+        response = self.client.get(reverse('imovel-detail', kwargs={'pk': self.imovel1.id}))
+        self.assertNotIn('Server-Timing', response)
+        self.client.get(reverse('imovel-detail', kwargs={'pk': 9999}))
+        
+        url = reverse('metricas_rotas')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', response)
+        
+        # Os detalhes de imóveis diferentes ficam na mesma rota
+        rotas = response.data['rotas']
+        self.assertEqual(rotas['GET imovel-detail']['requisicoes'], 2)
+        self.assertEqual(rotas['GET imovel-list']['requisicoes'], 1)
+        self.assertEqual(rotas['GET imovel-list']['consultas']['maximo'], consultas)
+        self.assertEqual(sum(rotas['GET imovel-list']['histograma_ms'].values()), 1)
+        
+    '''
+        Teste que verifica a sincronização incremental dos imóveis, respeitando o atraso para transações em andamento
+    '''
+    def test_changes_imoveis(self):
+        
+        url = reverse('imovel-changes')
+        
+        # Imóveis alterados há menos de SINCRONIZACAO_ATRASO segundos ainda não são retornados
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data['results'], [])
+        
+        with self.settings(SINCRONIZACAO_ATRASO=0):
+            response = self.client.get(url, {'fields': 'id,limite_hospedes'})
+        self.assertListEqual(response.data['results'], [
+            {'id': self.imovel1.id, 'limite_hospedes': 2, 'removido': False},
+            {'id': self.imovel2.id, 'limite_hospedes': 3, 'removido': False},
+        ])
+        
+    '''
+        Teste que verifica a criação e a atualização em massa de imóveis, com os erros reportados por linha
+    '''
+    def test_bulk_imoveis(self):
+        
+        url = reverse('imovel-imovel_bulk')
+        
+        data = [
+            # Linha 1: válida
+            {'limite_hospedes': 4, 'valor_limpeza': 80},
+            # Linha 2: limite de hóspedes inválido
+            {'limite_hospedes': 0},
+            # Linha 3: válida
+            {'limite_hospedes': 6, 'aceita_animais': True},
+        ]
+        response = self.client.post(url, data, format='json')
+        
+        # Verifica se a resposta tem status code 207 (somente parte dos imóveis foi criada)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['criados'], 2)
+        self.assertListEqual([imovel['linha'] for imovel in response.data['imoveis']], [1, 3])
+        self.assertListEqual([erro['linha'] for erro in response.data['erros']], [2])
+        self.assertEqual(Imovel.objects.count(), 4)
+        self.assertListEqual(
+            [imovel['id'] for imovel in response.data['imoveis']],
+            list(Imovel.objects.filter(limite_hospedes__in=[4, 6]).order_by('id').values_list('id', flat=True))
+        )
+        
+        # Sem RETURNING no INSERT em massa (MySQL) os ids vêm do LAST_INSERT_ID(), emulado no SQLite pelo último
+        # rowid e pelo número de linhas do INSERT
+        def primeiro_id(conexao):
+            with conexao.cursor() as cursor:
+                cursor.execute('SELECT last_insert_rowid() - changes() + 1, 1')
+                return cursor.fetchone()
+        
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch('abstracts.importacao._primeiro_id', side_effect=primeiro_id):
+            response = self.client.post(url, [{'limite_hospedes': 7}, {'limite_hospedes': 8}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertListEqual(
+            [Imovel.objects.get(pk=imovel['id']).limite_hospedes for imovel in response.data['imoveis']], [7, 8]
+        )
+        
+        data = [
+            # Linha 1: altera somente o valor da limpeza
+            {'id': self.imovel1.id, 'valor_limpeza': 120},
+            # Linha 2: imóvel inexistente
+            {'id': 999, 'valor_limpeza': 120},
+            # Linha 3: sem alteração, não é gravado
+            {'id': self.imovel2.id, 'limite_hospedes': 3},
+            # Linha 4: imóvel repetido no lote
+            {'id': self.imovel1.id, 'limite_hospedes': 9},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['atualizados'], 2)
+        self.assertListEqual([erro['linha'] for erro in response.data['erros']], [2, 4])
+        
+        # Somente o imóvel 1 é gravado, com o valor da limpeza e o data_hora_atualizacao
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"valor_limpeza"', updates[0])
+        self.assertNotIn('"limite_hospedes"', updates[0])
+        
+        self.imovel1.refresh_from_db()
+        self.assertEqual(self.imovel1.valor_limpeza, 120)
+        self.assertEqual(self.imovel1.limite_hospedes, 2)
+        
+        
+        # O ativo não é alterado pelo PATCH (a desativação é feita pelo DELETE, em cascata)
+        response = self.client.patch(url, [{'id': self.imovel1.id, 'ativo': False}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Imovel.objects.filter(pk=self.imovel1.id).exists())
+        
+    '''
+        Teste que verifica a validação de vários ids de imóveis com uma única consulta (RelacionadoField com many=True)
+    '''
+    def test_relacionado_field_many(self):
+        
+        class ImoveisSerializer(serializers.Serializer):
+            imoveis = RelacionadoField(Imovel, many=True)
+        
+        serializer = ImoveisSerializer(data={'imoveis': [self.imovel1.id, str(self.imovel2.id), self.imovel1.id]})
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertListEqual(serializer.validated_data['imoveis'], [self.imovel1, self.imovel2, self.imovel1])
+        
+        # Imóvel inativo ou inexistente
+        self.imovel2.delete()
+        serializer = ImoveisSerializer(data={'imoveis': [self.imovel1.id, self.imovel2.id, 999]})
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('imoveis', serializer.errors)
+        
+    '''
+        Teste que verifica a busca de imóveis por filtros de igualdade, intervalo e booleano, com ordenação e paginação
+    '''
+    def test_busca_imoveis(self):
+        
+        # imovel1: 2 hóspedes, aceita animais, limpeza 100 / imovel2: 3 hóspedes, não aceita, limpeza 150
+        imovel3 = Imovel.objects.create(limite_hospedes=6, aceita_animais=True, valor_limpeza=50)
+        imovel4 = Imovel.objects.create(limite_hospedes=4, aceita_animais=True, valor_limpeza=200)
+        
+        url = reverse('imovel-list')
+        
+        # Booleano + intervalo, ordenado pelo campo do intervalo
+        response = self.client.get(url, {'aceita_animais': 'true', 'limite_hospedes_min': 3, 'ordering': '-limite_hospedes'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [imovel3.id, imovel4.id])
+        
+        # Intervalo de valor de limpeza, paginado por cursor na ordem do valor e somente com alguns campos
+        response = self.client.get(url, {'valor_limpeza_min': 60, 'valor_limpeza_max': 200, 'ordering': 'valor_limpeza', 'page_size': 2, 'fields': 'id'})
+        self.assertListEqual(response.data['results'], [{'id': self.imovel1.id}, {'id': self.imovel2.id}])
+        response = self.client.get(response.data['next'])
+        self.assertListEqual(response.data['results'], [{'id': imovel4.id}])
+        
+        # Intervalo sem ?ordering=: ordenado pela coluna do índice
+        response = self.client.get(url, {'limite_hospedes_min': 3})
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel2.id, imovel4.id, imovel3.id])
+        
+        # Igualdade
+        response = self.client.get(url, {'limite_hospedes': 3})
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel2.id])
+        
+        # Valor inválido
+        response = self.client.get(url, {'limite_hospedes_min': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('limite_hospedes_min', response.data)
+        
+        # Combinação sem índice (dois intervalos) e ordenação sem índice para o filtro
+        response = self.client.get(url, {'limite_hospedes_min': 2, 'valor_limpeza_max': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('filtros', response.data)
+        
+        response = self.client.get(url, {'aceita_animais': 'true', 'ordering': 'quant_banheiros'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data)
+        
+    '''
+        Teste que verifica a paginação de uma busca ordenada por uma coluna com valores repetidos:
+        o cursor guarda a posição completa (coluna, id), sem o deslocamento limitado do CursorPagination do DRF
+    '''
+    def test_busca_imoveis_paginacao_empates(self):
+        
+        imoveis = [self.imovel2.id] + [Imovel.objects.create(limite_hospedes=4).id for _ in range(11)]
+        url = reverse('imovel-list')
+        
+        # Com o deslocamento limitado a 2 a paginação anterior repetia a mesma página
+        with mock.patch.object(KeysetPagination, 'offset_cutoff', 2):
+            response = self.client.get(url, {'limite_hospedes_min': 3, 'page_size': 5, 'fields': 'id'})
+            ids = [imovel['id'] for imovel in response.data['results']]
+            for _ in range(5):
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+                ids += [imovel['id'] for imovel in response.data['results']]
+            self.assertListEqual(ids, imoveis)
+            
+            # E volta pelas páginas anteriores
+            ids = []
+            for _ in range(5):
+                if not response.data['previous']:
+                    break
+                response = self.client.get(response.data['previous'])
+                ids = [imovel['id'] for imovel in response.data['results']] + ids
+            self.assertListEqual(ids, imoveis[:10])
+        
+        # A página seguinte continua lendo o índice a partir da posição do cursor
+        self.assertUsaIndice(
+            Imovel.objects.filter(limite_hospedes__gte=3).filter(_depois_de(('limite_hospedes', 'id'), (4, imoveis[3]))).order_by('limite_hospedes', 'id'),
+            'imovel_busca_hospedes_idx'
+        )
+        
+        # Cursor inválido
+        response = self.client.get(url, {'limite_hospedes_min': 3, 'cursor': 'cD1hYmM='})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+    '''
+        Teste que verifica se as buscas aceitas usam os índices de busca do imóvel
+    '''
+    def test_busca_imoveis_indices(self):
+        
+        self.assertUsaIndice(
+            Imovel.objects.filter(aceita_animais=Value(True), limite_hospedes__gte=3).order_by('limite_hospedes', 'id'),
+            'imovel_busca_animais_idx'
+        )
+        self.assertUsaIndice(
+            Imovel.objects.filter(quant_banheiros=2, limite_hospedes__lte=4).order_by('limite_hospedes', 'id'),
+            'imovel_busca_banheiros_idx'
+        )
+        self.assertUsaIndice(Imovel.objects.filter(valor_limpeza__gte=50).order_by('valor_limpeza', 'id'), 'imovel_busca_limpeza_idx')
+        
+    '''
+        Teste que verifica a busca de imóveis disponíveis para N hóspedes em um período, em uma única consulta
+    '''
+    def test_imoveis_disponiveis(self):
+        
+        plataforma_anuncio = PlataformaAnuncio.objects.create(taxa=50, nome="Airbnb")
+        imovel3 = Imovel.objects.create(limite_hospedes=4, valor_limpeza=50)
+        imovel4 = Imovel.objects.create(limite_hospedes=5, valor_limpeza=50, data_ativacao="2030-08-01")
+        
+        # imovel2 ocupado de 03 a 06/07, imovel3 livre (reserva termina no checkin e reserva cancelada)
+        Reserva.objects.create(anuncio=Anuncio.objects.create(imovel=self.imovel2, plataforma=plataforma_anuncio), data_checkin="2030-07-03", data_checkout="2030-07-06")
+        anuncio3 = Anuncio.objects.create(imovel=imovel3, plataforma=plataforma_anuncio)
+        Reserva.objects.create(anuncio=anuncio3, data_checkin="2030-06-25", data_checkout="2030-07-01")
+        Reserva.objects.create(anuncio=anuncio3, data_checkin="2030-07-02", data_checkout="2030-07-04").delete()
+        
+        url = reverse('imovel-imovel_disponiveis')
+        params = {'hospedes': 3, 'data_checkin': "2030-07-01", 'data_checkout': "2030-07-05"}
+        
+        # Requisição inicial para preencher o cache do usuário na autenticação
+        self.client.get(url, params)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # imovel1 não comporta 3 hóspedes, imovel2 está ocupado e imovel4 ainda não foi ativado
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [imovel3.id])
+        
+        # A listagem é uma única consulta com NOT EXISTS (além da versão das tabelas para o ETag)
+        selects = [query['sql'] for query in queries.captured_queries if 'FROM "imovel"' in query['sql'] and 'MAX(' not in query['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('NOT EXISTS', selects[0])
+        
+        # Depois da ativação do imovel4, paginado na ordem do limite de hóspedes
+        params = {'hospedes': 3, 'data_checkin': "2030-08-01", 'data_checkout': "2030-08-05", 'page_size': 2}
+        response = self.client.get(url, params)
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel2.id, imovel3.id])
+        response = self.client.get(response.data['next'])
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [imovel4.id])
+        
+        # Uma nova reserva muda o ETag da busca
+        etag = response['ETag']
+        Reserva.objects.create(anuncio=anuncio3, data_checkin="2030-08-01", data_checkout="2030-08-03")
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([imovel['id'] for imovel in response.data['results']], [self.imovel2.id, imovel4.id])
+        
+        # Período inválido
+        response = self.client.get(url, {'hospedes': 2, 'data_checkin': "2030-08-05", 'data_checkout': "2030-08-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica a paginação da busca de imóveis disponíveis com muitos imóveis do mesmo limite de hóspedes
+    '''
+    def test_imoveis_disponiveis_paginacao_empates(self):
+        
+        imoveis = [self.imovel2.id] + [Imovel.objects.create(limite_hospedes=3).id for _ in range(11)]
+        url = reverse('imovel-imovel_disponiveis')
+        params = {'hospedes': 3, 'data_checkin': "2030-07-01", 'data_checkout': "2030-07-05", 'page_size': 5, 'fields': 'id'}
+        
+        # Com o deslocamento limitado a 2 a paginação anterior repetia a mesma página
+        with mock.patch.object(KeysetPagination, 'offset_cutoff', 2):
+            response = self.client.get(url, params)
+            ids = [imovel['id'] for imovel in response.data['results']]
+            for _ in range(5):
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+                ids += [imovel['id'] for imovel in response.data['results']]
+        
+        self.assertListEqual(ids, imoveis)
+        
+    '''
+        Teste que verifica se a busca de imóveis disponíveis usa os índices do imóvel e da reserva
+    '''
+    def test_imoveis_disponiveis_indices(self):
+        
+        imoveis = imoveis_disponiveis(3, date(2030, 7, 1), date(2030, 7, 5)).order_by('limite_hospedes', 'id')
+        self.assertUsaIndice(imoveis, 'imovel_busca_hospedes_idx')
+        self.assertUsaIndice(imoveis, 'reserva_imovel_periodo_idx')
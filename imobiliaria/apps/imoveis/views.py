@@ -1,16 +1,34 @@
 from rest_framework import viewsets
 from .models import Imovel
 from .serializers import *
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from abstracts.autenticacao import JWTStatelessAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from apps.reservas.ocupacao import calendario
+from apps.reservas.disponibilidade import imoveis_disponiveis
+from apps.reservas.models import Reserva
+from abstracts.views import LeituraPlanaMixin, SincronizacaoMixin
+from abstracts.cache_respostas import CacheRespostaMixin
+from abstracts.filtros import BuscaIndexadaFilter, busca_da_requisicao
+from abstracts.condicional import versao_tabela
+from rest_framework.parsers import JSONParser
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from abstracts.parsers import NDJSONParser
+from abstracts.importacao import status_importacao
+from .importacao import importa_imoveis, atualiza_imoveis
 
 '''
     CRUD de Imóvel
 '''
-class ImovelViewSet(viewsets.ModelViewSet):
+class ImovelViewSet(CacheRespostaMixin, LeituraPlanaMixin, SincronizacaoMixin, viewsets.ModelViewSet):
+    
+    # Busca por id com a resposta em cache (ver abstracts/cache_respostas.py)
+    cache_actions = ('retrieve',)
     
     # Definindo a classe de autenticação
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTStatelessAuthentication]
 
     # Somente usuários autenticados podem acessar os métodos da ImovelViewSet
     permission_classes = [IsAuthenticated]
@@ -18,11 +36,40 @@ class ImovelViewSet(viewsets.ModelViewSet):
     # Definição dos métodos disponíveis    
     http_method_names = ['get', 'post', 'patch', 'delete']
     
+    # Filtros da listagem, restritos às combinações cobertas pelos índices de busca do imóvel (ver abstracts/filtros.py)
+    # Ex: /imoveis/?aceita_animais=true&limite_hospedes_min=4&ordering=limite_hospedes
+    filter_backends = [BuscaIndexadaFilter]
+    filtros = {
+        'limite_hospedes': 'intervalo',
+        'quant_banheiros': 'intervalo',
+        'valor_limpeza': 'intervalo',
+        'aceita_animais': 'booleano',
+    }
+    buscas_indexadas = (
+        'imovel_busca_hospedes_idx',
+        'imovel_busca_animais_idx',
+        'imovel_busca_banheiros_idx',
+        'imovel_busca_limpeza_idx',
+        'imovel_busca_animais_limp_idx',
+    )
+    
     '''
-        Definição do queryset para considerar que os que tenham ativo=0 "não existem"
+        Definição do queryset para considerar que os que tenham ativo=0 "não existem" (o manager padrão retorna somente os ativos)
     '''
     def get_queryset(self):
-        return Imovel.objects.filter(ativo=True)
+        return Imovel.objects.all()
+    
+    '''
+        Nas buscas o ETag usa a versão da tabela (ver abstracts/condicional.py), que não depende do número de imóveis encontrados
+    '''
+    def versao_resposta(self, queryset, serializer_class):
+        if self.action == 'list' and busca_da_requisicao(self.request, queryset, self) is not None:
+            return versao_tabela(Imovel)
+        
+        # A disponibilidade também muda com as reservas, então a versão considera as duas tabelas
+        if self.action == 'disponiveis':
+            return versao_tabela(Imovel, Reserva)
+        return super().versao_resposta(queryset, serializer_class)
     
     '''
         Definição dos serializers para cada método da VIEW
@@ -30,4 +77,73 @@ class ImovelViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return ImovelCreateSerializer
-        return ImovelSerializer  # caso contrário, o padrão é usado
\ No newline at end of file
+        return ImovelSerializer  # caso contrário, o padrão é usado
+    
+    '''
+        View referente ao calendário de disponibilidade do imóvel no período [inicio, fim)
+        Respondida a partir do mapa de ocupação em cache (ver apps/reservas/ocupacao.py), sem listar as reservas
+    '''
+    @action(detail=True, methods=['GET'], url_path='disponibilidade', url_name='disponibilidade')
+    def disponibilidade(self, request, pk=None):
+        
+        # Garante que o imóvel existe e está ativo
+        imovel = self.get_object()
+        
+        # Usa o Serializer para validar a entrada
+        serializer = DisponibilidadeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        inicio = serializer.validated_data['inicio']
+        fim = serializer.validated_data['fim']
+        
+        dias = calendario(imovel.id, inicio, fim)
+        
+        return Response({
+            'imovel': imovel.id,
+            'inicio': inicio,
+            'fim': fim,
+            'disponivel': all(disponivel for _, disponivel in dias),
+            'dias': [{'data': data, 'disponivel': disponivel} for data, disponivel in dias]
+        })
+
+    '''
+        View referente a criação (POST) e atualização (PATCH) em massa de imóveis, recebendo uma lista JSON ou um corpo NDJSON
+        As linhas válidas são gravadas e as inválidas são retornadas com os seus erros (ver apps/imoveis/importacao.py)
+    '''
+    @action(detail=False, methods=['POST', 'PATCH'], url_path='bulk', url_name='imovel_bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        
+        if not isinstance(request.data, list):
+            raise ValidationError("Por favor, forneça uma lista de imóveis.")
+        
+        # 201/200 se todas as linhas foram gravadas, 207 se somente algumas e 400 se nenhuma
+        if request.method == 'POST':
+            relatorio = importa_imoveis(request.data)
+            status_code = status_importacao(relatorio['criados'], relatorio['erros'])
+        else:
+            relatorio = atualiza_imoveis(request.data)
+            status_code = status_importacao(relatorio['atualizados'], relatorio['erros'], status.HTTP_200_OK)
+        
+        return Response(relatorio, status=status_code)
+    
+    '''
+        View referente a busca dos imóveis disponíveis para N hóspedes no período [data_checkin, data_checkout),
+        em uma única consulta (ver apps/reservas/disponibilidade.py), paginada na ordem (limite_hospedes, id)
+        Ex: /imoveis/disponiveis/?hospedes=4&data_checkin=2030-07-01&data_checkout=2030-07-05
+    '''
+    @action(detail=False, methods=['GET'], url_path='disponiveis', url_name='imovel_disponiveis')
+    def disponiveis(self, request):
+        
+        # Usa o Serializer para validar a entrada
+        serializer = ImoveisDisponiveisSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        imoveis = imoveis_disponiveis(
+            serializer.validated_data['hospedes'],
+            serializer.validated_data['data_checkin'],
+            serializer.validated_data['data_checkout']
+        )
+        
+        # Pagina pela ordem do índice (ativo, limite_hospedes, id), que a consulta percorre:
+        # o cursor guarda o limite_hospedes e o id do último imóvel (ver abstracts/pagination.py)
+        self.ordenacao_paginacao = ('limite_hospedes', 'id')
+        return self.lista(imoveis, ImovelSerializer)
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class ReservasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.reservas'
\ No newline at end of file
+    name = 'apps.reservas'
+
+    def ready(self):
+        # Registra os signals do app
+        from . import signals
@@ -0,0 +1,101 @@
+from decimal import Decimal, ROUND_HALF_UP
+from rest_framework import serializers
+from abstracts.importacao import valida_linhas
+from abstracts.serializers import RelacionadoField
+from apps.anuncios.models import Anuncio
+
+'''
+    Cotação de reservas (endpoint POST /reservas/cotacao/)
+
+    O valor é calculado no servidor, em Decimal com 2 casas (arredondamento comercial, ROUND_HALF_UP):
+        diarias = noites × valor_diaria
+        limpeza = Imovel.valor_limpeza (uma vez por reserva)
+        taxa    = PlataformaAnuncio.taxa % sobre (diarias + limpeza)
+        total   = diarias + limpeza + taxa
+    Os models não possuem o valor da diária, então ele é informado na cotação (0 quando omitido: somente limpeza e taxa).
+    Os campos FloatField do banco são convertidos pela sua representação em texto (Decimal(str(valor))),
+    para que 100.1 vire 100.10 e não 100.099999...
+
+    Um lote de cotações é validado com uma única consulta: todos os anúncios são buscados juntos,
+    com o imóvel e a plataforma no mesmo SELECT, e cada linha é calculada em memória.
+'''
+
+CENTAVOS = Decimal('0.01')
+
+'''
+    Serializer responsável por validar cada linha da cotação
+'''
+class CotacaoSerializer(serializers.Serializer):
+
+    anuncio_id = RelacionadoField(
+        Anuncio, # Para validar que seja um id existente (e ativo)
+        select_related=('imovel', 'plataforma'), # Usados no cálculo, sem novas consultas
+        required=True,
+        error_messages={
+            'required': 'Por favor, forneça o ID do anúncio a ser cotado.',
+            'does_not_exist': 'O anúncio especificado não existe.'
+        },
+        source='anuncio'
+    )
+
+    data_checkin = serializers.DateField()
+
+    data_checkout = serializers.DateField()
+
+    valor_diaria = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, default=Decimal('0'), error_messages={
+        'invalid': 'O valor da diária deve ser um valor válido.'
+    })
+
+    def validate(self, attrs):
+        if attrs['data_checkin'] >= attrs['data_checkout']:
+            raise serializers.ValidationError("A data de check-in deve ser anterior à data de check-out.")
+        return attrs
+
+def _centavos(valor):
+    return valor.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+def _decimal(valor):
+    return _centavos(Decimal(str(valor or 0)))
+
+'''
+    Calcula a cotação de um anúncio (com imóvel e plataforma já carregados) para o período informado
+    Os valores são retornados como texto, como nos DecimalField do DRF
+'''
+def cota(anuncio, data_checkin, data_checkout, valor_diaria=Decimal('0')):
+    noites = (data_checkout - data_checkin).days
+    diarias = _centavos(valor_diaria * noites)
+    limpeza = _decimal(anuncio.imovel.valor_limpeza)
+    taxa = _centavos((diarias + limpeza) * Decimal(str(anuncio.plataforma.taxa or 0)) / 100)
+
+    return {
+        'anuncio_id': anuncio.id,
+        'imovel_id': anuncio.imovel_id,
+        'plataforma_id': anuncio.plataforma_id,
+        'data_checkin': data_checkin.isoformat(),
+        'data_checkout': data_checkout.isoformat(),
+        'noites': noites,
+        'valor_diaria': str(_centavos(valor_diaria)),
+        'diarias': str(diarias),
+        'limpeza': str(limpeza),
+        'taxa': str(taxa),
+        'valor_total': str(diarias + limpeza + taxa)
+    }
+
+'''
+    Cota uma lista de linhas (dicts) e retorna o relatório com as cotações e os erros de cada linha
+    (as linhas são numeradas a partir de 1, na ordem da lista)
+'''
+def cota_lote(linhas, context=None):
+    serializer = CotacaoSerializer(context=context or {})
+
+    # Todos os anúncios do lote em uma consulta (as linhas abaixo usam o cache do RelacionadoField)
+    serializer.fields['anuncio_id'].carrega([linha.get('anuncio_id') for linha in linhas if isinstance(linha, dict)])
+    validas, erros = valida_linhas(serializer, linhas)
+
+    return {
+        'cotacoes': [
+            {'linha': linha, **cota(dados['anuncio'], dados['data_checkin'], dados['data_checkout'], dados['valor_diaria'])}
+            for linha, dados in validas
+        ],
+        'erros': erros
+    }
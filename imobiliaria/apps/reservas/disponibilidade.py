@@ -0,0 +1,60 @@
+from django.db.models import Exists, OuterRef, Q
+from .models import Reserva
+from apps.imoveis.models import Imovel
+
+'''
+    Verificação de disponibilidade dos imóveis
+
+    Uma reserva ocupa as noites do intervalo semiaberto [data_checkin, data_checkout), ou seja,
+    o dia do checkout fica livre para um novo checkin.
+    Dois intervalos semiabertos [a, b) e [c, d) se sobrepõem se, e somente se, a < d e c < b,
+    então uma única condição substitui os 3 cenários de conflito e é resolvida pelo
+    índice (imovel, data_checkout, data_checkin) da tabela reserva, sem JOIN com anúncio.
+
+    O índice começa pela data de checkout porque a faixa percorrida é "data_checkout > checkin":
+    somente as reservas que terminam depois do novo checkin são lidas, e o histórico de reservas
+    passadas do imóvel não entra na busca, por maior que seja.
+'''
+
+'''
+    Reservas ativas do imóvel que ocupam alguma noite do período informado
+'''
+def reservas_conflitantes(imovel_id, data_checkin, data_checkout):
+    return Reserva.objects.filter(
+        imovel_id=imovel_id,
+        data_checkin__lt=data_checkout,
+        data_checkout__gt=data_checkin
+    )
+
+'''
+    True se o imóvel não possui reserva ativa no período informado
+'''
+def imovel_disponivel(imovel_id, data_checkin, data_checkout):
+    return not reservas_conflitantes(imovel_id, data_checkin, data_checkout).exists()
+
+'''
+    Bloqueia a linha do imóvel (SELECT ... FOR UPDATE) até o fim da transação atual.
+    Reservas concorrentes do mesmo imóvel ficam em fila, enquanto reservas de imóveis diferentes não se bloqueiam.
+    Deve ser chamada dentro de um transaction.atomic()
+'''
+def bloqueia_imovel(imovel_id):
+    list(Imovel.all_objects.select_for_update().filter(pk=imovel_id).values_list('id', flat=True))
+
+'''
+    Imóveis ativos que comportam "hospedes" e não possuem reserva ativa no período, em uma única consulta:
+    o NOT EXISTS (anti-join) é resolvido por imóvel no índice (imovel, ativo, data_checkout, data_checkin) da reserva,
+    pela mesma condição de sobreposição de reservas_conflitantes, e os imóveis são percorridos pelo índice
+    (ativo, limite_hospedes, id), na ordem (limite_hospedes, id) usada pela paginação
+    Imóveis com data de ativação posterior ao checkin também ficam de fora.
+'''
+def imoveis_disponiveis(hospedes, data_checkin, data_checkout):
+    ocupado = Reserva.objects.filter(
+        imovel_id=OuterRef('pk'),
+        data_checkin__lt=data_checkout,
+        data_checkout__gt=data_checkin
+    )
+    return Imovel.objects.filter(
+        Q(data_ativacao__isnull=True) | Q(data_ativacao__lte=data_checkin),
+        ~Exists(ocupado),
+        limite_hospedes__gte=hospedes
+    )
@@ -0,0 +1,179 @@
+from bisect import bisect_left
+from django.db import transaction, IntegrityError
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from apps.anuncios.models import Anuncio
+from apps.imoveis.models import Imovel
+from .models import Reserva, generate_random_code, TENTATIVAS_CODIGO
+from .ocupacao import atualiza_ocupacao
+from .resumo import atualiza_resumo
+
+'''
+    Importação em massa de reservas (endpoint POST /reservas/bulk/ e comando manage.py importa_reservas)
+
+    Em vez de validar cada reserva com as suas próprias consultas, o lote inteiro é validado com um número fixo de consultas:
+        1. os campos de cada linha são validados sem acessar o banco
+        2. todos os anúncios referenciados são buscados em uma consulta
+        3. os imóveis do lote são bloqueados e as reservas ativas que podem conflitar são buscadas em uma consulta
+        4. os conflitos (com reservas existentes e entre as linhas do lote) são verificados em memória, por imóvel
+        5. as linhas válidas são gravadas com bulk_create em blocos de TAMANHO_LOTE
+    Diferente da criação individual, datas no passado são aceitas, já que a importação inclui o histórico de reservas.
+'''
+
+# Quantidade de reservas por INSERT
+TAMANHO_LOTE = 1000
+
+'''
+    Serializer responsável por validar os campos de cada linha da importação (sem acessar o banco)
+'''
+class ReservaImportacaoSerializer(serializers.Serializer):
+
+    anuncio_id = serializers.IntegerField(required=True, error_messages={
+        'required': 'Por favor, forneça o ID do anúncio que a reserva é vinculada.',
+        'invalid': 'O ID do anúncio deve ser um número inteiro.'
+    })
+
+    comentario = serializers.CharField(required=False, allow_blank=True, default='')
+
+    valor_total = serializers.FloatField(required=False, min_value=0, default=0, error_messages={
+        'invalid': 'O valor total deve ser um valor válido.'
+    })
+
+    data_checkin = serializers.DateField()
+
+    data_checkout = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['data_checkin'] >= attrs['data_checkout']:
+            raise serializers.ValidationError("A data de check-in deve ser anterior à data de check-out.")
+        return attrs
+
+'''
+    Períodos [checkin, checkout) já ocupados de um imóvel, ordenados e sem sobreposição
+'''
+class PeriodosOcupados:
+
+    def __init__(self, periodos):
+        self.inicios = []
+        self.fins = []
+
+        # Une os períodos sobrepostos para que a busca só precise olhar os vizinhos
+        for inicio, fim in sorted(periodos):
+            if self.fins and inicio < self.fins[-1]:
+                self.fins[-1] = max(self.fins[-1], fim)
+            else:
+                self.inicios.append(inicio)
+                self.fins.append(fim)
+
+    '''
+        Ocupa o período, caso esteja livre. Retorna False se conflitar com um período já ocupado
+    '''
+    def ocupa(self, inicio, fim):
+        posicao = bisect_left(self.inicios, inicio)
+
+        # Conflita com o período anterior (que termina depois do início) ou com o próximo (que começa antes do fim)
+        if posicao > 0 and self.fins[posicao - 1] > inicio:
+            return False
+        if posicao < len(self.inicios) and self.inicios[posicao] < fim:
+            return False
+
+        self.inicios.insert(posicao, inicio)
+        self.fins.insert(posicao, fim)
+        return True
+
+'''
+    Importa uma lista de reservas (dicts) e retorna o relatório com as reservas criadas e os erros de cada linha
+    (as linhas são numeradas a partir de 1, na ordem da lista)
+'''
+def importa_reservas(linhas):
+    erros = []
+    validas = []
+
+    # 1. Validação dos campos de cada linha
+    serializer = ReservaImportacaoSerializer()
+    for linha, dados in enumerate(linhas, start=1):
+        try:
+            validas.append((linha, serializer.run_validation(dados)))
+        except serializers.ValidationError as e:
+            erros.append({'linha': linha, 'erros': e.detail})
+
+    # 2. Busca dos anúncios referenciados, em uma consulta
+    anuncios = dict(
+        Anuncio.objects.filter(id__in={dados['anuncio_id'] for _, dados in validas}).values_list('id', 'imovel_id')
+    )
+
+    por_imovel = {}
+    for linha, dados in validas:
+        if dados['anuncio_id'] not in anuncios:
+            erros.append({'linha': linha, 'erros': {'anuncio_id': ['O anúncio especificado não existe.']}})
+            continue
+        por_imovel.setdefault(anuncios[dados['anuncio_id']], []).append((linha, dados))
+
+    criadas = []
+    with transaction.atomic():
+
+        if por_imovel:
+
+            # 3. Bloqueia os imóveis do lote (em ordem de id, para evitar deadlock com outras importações)
+            # e busca as reservas ativas que podem conflitar com o lote, em uma consulta
+            list(Imovel.objects.select_for_update().filter(pk__in=por_imovel).order_by('id').values_list('id', flat=True))
+
+            inicio = min(dados['data_checkin'] for linhas_imovel in por_imovel.values() for _, dados in linhas_imovel)
+            fim = max(dados['data_checkout'] for linhas_imovel in por_imovel.values() for _, dados in linhas_imovel)
+
+            existentes = {}
+            for imovel_id, data_checkin, data_checkout in Reserva.objects.filter(
+                imovel_id__in=por_imovel, data_checkin__lt=fim, data_checkout__gt=inicio
+            ).values_list('imovel_id', 'data_checkin', 'data_checkout'):
+                existentes.setdefault(imovel_id, []).append((data_checkin, data_checkout))
+
+            # 4. Verificação dos conflitos em memória, por imóvel, na ordem das linhas
+            for imovel_id, linhas_imovel in por_imovel.items():
+                ocupados = PeriodosOcupados(existentes.get(imovel_id, []))
+                for linha, dados in linhas_imovel:
+                    if not ocupados.ocupa(dados['data_checkin'], dados['data_checkout']):
+                        erros.append({'linha': linha, 'erros': {api_settings.NON_FIELD_ERRORS_KEY: ['A reserva conflita com uma reserva existente para o mesmo imóvel.']}})
+                        continue
+                    criadas.append((linha, Reserva(
+                        anuncio_id=dados['anuncio_id'],
+                        imovel_id=imovel_id,
+                        codigo=generate_random_code(),
+                        comentario=dados['comentario'],
+                        valor_total=dados['valor_total'],
+                        data_checkin=dados['data_checkin'],
+                        data_checkout=dados['data_checkout']
+                    )))
+
+        # 5. Gravação em blocos
+        criadas.sort(key=lambda item: item[0])
+        for posicao in range(0, len(criadas), TAMANHO_LOTE):
+            _grava_bloco([reserva for _, reserva in criadas[posicao:posicao + TAMANHO_LOTE]])
+
+    # O bulk_create não dispara o post_save, então as noites das reservas criadas são marcadas nos mapas de ocupação
+    # e o resumo dos relatórios é recalculado
+    atualiza_ocupacao(((reserva.imovel_id, reserva.data_checkin, reserva.data_checkout) for _, reserva in criadas), ocupado=True)
+    atualiza_resumo((reserva.imovel_id, reserva.data_checkin) for _, reserva in criadas)
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return {
+        'criadas': len(criadas),
+        'reservas': [{'linha': linha, 'codigo': reserva.codigo} for linha, reserva in criadas],
+        'erros': erros
+    }
+
+'''
+    Grava um bloco de reservas, gerando novos códigos caso algum colida com um código existente
+'''
+def _grava_bloco(reservas):
+    for tentativa in range(TENTATIVAS_CODIGO):
+        try:
+            with transaction.atomic():
+                Reserva.objects.bulk_create(reservas)
+            return
+        except IntegrityError:
+            codigos = [reserva.codigo for reserva in reservas]
+            colisao = len(set(codigos)) < len(codigos) or Reserva.all_objects.filter(codigo__in=codigos).exists()
+            if tentativa == TENTATIVAS_CODIGO - 1 or not colisao:
+                raise
+            for reserva in reservas:
+                reserva.codigo = generate_random_code()
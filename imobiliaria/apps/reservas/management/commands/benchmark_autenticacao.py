@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.imoveis.models import Imovel
+from apps.imoveis.views import ImovelViewSet
+from abstracts.autenticacao import JWTStatelessAuthentication
+from abstracts.benchmark import banco_de_testes, mediana_ms
+
+'''
+    Compara as requisições por segundo em GET /imoveis/ autenticando com o JWTAuthentication do simplejwt
+    (consulta o usuário a cada requisição) e com o JWTStatelessAuthentication (ver abstracts/autenticacao.py)
+
+    Uso: python manage.py benchmark_autenticacao --requisicoes 500
+'''
+class Command(BaseCommand):
+    help = 'Compara as requisições por segundo em /imoveis/ com e sem a consulta do usuário na autenticação'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=500)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            Imovel.objects.bulk_create([Imovel(limite_hospedes=2) for _ in range(options['page_size'])])
+
+            user = User.objects.create_user(username='benchmark', password='benchmark@123')
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(user)))
+
+            url = reverse('imovel-list')
+            params = {'page_size': options['page_size']}
+            classes_originais = ImovelViewSet.authentication_classes
+
+            self.stdout.write('%d requisições GET %s' % (options['requisicoes'], url))
+            self.stdout.write('%30s %12s %12s' % ('autenticação', 'mediana (ms)', 'req/s'))
+
+            try:
+                for classe in (JWTAuthentication, JWTStatelessAuthentication):
+                    ImovelViewSet.authentication_classes = [classe]
+
+                    # Requisição inicial (preenche o cache da autenticação)
+                    assert client.get(url, params).status_code == 200
+
+                    tempo = mediana_ms(lambda: client.get(url, params), options['requisicoes'])
+                    self.stdout.write('%30s %12.3f %12.0f' % (classe.__name__, tempo, 1000 / tempo))
+            finally:
+                ImovelViewSet.authentication_classes = classes_originais
@@ -0,0 +1,86 @@
+import random
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.imoveis.models import Imovel
+from apps.imoveis.views import ImovelViewSet
+from abstracts.benchmark import banco_de_testes, mediana_ms
+
+'''
+    Mede a latência das buscas em GET /imoveis/ (ver abstracts/filtros.py) em uma tabela com muitos imóveis,
+    com os índices de busca e depois sem eles, e o tempo de baixar todos os imóveis para filtrar no cliente
+
+    Uso: python manage.py benchmark_busca --imoveis 1000000
+'''
+class Command(BaseCommand):
+    help = 'Mede a latência das buscas de imóveis com e sem os índices de busca'
+
+    # Buscas medidas: (descrição, parâmetros)
+    BUSCAS = (
+        ('hospedes >= 8', {'limite_hospedes_min': 8}),
+        ('animais + hospedes >= 6', {'aceita_animais': 'true', 'limite_hospedes_min': 6, 'ordering': 'limite_hospedes'}),
+        ('banheiros = 3 + hospedes <= 4', {'quant_banheiros': 3, 'limite_hospedes_max': 4}),
+        ('limpeza [50, 60]', {'valor_limpeza_min': 50, 'valor_limpeza_max': 60, 'ordering': 'valor_limpeza'}),
+        ('animais + limpeza <= 20', {'aceita_animais': 'false', 'valor_limpeza_max': 20, 'ordering': '-valor_limpeza'}),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imoveis', type=int, default=1000000)
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            self.cria_imoveis(options['imoveis'])
+
+            user = User.objects.create_user(username='benchmark', password='benchmark@123')
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(user)))
+            url = reverse('imovel-list')
+
+            self.stdout.write('%d imóveis, página de %d' % (options['imoveis'], options['page_size']))
+            self.stdout.write('%32s %16s %16s' % ('busca', 'com índice (ms)', 'sem índice (ms)'))
+
+            com_indice = self.mede(client, url, options)
+
+            indices = [indice for indice in Imovel._meta.indexes if indice.name in ImovelViewSet.buscas_indexadas]
+            with connection.schema_editor() as editor:
+                for indice in indices:
+                    editor.remove_index(Imovel, indice)
+            sem_indice = self.mede(client, url, options)
+
+            for (descricao, _), tempo_com, tempo_sem in zip(self.BUSCAS, com_indice, sem_indice):
+                self.stdout.write('%32s %16.2f %16.2f' % (descricao, tempo_com, tempo_sem))
+
+            # Abordagem anterior: baixar todos os imóveis e filtrar no cliente
+            inicio = time.perf_counter()
+            linhas = list(Imovel.objects.values_list('id', 'limite_hospedes', 'quant_banheiros', 'aceita_animais', 'valor_limpeza').iterator(chunk_size=10000))
+            self.stdout.write('%32s %16.2f' % ('todos os imóveis (%d)' % len(linhas), (time.perf_counter() - inicio) * 1000))
+
+    def cria_imoveis(self, quantidade):
+        gerador = random.Random(42)
+        for posicao in range(0, quantidade, 10000):
+            Imovel.objects.bulk_create([
+                Imovel(
+                    limite_hospedes=gerador.randint(1, 12),
+                    quant_banheiros=gerador.randint(0, 5),
+                    aceita_animais=gerador.random() < 0.3,
+                    valor_limpeza=round(gerador.uniform(0, 500), 2)
+                )
+                for _ in range(min(10000, quantidade - posicao))
+            ])
+
+    def mede(self, client, url, options):
+        tempos = []
+        for _, parametros in self.BUSCAS:
+            parametros = {**parametros, 'page_size': options['page_size']}
+
+            # Requisição inicial (preenche o cache da autenticação)
+            assert client.get(url, parametros).status_code == 200
+
+            tempos.append(mediana_ms(lambda: client.get(url, parametros), options['repeticoes']))
+        return tempos
@@ -0,0 +1,57 @@
+import secrets
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva, ALFABETO_CODIGO, generate_random_code
+from abstracts.benchmark import banco_de_testes
+
+'''
+    Gerador anterior, que fazia um COUNT para cada código gerado
+'''
+def generate_random_code_anterior():
+    while True:
+        code = ''.join(secrets.choice(ALFABETO_CODIGO) for _ in range(12))
+        if Reserva.objects.filter(codigo=code).count() == 0:
+            return code
+
+'''
+    Mede a criação em massa de reservas com o gerador de códigos anterior (COUNT por código) e com o atual (sem consulta)
+
+    Uso: python manage.py benchmark_codigos --quantidade 10000
+'''
+class Command(BaseCommand):
+    help = 'Compara a criação em massa de reservas com o gerador de códigos anterior e o atual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            plataforma = PlataformaAnuncio.objects.create(nome='Benchmark')
+
+            self.stdout.write('%10s %10s %12s' % ('gerador', 'consultas', 'tempo (s)'))
+
+            for nome, gerador in (('anterior', generate_random_code_anterior), ('atual', generate_random_code)):
+                imovel = Imovel.objects.create(limite_hospedes=2)
+                anuncio = Anuncio.objects.create(imovel=imovel, plataforma=plataforma)
+                inicio = date(2000, 1, 1)
+
+                with CaptureQueriesContext(connection) as queries:
+                    tempo = time.perf_counter()
+                    Reserva.objects.bulk_create([
+                        Reserva(
+                            anuncio=anuncio,
+                            imovel=imovel,
+                            codigo=gerador(),
+                            data_checkin=inicio + timedelta(days=i),
+                            data_checkout=inicio + timedelta(days=i + 1)
+                        )
+                        for i in range(options['quantidade'])
+                    ], batch_size=1000)
+                    tempo = time.perf_counter() - tempo
+
+                self.stdout.write('%10s %10d %12.3f' % (nome, len(queries), tempo))
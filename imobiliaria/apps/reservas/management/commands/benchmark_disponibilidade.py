@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva
+from apps.reservas.disponibilidade import imovel_disponivel
+from abstracts.benchmark import banco_de_testes, mediana_ms
+
+'''
+    Mede a latência da verificação de disponibilidade de uma nova reserva conforme o imóvel acumula reservas,
+    comparando a consulta anterior (3 condições com JOIN em anúncio) com a consulta atual (intervalo semiaberto
+    no índice (imovel, data_checkout, data_checkin))
+
+    Uso: python manage.py benchmark_disponibilidade --tamanhos 100 1000 5000
+'''
+class Command(BaseCommand):
+    help = 'Mede a latência da verificação de disponibilidade conforme o imóvel acumula reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[100, 1000, 5000])
+        parser.add_argument('--repeticoes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            plataforma = PlataformaAnuncio.objects.create(nome='Benchmark')
+
+            self.stdout.write('%10s %15s %15s' % ('reservas', 'anterior (ms)', 'atual (ms)'))
+
+            for tamanho in options['tamanhos']:
+
+                # Um imóvel novo com "tamanho" reservas de uma noite, uma a cada dois dias
+                imovel = Imovel.objects.create(limite_hospedes=2)
+                anuncio = Anuncio.objects.create(imovel=imovel, plataforma=plataforma)
+                inicio = date(2000, 1, 1)
+                Reserva.objects.bulk_create([
+                    Reserva(
+                        anuncio=anuncio,
+                        imovel=imovel,
+                        data_checkin=inicio + timedelta(days=2 * i),
+                        data_checkout=inicio + timedelta(days=2 * i + 1)
+                    )
+                    for i in range(tamanho)
+                ], batch_size=1000)
+
+                # Período livre logo após a última reserva
+                checkin = inicio + timedelta(days=2 * tamanho)
+                checkout = checkin + timedelta(days=3)
+
+                anterior = mediana_ms(lambda: Reserva.objects.filter(anuncio__imovel=imovel).filter(
+                    Q(data_checkout__gt=checkin, data_checkout__lte=checkout) |
+                    Q(data_checkin__gte=checkin, data_checkin__lt=checkout) |
+                    Q(data_checkin__lte=checkin, data_checkout__gte=checkout)
+                ).exists(), options['repeticoes'])
+
+                atual = mediana_ms(lambda: imovel_disponivel(imovel.id, checkin, checkout), options['repeticoes'])
+
+                self.stdout.write('%10d %15.3f %15.3f' % (tamanho, anterior, atual))
@@ -0,0 +1,129 @@
+import random
+import time
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva, generate_random_code
+from apps.reservas.disponibilidade import imovel_disponivel
+from abstracts.benchmark import banco_de_testes, mediana_ms
+
+'''
+    Mede a busca de imóveis disponíveis (GET /imoveis/disponiveis/, uma consulta com NOT EXISTS) em uma carteira
+    com histórico de reservas, comparando com a abordagem anterior: listar os imóveis que comportam os hóspedes
+    e verificar a disponibilidade de cada um com uma consulta
+
+    Uso: python manage.py benchmark_disponiveis --imoveis 20000 --reservas-por-imovel 50
+'''
+class Command(BaseCommand):
+    help = 'Compara a busca de imóveis disponíveis em uma consulta com uma consulta por imóvel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imoveis', type=int, default=20000)
+        parser.add_argument('--reservas-por-imovel', type=int, default=50)
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            inicio = self.cria_carteira(options['imoveis'], options['reservas_por_imovel'])
+
+            user = User.objects.create_user(username='benchmark', password='benchmark@123')
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(user)))
+            url = reverse('imovel-imovel_disponiveis')
+
+            self.stdout.write('%d imóveis, %d reservas, página de %d' % (options['imoveis'], Reserva.objects.count(), options['page_size']))
+            self.stdout.write('%28s %12s %12s' % ('período', 'hóspedes', 'mediana (ms)'))
+
+            # Períodos no meio do histórico (mais reservas) e após o fim dele
+            buscas = [
+                (inicio + timedelta(days=options['reservas_por_imovel'] * 2), 1, 4),
+                (inicio + timedelta(days=options['reservas_por_imovel'] * 4), 3, 2),
+                (inicio + timedelta(days=options['reservas_por_imovel'] * 8), 3, 8),
+            ]
+            for checkin, noites, hospedes in buscas:
+                params = {
+                    'hospedes': hospedes,
+                    'data_checkin': checkin.isoformat(),
+                    'data_checkout': (checkin + timedelta(days=noites)).isoformat(),
+                    'page_size': options['page_size']
+                }
+
+                # Requisição inicial (preenche o cache da autenticação)
+                assert client.get(url, params).status_code == 200
+
+                tempo = mediana_ms(lambda: client.get(url, params), options['repeticoes'])
+                self.stdout.write('%28s %12d %12.2f' % ('%s a %s' % (params['data_checkin'], params['data_checkout']), hospedes, tempo))
+
+            # Abordagem anterior: uma consulta de disponibilidade por imóvel que comporta os hóspedes
+            checkin, noites, hospedes = buscas[0]
+            tempo = time.perf_counter()
+            disponiveis = [
+                imovel_id for imovel_id in Imovel.objects.filter(limite_hospedes__gte=hospedes).values_list('id', flat=True)
+                if imovel_disponivel(imovel_id, checkin, checkin + timedelta(days=noites))
+            ]
+            self.stdout.write('%28s %12d %12.2f (%d disponíveis, todos)' % (
+                'uma consulta por imóvel', hospedes, (time.perf_counter() - tempo) * 1000, len(disponiveis)
+            ))
+
+            # Todas as páginas da mesma busca: cada limite_hospedes é compartilhado por milhares de imóveis,
+            # e o cursor (limite_hospedes, id) precisa percorrê-los sem repetir nem pular nenhum
+            params = {
+                'hospedes': hospedes,
+                'data_checkin': checkin.isoformat(),
+                'data_checkout': (checkin + timedelta(days=noites)).isoformat(),
+                'page_size': options['page_size'],
+                'fields': 'id'
+            }
+            tempo = time.perf_counter()
+            response = client.get(url, params)
+            ids, paginas = [], 1
+            while True:
+                ids += [imovel['id'] for imovel in response.data['results']]
+                if not response.data['next']:
+                    break
+                response = client.get(response.data['next'])
+                paginas += 1
+            assert sorted(ids) == sorted(disponiveis), 'A paginação repetiu ou pulou imóveis'
+            self.stdout.write('%28s %12d %12.2f (%d páginas, média por página)' % (
+                'todas as páginas', hospedes, (time.perf_counter() - tempo) * 1000 / paginas, paginas
+            ))
+
+    '''
+        Cria os imóveis, um anúncio por imóvel e reservas de 1 a 4 noites com intervalos de 0 a 3 dias entre elas
+    '''
+    def cria_carteira(self, quantidade, reservas_por_imovel):
+        gerador = random.Random(42)
+        plataforma = PlataformaAnuncio.objects.create(nome='Benchmark')
+        inicio = date(2030, 1, 1)
+
+        for posicao in range(0, quantidade, 1000):
+            tamanho = min(1000, quantidade - posicao)
+
+            # Os objetos são lidos de novo após o bulk_create porque o MySQL não retorna os ids criados
+            Imovel.objects.bulk_create([Imovel(limite_hospedes=gerador.randint(1, 10)) for _ in range(tamanho)])
+            imoveis = Imovel.objects.order_by('id')[posicao:posicao + tamanho]
+            Anuncio.objects.bulk_create([Anuncio(imovel=imovel, plataforma=plataforma) for imovel in imoveis])
+            anuncios = Anuncio.objects.order_by('id')[posicao:posicao + tamanho]
+
+            reservas = []
+            for anuncio in anuncios:
+                checkin = inicio + timedelta(days=gerador.randint(0, 3))
+                for _ in range(reservas_por_imovel):
+                    checkout = checkin + timedelta(days=gerador.randint(1, 4))
+                    reservas.append(Reserva(
+                        anuncio=anuncio,
+                        imovel_id=anuncio.imovel_id,
+                        codigo=generate_random_code(),
+                        data_checkin=checkin,
+                        data_checkout=checkout
+                    ))
+                    checkin = checkout + timedelta(days=gerador.randint(0, 3))
+            Reserva.objects.bulk_create(reservas, batch_size=5000)
+
+        return inicio
@@ -0,0 +1,64 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva, generate_random_code
+from apps.reservas.serializers import ReservaSerializer
+from abstracts.benchmark import banco_de_testes
+from abstracts.serializers import get_select_related
+from abstracts.leitura import compila_plano
+
+'''
+    Compara a serialização de uma listagem de reservas pelo ReservaSerializer (3 níveis) com a leitura plana
+    (ver abstracts/leitura.py), com todos os relacionamentos expandidos e somente com alguns campos
+
+    Uso: python manage.py benchmark_leitura --quantidade 10000
+'''
+class Command(BaseCommand):
+    help = 'Compara o ReservaSerializer com a leitura plana na listagem de reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=10000)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            plataforma = PlataformaAnuncio.objects.create(nome='Benchmark')
+            anuncios = [
+                Anuncio.objects.create(imovel=Imovel.objects.create(limite_hospedes=2), plataforma=plataforma)
+                for _ in range(100)
+            ]
+
+            inicio = date(2000, 1, 1)
+            Reserva.objects.bulk_create([
+                Reserva(
+                    anuncio=anuncios[i % 100],
+                    imovel_id=anuncios[i % 100].imovel_id,
+                    codigo=generate_random_code(),
+                    data_checkin=inicio + timedelta(days=i),
+                    data_checkout=inicio + timedelta(days=i + 1)
+                )
+                for i in range(options['quantidade'])
+            ], batch_size=500)
+
+            reservas = Reserva.objects.all().order_by('id')
+            plano_completo = compila_plano(ReservaSerializer, frozenset(), frozenset({'anuncio', 'anuncio.imovel', 'anuncio.plataforma'}))
+            plano_parcial = compila_plano(ReservaSerializer, frozenset({'id', 'data_checkin', 'data_checkout', 'anuncio'}), frozenset())
+
+            cenarios = (
+                ('ReservaSerializer', lambda: ReservaSerializer(reservas.select_related(*get_select_related(ReservaSerializer)), many=True).data),
+                ('plana (expand)', lambda: plano_completo.monta_lista(reservas.values(*plano_completo.valores()))),
+                ('plana (fields)', lambda: plano_parcial.monta_lista(reservas.values(*plano_parcial.valores()))),
+            )
+
+            self.stdout.write('%d reservas' % options['quantidade'])
+            self.stdout.write('%20s %12s' % ('leitura', 'tempo (ms)'))
+
+            for nome, funcao in cenarios:
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    tempo = time.perf_counter()
+                    funcao()
+                    tempos.append((time.perf_counter() - tempo) * 1000)
+                self.stdout.write('%20s %12.1f' % (nome, min(tempos)))
@@ -0,0 +1,103 @@
+import random
+import time
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva, generate_random_code
+from apps.reservas.resumo import NOITES, reconstroi_resumo
+from abstracts.benchmark import banco_de_testes, mediana_ms
+
+'''
+    Mede o relatório de ocupação e receita (GET /reservas/relatorio/) de um ano, lendo o resumo materializado
+    e somando as reservas no banco, e compara com a abordagem anterior: ler as reservas e somar em Python
+
+    Uso: python manage.py benchmark_relatorio --imoveis 2000 --reservas-por-imovel 100
+'''
+class Command(BaseCommand):
+    help = 'Compara o relatório de reservas pelo resumo materializado, pela agregação no banco e em Python'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imoveis', type=int, default=2000)
+        parser.add_argument('--reservas-por-imovel', type=int, default=100)
+        parser.add_argument('--repeticoes', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with banco_de_testes():
+            inicio = self.cria_carteira(options['imoveis'], options['reservas_por_imovel'])
+            fim = date(inicio.year + 1, 1, 1)
+
+            tempo = time.perf_counter()
+            resumos = reconstroi_resumo()
+            self.stdout.write('%d reservas, %d resumos (reconstrução em %.0f ms)' % (
+                Reserva.objects.count(), resumos, (time.perf_counter() - tempo) * 1000
+            ))
+
+            user = User.objects.create_user(username='benchmark', password='benchmark@123')
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(user)))
+            url = reverse('reserva-reserva_relatorio')
+
+            self.stdout.write('%12s %16s %16s' % ('agrupamento', 'resumo (ms)', 'reservas (ms)'))
+            for agrupamento in ('mes', 'plataforma', 'imovel'):
+                params = {'agrupamento': agrupamento, 'inicio': inicio.isoformat(), 'fim': fim.isoformat()}
+
+                # Requisição inicial (preenche o cache da autenticação)
+                assert client.get(url, params).data['fonte'] == 'resumo'
+                tempo_resumo = mediana_ms(lambda: client.get(url, params), options['repeticoes'])
+
+                with override_settings(RELATORIO_RESUMO=False):
+                    tempo_reservas = mediana_ms(lambda: client.get(url, params), options['repeticoes'])
+
+                self.stdout.write('%12s %16.2f %16.2f' % (agrupamento, tempo_resumo, tempo_reservas))
+
+            # Abordagem anterior: ler as reservas do período e somar por mês em Python
+            tempo = time.perf_counter()
+            meses = {}
+            for data_checkin, noites, valor_total in Reserva.objects.filter(
+                data_checkin__gte=inicio, data_checkin__lt=fim
+            ).values_list('data_checkin', NOITES, 'valor_total').iterator(chunk_size=10000):
+                noites_mes, receita_mes = meses.get(data_checkin.month, (0, 0))
+                meses[data_checkin.month] = (noites_mes + noites.days, receita_mes + valor_total)
+            self.stdout.write('%12s %16.2f (em Python)' % ('mes', (time.perf_counter() - tempo) * 1000))
+
+    '''
+        Cria os imóveis, um anúncio por imóvel em uma de 3 plataformas e reservas de 1 a 4 noites ao longo do ano
+    '''
+    def cria_carteira(self, quantidade, reservas_por_imovel):
+        gerador = random.Random(42)
+        plataformas = [PlataformaAnuncio.objects.create(nome='Benchmark %d' % i, taxa=10 * i) for i in range(1, 4)]
+        inicio = date(2030, 1, 1)
+
+        # O resumo é reconstruído de uma vez depois da carga (o bulk_create não dispara o post_save)
+        for posicao in range(0, quantidade, 1000):
+            tamanho = min(1000, quantidade - posicao)
+
+            # Os objetos são lidos de novo após o bulk_create porque o MySQL não retorna os ids criados
+            Imovel.objects.bulk_create([Imovel(limite_hospedes=gerador.randint(1, 10)) for _ in range(tamanho)])
+            imoveis = Imovel.objects.order_by('id')[posicao:posicao + tamanho]
+            Anuncio.objects.bulk_create([Anuncio(imovel=imovel, plataforma=gerador.choice(plataformas)) for imovel in imoveis])
+            anuncios = Anuncio.objects.order_by('id')[posicao:posicao + tamanho]
+
+            reservas = []
+            for anuncio in anuncios:
+                checkin = inicio
+                for _ in range(reservas_por_imovel):
+                    checkout = checkin + timedelta(days=gerador.randint(1, 4))
+                    reservas.append(Reserva(
+                        anuncio=anuncio,
+                        imovel_id=anuncio.imovel_id,
+                        codigo=generate_random_code(),
+                        valor_total=round(gerador.uniform(100, 2000), 2),
+                        data_checkin=checkin,
+                        data_checkout=checkout
+                    ))
+                    checkin = checkout + timedelta(days=gerador.randint(0, 1))
+            Reserva.objects.bulk_create(reservas, batch_size=5000)
+
+        return inicio
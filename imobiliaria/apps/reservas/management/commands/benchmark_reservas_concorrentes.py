@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.anuncios.models import Anuncio, PlataformaAnuncio
+from apps.imoveis.models import Imovel
+from apps.reservas.models import Reserva
+from abstracts.benchmark import banco_de_testes
+
+'''
+    Envia reservas simultâneas (uma thread por requisição) para o endpoint POST /reservas/ e mede:
+        - a vazão (reservas/s) de reservas que não conflitam, cada thread em um imóvel diferente
+        - quantas reservas são criadas quando todas as threads disputam o mesmo período do mesmo imóvel (deve ser 1)
+
+    Precisa de um banco com SELECT ... FOR UPDATE e escrita concorrente (MySQL)
+
+    Uso: python manage.py benchmark_reservas_concorrentes --threads 20 --rodadas 10
+'''
+class Command(BaseCommand):
+    help = 'Mede a vazão e a exclusão mútua da criação concorrente de reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20)
+        parser.add_argument('--rodadas', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not connection.features.has_select_for_update:
+            raise CommandError('O banco configurado não suporta SELECT ... FOR UPDATE.')
+
+        with banco_de_testes():
+            user = User.objects.create_user(username='benchmark', password='benchmark')
+            self.token = str(AccessToken.for_user(user))
+
+            plataforma = PlataformaAnuncio.objects.create(nome='Benchmark')
+            anuncios = [
+                Anuncio.objects.create(imovel=Imovel.objects.create(limite_hospedes=2), plataforma=plataforma)
+                for _ in range(options['threads'])
+            ]
+            hoje = timezone.now().date()
+
+            # Imóveis diferentes: todas as reservas devem ser criadas, sem uma esperar pela outra
+            total = 0
+            inicio = time.perf_counter()
+            for rodada in range(options['rodadas']):
+                checkin = hoje + timedelta(days=2 * rodada + 1)
+                status_codes = self.envia_reservas(anuncios, checkin, checkin + timedelta(days=1))
+                total += status_codes.count(201)
+            duracao = time.perf_counter() - inicio
+
+            self.stdout.write('Imóveis diferentes: %d reservas criadas em %.2fs (%.1f reservas/s)' % (total, duracao, total / duracao))
+
+            # Mesmo imóvel e período: somente uma reserva por rodada pode ser criada
+            vencedoras = []
+            for rodada in range(options['rodadas']):
+                checkin = hoje + timedelta(days=1000 + 2 * rodada)
+                status_codes = self.envia_reservas([anuncios[0]] * options['threads'], checkin, checkin + timedelta(days=1))
+                vencedoras.append(status_codes.count(201))
+
+            self.stdout.write('Mesmo imóvel: reservas criadas por rodada %s' % vencedoras)
+            self.stdout.write('Reservas no banco: %d' % Reserva.objects.count())
+
+    '''
+        Envia, ao mesmo tempo, uma reserva para cada anúncio da lista e retorna os status codes das respostas
+    '''
+    def envia_reservas(self, anuncios, data_checkin, data_checkout):
+        barreira = threading.Barrier(len(anuncios))
+        status_codes = []
+
+        def envia_reserva(anuncio):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+            try:
+                barreira.wait()
+                response = client.post(reverse('reserva-list'), {
+                    'anuncio_id': anuncio.id,
+                    'data_checkin': str(data_checkin),
+                    'data_checkout': str(data_checkout)
+                })
+                status_codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=envia_reserva, args=(anuncio,)) for anuncio in anuncios]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return status_codes
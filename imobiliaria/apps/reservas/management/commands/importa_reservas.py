@@ -0,0 +1,44 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+from abstracts.parsers import parse_ndjson
+from apps.reservas.importacao import importa_reservas
+
+'''
+    Importa reservas de um arquivo JSON (lista de reservas) ou NDJSON (uma reserva por linha)
+
+    Uso: python manage.py importa_reservas reservas.ndjson
+         cat reservas.json | python manage.py importa_reservas - --formato json
+'''
+class Command(BaseCommand):
+    help = 'Importa reservas em massa de um arquivo JSON ou NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo, ou '-' para ler da entrada padrão")
+        parser.add_argument('--formato', choices=['json', 'ndjson'], help='Padrão: definido pela extensão do arquivo (ndjson se não for .json)')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or ('json' if options['arquivo'].endswith('.json') else 'ndjson')
+
+        arquivo = sys.stdin if options['arquivo'] == '-' else open(options['arquivo'], encoding='utf-8')
+        try:
+            if formato == 'json':
+                linhas = json.load(arquivo)
+            else:
+                linhas = list(parse_ndjson(arquivo))
+        except (ValueError, ParseError) as e:
+            raise CommandError('Arquivo inválido: %s' % e)
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+
+        if not isinstance(linhas, list):
+            raise CommandError('O arquivo JSON deve conter uma lista de reservas.')
+
+        relatorio = importa_reservas(linhas)
+
+        for erro in relatorio['erros']:
+            self.stderr.write('Linha %d: %s' % (erro['linha'], json.dumps(erro['erros'], ensure_ascii=False)))
+
+        self.stdout.write('%d reservas criadas, %d linhas com erro.' % (relatorio['criadas'], len(relatorio['erros'])))
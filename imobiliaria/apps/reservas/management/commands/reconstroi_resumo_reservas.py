@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.reservas.resumo import reconstroi_resumo
+
+'''
+    Reconstrói o resumo materializado dos relatórios a partir das reservas ativas (ver apps/reservas/resumo.py),
+    ex: ao habilitar o RELATORIO_RESUMO depois de gravar reservas com ele desabilitado
+
+    Uso: python manage.py reconstroi_resumo_reservas
+'''
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo das reservas usado pelos relatórios'
+
+    def handle(self, *args, **options):
+        self.stdout.write('%d resumos gravados.' % reconstroi_resumo())
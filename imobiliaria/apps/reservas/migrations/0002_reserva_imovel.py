@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+'''
+    Preenche o imóvel das reservas existentes a partir do anúncio
+'''
+def preenche_imovel(apps, schema_editor):
+    Reserva = apps.get_model('reservas', 'Reserva')
+    Anuncio = apps.get_model('anuncios', 'Anuncio')
+    Reserva.objects.update(
+        imovel_id=Subquery(Anuncio.objects.filter(id=OuterRef('anuncio_id')).values('imovel_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imoveis', '0001_initial'),
+        ('anuncios', '0001_initial'),
+        ('reservas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='imovel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='imoveis.imovel', verbose_name='Imovel do anuncio, copiado para verificar a disponibilidade sem JOIN'),
+        ),
+        migrations.RunPython(preenche_imovel, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reserva',
+            name='imovel',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='imoveis.imovel', verbose_name='Imovel do anuncio, copiado para verificar a disponibilidade sem JOIN'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['imovel', 'data_checkout', 'data_checkin'], name='reserva_imovel_periodo_idx'),
+        ),
+    ]
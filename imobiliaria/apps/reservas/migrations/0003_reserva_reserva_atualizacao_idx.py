@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_reserva_imovel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['data_hora_atualizacao', 'id'], name='reserva_atualizacao_idx'),
+        ),
+    ]
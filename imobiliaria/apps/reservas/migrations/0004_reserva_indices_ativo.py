@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0003_reserva_reserva_atualizacao_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_imovel_periodo_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['imovel', 'ativo', 'data_checkout', 'data_checkin'], name='reserva_imovel_periodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['imovel', 'ativo', 'id'], name='reserva_imovel_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['anuncio', 'ativo', 'id'], name='reserva_anuncio_ativo_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:03
+
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+'''
+    Preenche o resumo com as reservas ativas já gravadas (como o reconstroi_resumo, com os models da migração)
+'''
+def preenche_resumo(apps, schema_editor):
+    Reserva = apps.get_model('reservas', 'Reserva')
+    ResumoReserva = apps.get_model('reservas', 'ResumoReserva')
+
+    noites = ExpressionWrapper(F('data_checkout') - F('data_checkin'), output_field=DurationField())
+    linhas = Reserva.objects.filter(ativo=True).values('anuncio_id', 'imovel_id', mes=TruncMonth('data_checkin')).annotate(
+        quantidade=Count('id'),
+        soma_noites=Sum(noites),
+        soma_receita=Sum('valor_total')
+    ).order_by()
+
+    ResumoReserva.objects.bulk_create([
+        ResumoReserva(
+            mes=linha['mes'],
+            anuncio_id=linha['anuncio_id'],
+            imovel_id=linha['imovel_id'],
+            reservas=linha['quantidade'],
+            noites=linha['soma_noites'].days,
+            receita=round(linha['soma_receita'] or 0, 2)
+        )
+        for linha in linhas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imoveis', '0003_imovel_indices_busca'),
+        ('anuncios', '0003_anuncio_indices_ativo'),
+        ('reservas', '0004_reserva_indices_ativo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoReserva',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('mes', models.DateField(verbose_name='Primeiro dia do mês de check-in das reservas')),
+                ('reservas', models.PositiveIntegerField(default=0)),
+                ('noites', models.PositiveIntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('data_hora_atualizacao', models.DateTimeField(auto_now=True)),
+                ('anuncio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='anuncios.anuncio')),
+                ('imovel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='imoveis.imovel', verbose_name='Imovel do anuncio, copiado para agrupar sem JOIN')),
+            ],
+            options={
+                'db_table': 'reserva_resumo',
+                'indexes': [models.Index(fields=['imovel', 'mes'], name='reserva_resumo_imovel_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumoreserva',
+            constraint=models.UniqueConstraint(fields=('mes', 'anuncio'), name='reserva_resumo_mes_anuncio_uniq'),
+        ),
+        migrations.RunPython(preenche_resumo, migrations.RunPython.noop),
+    ]
@@ -1,29 +1,43 @@
-from django.db import models
+from django.db import models, IntegrityError
 from apps.anuncios.models import Anuncio
+from apps.imoveis.models import Imovel
 import secrets
 import string
 from abstracts.models import SoftDeletionModel
 
+ALFABETO_CODIGO = string.ascii_uppercase + string.digits
+
+# Número de tentativas com códigos diferentes antes de desistir de criar a reserva
+TENTATIVAS_CODIGO = 3
+
 '''
-    Gera um código aleatório para a reserva e garanta que será único
+    Gera um código aleatório para a reserva
+    São 36^12 (~4,7 * 10^18) códigos possíveis, então não é feita uma consulta para verificar se o código já existe:
+    a unicidade é garantida pela constraint UNIQUE da coluna e uma colisão é tratada por com_codigo_unico
 '''
 def generate_random_code():
+    return ''.join(secrets.choice(ALFABETO_CODIGO) for _ in range(12))
 
-        while True:
-            
-            # Gera um código aleatório
-            code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(12))
-            
-            # Verifica se o código já existe
-            if Reserva.objects.filter(codigo=code).count() == 0:
-                break
-        return code
+'''
+    Executa "cria(codigo)" com um código novo e, caso o INSERT falhe por colisão do código, tenta novamente com outro.
+    "cria" deve executar a sua própria transação (transaction.atomic) para que a falha possa ser desfeita antes da nova tentativa.
+'''
+def com_codigo_unico(cria):
+    for tentativa in range(TENTATIVAS_CODIGO):
+        codigo = generate_random_code()
+        try:
+            return cria(codigo)
+        except IntegrityError:
+            # Só consulta o banco no caso (raro) de erro, para saber se a causa foi o código
+            if tentativa == TENTATIVAS_CODIGO - 1 or not Reserva.all_objects.filter(codigo=codigo).exists():
+                raise
 
 class Reserva(SoftDeletionModel):
     id = models.AutoField(primary_key=True)
     data_hora_criacao = models.DateTimeField(auto_now_add=True, editable=False, verbose_name="Data de criacao automatica")
     data_hora_atualizacao = models.DateTimeField(auto_now=True, editable=False, verbose_name="Data atualizada sempre que o objeto da classe é atualizado com .save")
     anuncio = models.ForeignKey(Anuncio, on_delete=models.CASCADE, null=False, verbose_name="Anuncio que a reserva pertence")
+    imovel = models.ForeignKey(Imovel, on_delete=models.CASCADE, null=False, editable=False, verbose_name="Imovel do anuncio, copiado para verificar a disponibilidade sem JOIN")
     codigo = models.CharField(max_length=12, default=generate_random_code, editable=False, unique=True)
     comentario = models.TextField(blank=True)
     valor_total = models.FloatField(default=0)
@@ -32,5 +46,48 @@ class Reserva(SoftDeletionModel):
     
     class Meta:
         db_table = 'reserva'
+        indexes = [
+            # Índice usado na verificação de disponibilidade (ver apps/reservas/disponibilidade.py)
+            models.Index(fields=['imovel', 'ativo', 'data_checkout', 'data_checkin'], name='reserva_imovel_periodo_idx'),
+            
+            # Listagens por imóvel e por anúncio (somente as ativas, paginadas por id)
+            models.Index(fields=['imovel', 'ativo', 'id'], name='reserva_imovel_ativo_idx'),
+            models.Index(fields=['anuncio', 'ativo', 'id'], name='reserva_anuncio_ativo_idx'),
+            
+            # Índice usado na sincronização incremental (ver abstracts/sincronizacao.py)
+            models.Index(fields=['data_hora_atualizacao', 'id'], name='reserva_atualizacao_idx'),
+        ]
     
-    
\ No newline at end of file
+    '''
+        Mantém o imóvel desnormalizado igual ao imóvel do anúncio
+    '''
+    def save(self, *args, **kwargs):
+        if self.imovel_id is None and self.anuncio_id is not None:
+            self.imovel_id = self.anuncio.imovel_id
+        super().save(*args, **kwargs)
+
+'''
+    Resumo materializado das reservas ativas por mês de check-in e anúncio, usado pelos relatórios
+    (ver apps/reservas/relatorios.py). É atualizado a cada reserva gravada ou cancelada (ver apps/reservas/resumo.py),
+    então os relatórios leem uma linha por grupo em vez de uma linha por reserva.
+'''
+class ResumoReserva(models.Model):
+    id = models.AutoField(primary_key=True)
+    mes = models.DateField(null=False, verbose_name="Primeiro dia do mês de check-in das reservas")
+    anuncio = models.ForeignKey(Anuncio, on_delete=models.CASCADE, null=False)
+    imovel = models.ForeignKey(Imovel, on_delete=models.CASCADE, null=False, verbose_name="Imovel do anuncio, copiado para agrupar sem JOIN")
+    reservas = models.PositiveIntegerField(default=0)
+    noites = models.PositiveIntegerField(default=0)
+    receita = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    data_hora_atualizacao = models.DateTimeField(auto_now=True, editable=False)
+    
+    class Meta:
+        db_table = 'reserva_resumo'
+        constraints = [
+            # Um resumo por mês e anúncio, começando pelo mês (os relatórios filtram por período)
+            models.UniqueConstraint(fields=['mes', 'anuncio'], name='reserva_resumo_mes_anuncio_uniq'),
+        ]
+        indexes = [
+            # Atualização do resumo dos imóveis afetados por uma reserva
+            models.Index(fields=['imovel', 'mes'], name='reserva_resumo_imovel_idx'),
+        ]
@@ -0,0 +1,149 @@
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Reserva
+
+'''
+    Mapa de ocupação por imóvel, guardado no cache do Django
+
+    Cada imóvel tem um bitmap de dias: o bit "n" indica se a noite do dia (base + n) está ocupada
+    por alguma reserva ativa, onde "base" é o ordinal (date.toordinal) do primeiro dia do mapa.
+    O mapa é construído com uma única consulta na primeira leitura e, a partir daí, consultar a disponibilidade
+    de um período custa O(dias) sem acessar o banco, até o mapa ser descartado.
+
+    Cada reserva criada ou cancelada (ver apps/reservas/signals.py) marca ou desmarca as suas noites no mapa em cache,
+    sem consultar o banco, após o commit da transação: um rollback não deixa no mapa reservas que não existem.
+    Desmarcar as noites de uma reserva cancelada é seguro porque as reservas ativas de um imóvel não se sobrepõem.
+    As demais alterações (ex: loaddata, reativação) descartam o mapa, que é reconstruído na próxima leitura.
+
+    A atualização é feita com uma trava no cache (cache.add) por imóvel, para que duas atualizações simultâneas
+    não percam uma à outra; se a trava não for obtida a tempo, o mapa é descartado.
+    Com o cache local (locmem) cada processo atualiza somente o próprio mapa, então ele também expira após
+    OCUPACAO_CACHE_TIMEOUT segundos, limitando por quanto tempo os outros processos o leem desatualizado.
+'''
+
+# Tentativas (a cada 5 ms) de obter a trava do mapa e duração máxima da trava (segundos)
+TENTATIVAS_TRAVA = 10
+DURACAO_TRAVA = 1
+
+def _chave(imovel_id):
+    return 'reservas:ocupacao:%s' % imovel_id
+
+def _timeout():
+    return getattr(settings, 'OCUPACAO_CACHE_TIMEOUT', 300)
+
+'''
+    Marca (ocupado=True) ou desmarca as noites de [data_checkin, data_checkout) no mapa (base, bits)
+'''
+def _aplica(ocupacao, data_checkin, data_checkout, ocupado):
+    base, bits = ocupacao
+    inicio, fim = data_checkin.toordinal(), data_checkout.toordinal()
+
+    if fim <= inicio:
+        return ocupacao
+
+    # Estende o mapa para trás caso a reserva comece antes do primeiro dia conhecido
+    if base is None:
+        base = inicio
+    elif inicio < base:
+        bits <<= base - inicio
+        base = inicio
+
+    mascara = ((1 << (fim - inicio)) - 1) << (inicio - base)
+    if ocupado:
+        bits |= mascara
+    else:
+        bits &= ~mascara
+
+    return (base, bits)
+
+'''
+    Constrói o mapa do imóvel a partir das reservas ativas (uma consulta)
+'''
+def _constroi(imovel_id):
+    ocupacao = (None, 0)
+    reservas = Reserva.objects.filter(imovel_id=imovel_id).values_list('data_checkin', 'data_checkout')
+    for data_checkin, data_checkout in reservas:
+        ocupacao = _aplica(ocupacao, data_checkin, data_checkout, True)
+    return ocupacao
+
+def _carrega(imovel_id):
+    ocupacao = cache.get(_chave(imovel_id))
+    if ocupacao is None:
+        ocupacao = _constroi(imovel_id)
+        cache.set(_chave(imovel_id), ocupacao, _timeout())
+    return ocupacao
+
+'''
+    Trava da atualização do mapa de um imóvel (True quando obtida)
+'''
+@contextmanager
+def _trava(chave):
+    trava = chave + ':trava'
+    for _ in range(TENTATIVAS_TRAVA):
+        if cache.add(trava, 1, DURACAO_TRAVA):
+            try:
+                yield True
+            finally:
+                cache.delete(trava)
+            return
+        time.sleep(0.005)
+    yield False
+
+def _atualiza(periodos_por_imovel, ocupado):
+    for imovel_id, periodos in periodos_por_imovel.items():
+        chave = _chave(imovel_id)
+        with _trava(chave) as travado:
+            if not travado:
+                cache.delete(chave)
+                continue
+
+            # Sem mapa em cache não há o que atualizar: ele é construído na próxima leitura
+            ocupacao = cache.get(chave)
+            if ocupacao is None:
+                continue
+            for data_checkin, data_checkout in periodos:
+                ocupacao = _aplica(ocupacao, data_checkin, data_checkout, ocupado)
+            cache.set(chave, ocupacao, _timeout())
+
+'''
+    Marca (ocupado=True, reservas criadas) ou desmarca (ocupado=False, reservas canceladas) as noites das reservas,
+    informadas como (imovel_id, data_checkin, data_checkout), nos mapas em cache após o commit da transação atual
+    (imediatamente, fora de uma transação)
+'''
+def atualiza_ocupacao(reservas, ocupado):
+    # A data pode estar como texto em uma instância criada com Reserva(data_checkin='AAAA-MM-DD')
+    para_data = Reserva._meta.get_field('data_checkin').to_python
+
+    periodos_por_imovel = {}
+    for imovel_id, data_checkin, data_checkout in reservas:
+        periodos_por_imovel.setdefault(imovel_id, []).append((para_data(data_checkin), para_data(data_checkout)))
+
+    if periodos_por_imovel:
+        transaction.on_commit(lambda: _atualiza(periodos_por_imovel, ocupado))
+
+'''
+    Descarta o mapa do imóvel após o commit da transação atual (imediatamente, fora de uma transação)
+'''
+def invalida_ocupacao(imovel_id):
+    transaction.on_commit(lambda: cache.delete(_chave(imovel_id)))
+
+'''
+    Retorna uma lista com (data, disponivel) para cada dia de [inicio, fim)
+'''
+def calendario(imovel_id, inicio, fim):
+    base, bits = _carrega(imovel_id)
+    dias = fim.toordinal() - inicio.toordinal()
+
+    # Recorta a janela consultada do bitmap, de forma que o bit 0 seja o dia "inicio"
+    if base is None:
+        janela = 0
+    elif inicio.toordinal() >= base:
+        janela = bits >> (inicio.toordinal() - base)
+    else:
+        janela = bits << (base - inicio.toordinal())
+
+    return [(inicio + timedelta(days=i), not (janela >> i) & 1) for i in range(dias)]
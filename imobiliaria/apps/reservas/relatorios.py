@@ -0,0 +1,146 @@
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from rest_framework import serializers
+from apps.anuncios.models import Anuncio
+from apps.imoveis.models import Imovel
+from .models import Reserva, ResumoReserva
+from .resumo import NOITES, habilitado, proximo_mes
+
+'''
+    Relatórios de ocupação e receita (endpoint GET /reservas/relatorio/), agregados no banco
+
+    As reservas ativas com check-in no período [inicio, fim) são agrupadas por imóvel, plataforma ou mês (de check-in),
+    com a quantidade de reservas, as noites vendidas, a receita (soma do valor_total) e a taxa de ocupação:
+        noites vendidas / noites disponíveis (dias do período, ou do mês dentro do período, × imóveis do grupo)
+    Cada reserva conta inteira no mês do seu check-in, inclusive as noites que passam para o mês seguinte.
+
+    Com o resumo materializado habilitado (settings.RELATORIO_RESUMO, ver apps/reservas/resumo.py) e um período
+    em meses inteiros (inicio e fim no dia 1), o relatório soma as linhas do resumo em vez das reservas.
+'''
+
+# Coluna do agrupamento: {agrupamento: (coluna no queryset, nome na resposta)}
+AGRUPAMENTOS = {
+    'imovel': ('imovel_id', 'imovel_id'),
+    'plataforma': ('anuncio__plataforma_id', 'plataforma_id'),
+    'mes': ('mes', 'mes'),
+}
+
+'''
+    Serializer responsável por validar os parâmetros do relatório
+'''
+class RelatorioSerializer(serializers.Serializer):
+
+    agrupamento = serializers.ChoiceField(choices=list(AGRUPAMENTOS), error_messages={
+        'required': 'Por favor, forneça o agrupamento do relatório (imovel, plataforma ou mes).',
+        'invalid_choice': 'O agrupamento deve ser "imovel", "plataforma" ou "mes".'
+    })
+
+    inicio = serializers.DateField(error_messages={
+        'required': 'Por favor, forneça a data inicial do relatório.',
+        'invalid': 'A data inicial deve estar no formato AAAA-MM-DD.'
+    })
+
+    fim = serializers.DateField(error_messages={
+        'required': 'Por favor, forneça a data final do relatório.',
+        'invalid': 'A data final deve estar no formato AAAA-MM-DD.'
+    })
+
+    imovel = serializers.IntegerField(required=False, error_messages={
+        'invalid': 'O ID do imóvel deve ser um número inteiro.'
+    })
+
+    plataforma = serializers.IntegerField(required=False, error_messages={
+        'invalid': 'O ID da plataforma deve ser um número inteiro.'
+    })
+
+    def validate(self, attrs):
+        if attrs['inicio'] >= attrs['fim']:
+            raise serializers.ValidationError("A data inicial deve ser anterior à data final.")
+        return attrs
+
+'''
+    Linhas agregadas por grupo: [(grupo, reservas, noites, receita)]
+'''
+def _agrega(agrupamento, inicio, fim, imovel=None, plataforma=None):
+    coluna = AGRUPAMENTOS[agrupamento][0]
+
+    if habilitado() and inicio.day == 1 and fim.day == 1:
+        fonte = 'resumo'
+        queryset = ResumoReserva.objects.filter(mes__gte=inicio, mes__lt=fim)
+        totais = {'quantidade': Sum('reservas'), 'soma_noites': Sum('noites'), 'soma_receita': Sum('receita')}
+    else:
+        fonte = 'reservas'
+        queryset = Reserva.objects.filter(data_checkin__gte=inicio, data_checkin__lt=fim)
+        if agrupamento == 'mes':
+            queryset = queryset.annotate(mes=TruncMonth('data_checkin'))
+        totais = {'quantidade': Count('id'), 'soma_noites': Sum(NOITES), 'soma_receita': Sum('valor_total')}
+
+    if imovel is not None:
+        queryset = queryset.filter(imovel_id=imovel)
+    if plataforma is not None:
+        queryset = queryset.filter(anuncio__plataforma_id=plataforma)
+
+    linhas = queryset.values(coluna).annotate(**totais).order_by(coluna)
+    return fonte, [
+        (
+            linha[coluna],
+            linha['quantidade'],
+            linha['soma_noites'] if isinstance(linha['soma_noites'], int) else linha['soma_noites'].days,
+            Decimal(str(linha['soma_receita'] or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        )
+        for linha in linhas
+    ]
+
+'''
+    Noites disponíveis de cada grupo (dias × imóveis), com no máximo uma consulta
+'''
+def _disponiveis(agrupamento, grupos, inicio, fim, imovel=None, plataforma=None):
+    dias = (fim - inicio).days
+
+    if agrupamento == 'imovel':
+        return {grupo: dias for grupo in grupos}
+
+    imoveis = Imovel.objects.all()
+    if imovel is not None:
+        imoveis = imoveis.filter(pk=imovel)
+
+    if agrupamento == 'plataforma':
+        anuncios = Anuncio.objects.filter(plataforma_id__in=grupos, imovel__in=imoveis)
+        quantidades = dict(anuncios.values('plataforma_id').annotate(imoveis=Count('imovel_id', distinct=True)).values_list('plataforma_id', 'imoveis').order_by())
+        return {grupo: dias * quantidades.get(grupo, 0) for grupo in grupos}
+
+    if plataforma is not None:
+        imoveis = imoveis.filter(pk__in=Anuncio.objects.filter(plataforma_id=plataforma).values('imovel_id'))
+    quantidade = imoveis.count() if grupos else 0
+    return {
+        mes: quantidade * (min(proximo_mes(mes), fim) - max(mes, inicio)).days
+        for mes in grupos
+    }
+
+'''
+    Monta o relatório com os parâmetros validados pelo RelatorioSerializer
+'''
+def monta_relatorio(agrupamento, inicio, fim, imovel=None, plataforma=None):
+    fonte, linhas = _agrega(agrupamento, inicio, fim, imovel, plataforma)
+    disponiveis = _disponiveis(agrupamento, [linha[0] for linha in linhas], inicio, fim, imovel, plataforma)
+
+    nome = AGRUPAMENTOS[agrupamento][1]
+    grupos = []
+    for grupo, reservas, noites, receita in linhas:
+        grupos.append({
+            nome: grupo.isoformat() if agrupamento == 'mes' else grupo,
+            'reservas': reservas,
+            'noites': noites,
+            'receita': str(receita),
+            'noites_disponiveis': disponiveis[grupo],
+            'taxa_ocupacao': round(noites / disponiveis[grupo], 4) if disponiveis[grupo] else None
+        })
+
+    return {
+        'agrupamento': agrupamento,
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'fonte': fonte,
+        'grupos': grupos
+    }
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth
+from .models import Reserva, ResumoReserva
+
+'''
+    Resumo materializado das reservas (tabela reserva_resumo), habilitado por settings.RELATORIO_RESUMO
+
+    Cada linha soma as reservas ativas de um anúncio com check-in em um mês. Em vez de somar/subtrair cada reserva
+    (o que dependeria de saber o estado anterior de cada uma), os meses afetados dos imóveis alterados são recalculados
+    a partir das reservas: a atualização é idempotente e lê somente as reservas desses imóveis nesses meses.
+    As linhas dos meses recalculados são apagadas antes da leitura, bloqueando-as até o fim da transação, para que
+    duas gravações simultâneas no mesmo imóvel não gravem um resumo desatualizado.
+
+    As reservas existentes ao criar a tabela são resumidas pela migração 0005. Com o resumo desabilitado as gravações
+    não o atualizam: ao habilitá-lo, execute "manage.py reconstroi_resumo_reservas".
+'''
+
+# Quantidade de resumos por INSERT
+TAMANHO_LOTE = 1000
+
+# Noites de cada reserva (checkout - checkin), somadas no banco
+NOITES = ExpressionWrapper(F('data_checkout') - F('data_checkin'), output_field=DurationField())
+
+def habilitado():
+    return getattr(settings, 'RELATORIO_RESUMO', False)
+
+def proximo_mes(data):
+    return (data.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+'''
+    Resumos calculados a partir das reservas ativas do queryset
+'''
+def _calcula(reservas):
+    linhas = reservas.values('anuncio_id', 'imovel_id', mes=TruncMonth('data_checkin')).annotate(
+        quantidade=Count('id'),
+        soma_noites=Sum(NOITES),
+        soma_receita=Sum('valor_total')
+    ).order_by()
+
+    return [
+        ResumoReserva(
+            mes=linha['mes'],
+            anuncio_id=linha['anuncio_id'],
+            imovel_id=linha['imovel_id'],
+            reservas=linha['quantidade'],
+            noites=linha['soma_noites'].days,
+            receita=round(linha['soma_receita'] or 0, 2)
+        )
+        for linha in linhas
+    ]
+
+'''
+    Recalcula o resumo dos imóveis e meses das reservas informadas, como (imovel_id, data_checkin)
+'''
+def atualiza_resumo(reservas):
+    if not habilitado():
+        return
+
+    # A data pode estar como texto em uma instância criada com Reserva(data_checkin='AAAA-MM-DD')
+    campo = Reserva._meta.get_field('data_checkin')
+
+    imoveis = set()
+    meses = set()
+    for imovel_id, data_checkin in reservas:
+        imoveis.add(imovel_id)
+        meses.add(campo.to_python(data_checkin).replace(day=1))
+    if not imoveis:
+        return
+
+    inicio, fim = min(meses), proximo_mes(max(meses))
+    with transaction.atomic():
+        ResumoReserva.objects.filter(imovel_id__in=imoveis, mes__gte=inicio, mes__lt=fim).delete()
+        ResumoReserva.objects.bulk_create(_calcula(Reserva.objects.filter(
+            imovel_id__in=imoveis, data_checkin__gte=inicio, data_checkin__lt=fim
+        )), batch_size=TAMANHO_LOTE)
+
+'''
+    Reconstrói o resumo inteiro a partir das reservas ativas (ex: ao habilitar o resumo ou após um loaddata)
+'''
+def reconstroi_resumo():
+    with transaction.atomic():
+        ResumoReserva.objects.all().delete()
+        resumos = _calcula(Reserva.objects.all())
+        ResumoReserva.objects.bulk_create(resumos, batch_size=TAMANHO_LOTE)
+    return len(resumos)
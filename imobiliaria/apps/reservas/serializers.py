@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from .models import Reserva
+from abstracts.serializers import CamposDinamicosMixin, RelacionadoField
+from .models import Reserva, com_codigo_unico
+from .disponibilidade import imovel_disponivel, bloqueia_imovel
 from apps.anuncios.serializers import AnuncioSerializer
 from apps.anuncios.models import Anuncio
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
 from apps.imoveis.models import Imovel
 
 '''
@@ -12,9 +14,10 @@ from apps.imoveis.models import Imovel
 class ReservaCreateSerializer(serializers.ModelSerializer):
     
     # Validação do anuncio vinculado à reserva
-    anuncio_id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=Anuncio.objects.filter(ativo=True), # Para validar que seja um id existente
+    anuncio_id = RelacionadoField(
+        Anuncio, # Para validar que seja um id existente (e ativo)
+        select_related=('imovel', 'plataforma'), # Usados na resposta (AnuncioSerializer), sem novas consultas
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID do anúncio que a reserva é vinculada.',
             'does_not_exist': 'O anúncio especificado não existe.'
@@ -51,42 +54,45 @@ class ReservaCreateSerializer(serializers.ModelSerializer):
     # Função executada implicitamente, mas é possível fazer validações personalizadas dentro dela.
     def validate(self, attrs):
         
-        # Valida se a data de checkin é menor que a data de checkout
-        if attrs['data_checkin'] > attrs['data_checkout']:
-            raise serializers.ValidationError("A data de check-in não pode ser superior à data de check-out.")
+        # Valida se a data de checkin é menor que a data de checkout (a reserva deve ter ao menos uma noite)
+        if attrs['data_checkin'] >= attrs['data_checkout']:
+            raise serializers.ValidationError("A data de check-in deve ser anterior à data de check-out.")
 
-        # Existem 3 possíveis cenários para uma reserva conflitar, 
-        # basicamente pensando checkin - checkout como uma linha, esses 3 casos são de linhas que estariam sobrepostas
-        # checkout > input_checkin AND checkout < input_checkout
-        # checkin > input_checkin AND checkout < input_checkout
-        # checkin < input_checkout AND checkin > input_checkin
-        
-        # Primeiro filtra todas reservas do mesmo imóvel
-        # Após filtrar todas as reservas do mesmo imóvel, filtra as reservas que conflitam conforme as regras acima
-        # O operador "Q" permite fazer consultas complexas
-        # gt=Maior que, gte=Maior ou igual que, lt=Menor que, lte=Menor ou igual que
-        if 'anuncio' in attrs and Reserva.objects.filter(anuncio__imovel=attrs['anuncio'].imovel).filter(
-            (
-                Q(data_checkout__gt=attrs['data_checkin'], data_checkout__lte=attrs['data_checkout']) |
-                Q(data_checkin__gte=attrs['data_checkin'], data_checkin__lt=attrs['data_checkout']) |
-                Q(data_checkin__lte=attrs['data_checkin'], data_checkout__gte=attrs['data_checkout'])
-            )
-            ).exists():
+        # Verifica se o imóvel do anúncio já possui uma reserva ativa que ocupe alguma noite do período
+        # (ver apps/reservas/disponibilidade.py)
+        if 'anuncio' in attrs and not imovel_disponivel(attrs['anuncio'].imovel_id, attrs['data_checkin'], attrs['data_checkout']):
             raise serializers.ValidationError("A reserva conflita com uma reserva existente para o mesmo imóvel.")
 
         return attrs
     
+    # A validação acima não impede que duas requisições simultâneas para o mesmo imóvel passem juntas,
+    # então a verificação é repetida com o imóvel bloqueado, na mesma transação do INSERT
+    # Em caso de colisão do código da reserva, a transação é desfeita e repetida com outro código
+    def create(self, validated_data):
+        return com_codigo_unico(lambda codigo: self._cria(validated_data, codigo))
+    
+    def _cria(self, validated_data, codigo):
+        with transaction.atomic():
+            
+            imovel_id = validated_data['anuncio'].imovel_id
+            bloqueia_imovel(imovel_id)
+            
+            if not imovel_disponivel(imovel_id, validated_data['data_checkin'], validated_data['data_checkout']):
+                raise serializers.ValidationError("A reserva conflita com uma reserva existente para o mesmo imóvel.")
+            
+            return super().create({**validated_data, 'codigo': codigo})
+    
     anuncio = AnuncioSerializer(many=False, required=False)
 
     class Meta:
         model = Reserva
         fields = '__all__' # Retorna todos dados da tabela
-        read_only_fields = ('id', 'data_criacao', 'data_hora_atualizacao', 'anuncio', 'codigo') # Define que esses campos não serão incluídos na criação
+        read_only_fields = ('id', 'ativo', 'data_criacao', 'data_hora_atualizacao', 'anuncio', 'codigo') # Define que esses campos não serão incluídos na criação
         
 '''
     Serializer responsável por retornar os dados para os métodos GET
 '''
-class ReservaSerializer(serializers.ModelSerializer):
+class ReservaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     
     anuncio = AnuncioSerializer(many=False, required=False)
 
@@ -98,9 +104,9 @@ class ReservaSerializer(serializers.ModelSerializer):
     By Imovel Serializer (validar parâmetros)
 '''
 class ImovelIdSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=Imovel.objects.filter(ativo=True), # Para validar que seja um id existente
+    id = RelacionadoField(
+        Imovel, # Para validar que seja um id existente (e ativo)
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID do imóvel que deseja listar as reservas.',
             'does_not_exist': 'O imóvel especificado não existe'
@@ -111,9 +117,9 @@ class ImovelIdSerializer(serializers.Serializer):
     By Anuncio Serializer (validar parâmetros)
 '''
 class AnuncioIdSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
-        required=True, 
-        queryset=Anuncio.objects.filter(ativo=True), # Para validar que seja um id existente
+    id = RelacionadoField(
+        Anuncio, # Para validar que seja um id existente (e ativo)
+        required=True,
         error_messages={
             'required': 'Por favor, forneça o ID do anúncio que deseja listar as reservas.',
             'does_not_exist': 'O anúncio especificado não existe'
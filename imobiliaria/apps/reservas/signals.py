@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Reserva
+from .ocupacao import atualiza_ocupacao, invalida_ocupacao
+from .resumo import atualiza_resumo
+from abstracts.cache_respostas import invalida_respostas, invalida_respostas_em_massa
+from abstracts.models import desativados
+
+'''
+    Mantém o mapa de ocupação e o resumo dos relatórios atualizados a cada reserva criada ou cancelada (soft delete)
+'''
+@receiver(post_save, sender=Reserva)
+def reserva_salva(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+
+    periodo = [(instance.imovel_id, instance.data_checkin, instance.data_checkout)]
+    if raw or (instance.ativo and not created):
+        # Sem o estado anterior da reserva (ex: datas alteradas ou reativação), o mapa é reconstruído
+        invalida_ocupacao(instance.imovel_id)
+    elif created and instance.ativo:
+        atualiza_ocupacao(periodo, ocupado=True)
+    elif update_fields and 'ativo' in update_fields:
+        # Soft delete (SoftDeletionModel.delete grava somente o ativo e a data de atualização)
+        atualiza_ocupacao(periodo, ocupado=False)
+
+    # Também no loaddata (raw): o resumo usa somente as colunas da reserva, e cada reserva carregada recalcula o mês
+    # do seu imóvel com as reservas carregadas até ali
+    atualiza_resumo([(instance.imovel_id, instance.data_checkin)])
+
+'''
+    Invalida as respostas em cache das reservas a cada alteração, inclusive o soft delete (SoftDeletionModel.delete salva o objeto)
+'''
+post_save.connect(invalida_respostas, sender=Reserva, dispatch_uid='reserva_invalida_respostas')
+post_delete.connect(invalida_respostas, sender=Reserva, dispatch_uid='reserva_invalida_respostas')
+desativados.connect(invalida_respostas_em_massa, sender=Reserva, dispatch_uid='reserva_invalida_respostas')
+
+'''
+    Reservas canceladas em massa (ex: em cascata ao remover um imóvel ou anúncio) não passam pelo save,
+    então as suas noites são desmarcadas dos mapas de ocupação e o resumo dos seus meses é recalculado
+'''
+@receiver(desativados, sender=Reserva)
+def reservas_desativadas(sender, ids, **kwargs):
+    reservas = list(Reserva.all_objects.filter(pk__in=ids).values_list('imovel_id', 'data_checkin', 'data_checkout'))
+    atualiza_ocupacao(reservas, ocupado=False)
+    atualiza_resumo((imovel_id, data_checkin) for imovel_id, data_checkin, _ in reservas)
@@ -1,18 +1,35 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature, override_settings
 from django.urls import reverse
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.utils import timezone
-from .models import Reserva
+from django.utils.http import http_date
+from django.core import serializers
+from datetime import date, timedelta
+import threading
+import json
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .models import Reserva, generate_random_code
+from .disponibilidade import imovel_disponivel, reservas_conflitantes
+from .serializers import ReservaCreateSerializer
+from rest_framework.exceptions import ValidationError
 from apps.anuncios.models import Anuncio, PlataformaAnuncio
 from apps.imoveis.models import Imovel
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import AccessToken
+from abstracts.testing import QueryCountAssertionsMixin
 
-class ReservaApiTest(TestCase):
+class ReservaApiTest(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         
+        # Descarta os mapas de ocupação e as respostas em cache de outros testes
+        cache.clear()
+        self.addCleanup(cache.clear)
+        
         # Configuração do JWT
         self.user = User.objects.create_user(username='user_teste', password='teste@123')
         self.access_token = AccessToken.for_user(self.user)
@@ -103,10 +120,10 @@ class ReservaApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Testa se duas reservas são retornadas
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data['results']), 3)
 
         # Verifica se os ids das reservas na resposta correspondem as reservas criadas
-        response_ids = [reserva['id'] for reserva in response.data]
+        response_ids = [reserva['id'] for reserva in response.data['results']]
         self.assertListEqual(response_ids, [self.reserva1.id, self.reserva2.id, self.reserva3.id])
         
     '''
@@ -292,7 +309,7 @@ class ReservaApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Verifica se o id da reserva na resposta corresponde a reserva do imóvel 2
-        response_ids = [reserva['id'] for reserva in response.data]
+        response_ids = [reserva['id'] for reserva in response.data['results']]
         self.assertListEqual(response_ids, [self.reserva3.id])
         
     '''
@@ -308,5 +325,775 @@ class ReservaApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Verifica se o id da reserva na resposta corresponde a reserva do anuncio 2
-        response_ids = [reserva['id'] for reserva in response.data]
-        self.assertListEqual(response_ids, [self.reserva3.id])
\ No newline at end of file
+        response_ids = [reserva['id'] for reserva in response.data['results']]
+        self.assertListEqual(response_ids, [self.reserva3.id])
+        
+    '''
+        Cria reservas adicionais para os testes de número de consultas, cada uma em um anúncio/imóvel novo
+    '''
+    def cria_reservas(self, quantidade):
+        for i in range(quantidade):
+            imovel = Imovel.objects.create(limite_hospedes=2)
+            plataforma = PlataformaAnuncio.objects.create(nome="Plataforma %d" % i)
+            anuncio = Anuncio.objects.create(imovel=imovel, plataforma=plataforma)
+            Reserva.objects.create(anuncio=anuncio, data_checkin="2023-07-01", data_checkout="2023-07-02")
+        
+    '''
+        Teste que verifica que a listagem de reservas não faz uma consulta por reserva (N+1)
+    '''
+    def test_list_reservas_query_count(self):
+        self.assertQueryCountConstant(reverse('reserva-list'), self.cria_reservas)
+        
+    '''
+        Teste que verifica que a listagem de reservas de um imóvel não faz uma consulta por reserva (N+1)
+    '''
+    def test_list_by_imovel_query_count(self):
+        
+        def cria_reservas(quantidade):
+            for i in range(quantidade):
+                Reserva.objects.create(anuncio=self.anuncio, data_checkin="2023-08-%02d" % (i + 1), data_checkout="2023-08-%02d" % (i + 2))
+        
+        url = reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id})
+        self.assertQueryCountConstant(url, cria_reservas)
+        
+    '''
+        Teste que verifica que a listagem de reservas de um anúncio não faz uma consulta por reserva (N+1)
+    '''
+    def test_list_by_anuncio_query_count(self):
+        
+        def cria_reservas(quantidade):
+            for i in range(quantidade):
+                Reserva.objects.create(anuncio=self.anuncio2, data_checkin="2023-08-%02d" % (i + 1), data_checkout="2023-08-%02d" % (i + 2))
+        
+        url = reverse('reserva-reserva_byanuncio', kwargs={'id_anuncio': self.anuncio2.id})
+        self.assertQueryCountConstant(url, cria_reservas)
+        
+    '''
+        Teste que verifica a paginação por cursor da listagem de reservas, inclusive com inserções entre as páginas
+    '''
+    def test_list_reservas_pagination(self):
+        
+        # Busca a primeira página com 2 reservas
+        url = reverse('reserva-list')
+        response = self.client.get(url, {'page_size': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([reserva['id'] for reserva in response.data['results']], [self.reserva1.id, self.reserva2.id])
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+        
+        # Uma reserva criada entre as requisições não desloca as páginas (não há OFFSET)
+        reserva4 = Reserva.objects.create(anuncio=self.anuncio2, data_checkin="2023-07-10", data_checkout="2023-07-11")
+        
+        response = self.client.get(response.data['next'])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([reserva['id'] for reserva in response.data['results']], [self.reserva3.id, reserva4.id])
+        self.assertIsNone(response.data['next'])
+        
+    '''
+        Teste que verifica a paginação por cursor da listagem de reservas de um imóvel
+    '''
+    def test_list_by_imovel_pagination(self):
+        
+        url = reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id})
+        response = self.client.get(url, {'page_size': 1})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([reserva['id'] for reserva in response.data['results']], [self.reserva1.id])
+        
+        response = self.client.get(response.data['next'])
+        
+        self.assertListEqual([reserva['id'] for reserva in response.data['results']], [self.reserva2.id])
+        self.assertIsNone(response.data['next'])
+        
+    '''
+        Teste que verifica a regra de disponibilidade com intervalos semiabertos [checkin, checkout)
+    '''
+    def test_disponibilidade_intervalo_semiaberto(self):
+        
+        hoje = timezone.now().date()
+        url = reverse('reserva-list')
+        
+        # Reserva de 3 noites a partir de daqui a 10 dias
+        reserva = Reserva.objects.create(anuncio=self.anuncio, data_checkin=hoje + timedelta(days=10), data_checkout=hoje + timedelta(days=13))
+        
+        # A reserva guarda o imóvel do anúncio
+        self.assertEqual(reserva.imovel_id, self.imovel.id)
+        
+        # O dia do checkout fica livre para um novo checkin (e vice-versa)
+        self.assertTrue(imovel_disponivel(self.imovel.id, hoje + timedelta(days=13), hoje + timedelta(days=15)))
+        self.assertTrue(imovel_disponivel(self.imovel.id, hoje + timedelta(days=8), hoje + timedelta(days=10)))
+        
+        # Qualquer noite em comum é um conflito, inclusive no outro anúncio do mesmo imóvel
+        self.assertFalse(imovel_disponivel(self.imovel.id, hoje + timedelta(days=12), hoje + timedelta(days=14)))
+        self.assertFalse(imovel_disponivel(self.imovel.id, hoje + timedelta(days=9), hoje + timedelta(days=11)))
+        self.assertFalse(imovel_disponivel(self.imovel.id, hoje + timedelta(days=11), hoje + timedelta(days=12)))
+        self.assertFalse(imovel_disponivel(self.imovel.id, hoje + timedelta(days=5), hoje + timedelta(days=20)))
+        
+        # Uma reserva cancelada (soft delete) não ocupa o imóvel
+        reserva.delete()
+        self.assertTrue(imovel_disponivel(self.imovel.id, hoje + timedelta(days=10), hoje + timedelta(days=13)))
+        
+        # Uma reserva sem noites (checkin igual ao checkout) é inválida
+        response = self.client.post(url, {
+            'anuncio_id': self.anuncio.id,
+            'data_checkin': str(hoje + timedelta(days=30)),
+            'data_checkout': str(hoje + timedelta(days=30))
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que a verificação de disponibilidade é uma única consulta na tabela reserva, sem JOIN
+    '''
+    def test_disponibilidade_sem_join(self):
+        
+        hoje = timezone.now().date()
+        
+        with CaptureQueriesContext(connection) as queries:
+            imovel_disponivel(self.imovel.id, hoje, hoje + timedelta(days=1))
+        
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+        
+    '''
+        Teste que simula a corrida entre duas reservas: a reserva concorrente é criada depois da validação,
+        e a verificação repetida no create (com o imóvel bloqueado) impede a reserva duplicada
+    '''
+    def test_create_reserva_revalida_disponibilidade(self):
+        
+        hoje = timezone.now().date()
+        data = {
+            'anuncio_id': self.anuncio.id,
+            'data_checkin': str(hoje + timedelta(days=10)),
+            'data_checkout': str(hoje + timedelta(days=12))
+        }
+        
+        serializer = ReservaCreateSerializer(data=data)
+        self.assertTrue(serializer.is_valid())
+        
+        # Outra requisição reserva o mesmo imóvel entre a validação e o INSERT
+        Reserva.objects.create(anuncio=self.anuncio, data_checkin=hoje + timedelta(days=11), data_checkout=hoje + timedelta(days=13))
+        
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        
+        self.assertEqual(Reserva.objects.filter(imovel=self.imovel).count(), 3)
+        
+    '''
+        Teste que verifica que o anúncio validado na criação (com imóvel e plataforma) é reaproveitado
+        no create e na resposta, sem novas consultas
+    '''
+    def test_create_reserva_reaproveita_anuncio(self):
+        
+        hoje = timezone.now().date()
+        data = {
+            'anuncio_id': self.anuncio.id,
+            'data_checkin': str(hoje + timedelta(days=20)),
+            'data_checkout': str(hoje + timedelta(days=22))
+        }
+        
+        # Requisição inicial para preencher o cache do usuário na autenticação
+        self.client.get(reverse('reserva-list'))
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reserva-list'), data)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['anuncio']['plataforma']['nome'], "Airbnb")
+        
+        # O anúncio é buscado uma única vez, já com o imóvel e a plataforma
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len([sql for sql in selects if 'FROM "anuncio"' in sql]), 1)
+        self.assertFalse([sql for sql in selects if 'FROM "plataforma_anuncio"' in sql])
+        
+    '''
+        Teste que verifica que a geração do código da reserva não consulta o banco
+    '''
+    def test_generate_random_code_sem_consulta(self):
+        with self.assertNumQueries(0):
+            codigo = generate_random_code()
+        self.assertEqual(len(codigo), 12)
+        
+    '''
+        Teste que verifica que uma colisão do código da reserva é tratada com um novo código, em vez de um erro 500
+    '''
+    def test_create_reserva_colisao_codigo(self):
+        
+        hoje = timezone.now().date()
+        data = {
+            'anuncio_id': self.anuncio.id,
+            'data_checkin': str(hoje + timedelta(days=10)),
+            'data_checkout': str(hoje + timedelta(days=12))
+        }
+        
+        # O primeiro código gerado já pertence à reserva1
+        with mock.patch('apps.reservas.models.generate_random_code', side_effect=[self.reserva1.codigo, 'NOVOCODIGO01']):
+            response = self.client.post(reverse('reserva-list'), data)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['codigo'], 'NOVOCODIGO01')
+        
+    '''
+        Teste que verifica a importação em massa de reservas, com os erros reportados por linha
+    '''
+    def test_bulk_reservas(self):
+        
+        hoje = timezone.now().date()
+        
+        # Reserva existente no imóvel 1, das noites 10 e 11
+        Reserva.objects.create(anuncio=self.anuncio, data_checkin=hoje + timedelta(days=10), data_checkout=hoje + timedelta(days=12))
+        
+        data = [
+            # Linha 1: válida (histórico no passado é aceito na importação)
+            {'anuncio_id': self.anuncio.id, 'data_checkin': "2020-01-01", 'data_checkout': "2020-01-05", 'valor_total': 500},
+            # Linha 2: conflita com a reserva existente
+            {'anuncio_id': self.anuncio.id, 'data_checkin': str(hoje + timedelta(days=11)), 'data_checkout': str(hoje + timedelta(days=13))},
+            # Linha 3: válida, começando no dia do checkout da reserva existente
+            {'anuncio_id': self.anuncio.id, 'data_checkin': str(hoje + timedelta(days=12)), 'data_checkout': str(hoje + timedelta(days=14))},
+            # Linha 4: conflita com a linha 3 do mesmo lote
+            {'anuncio_id': self.anuncio.id, 'data_checkin': str(hoje + timedelta(days=13)), 'data_checkout': str(hoje + timedelta(days=15))},
+            # Linha 5: válida, no imóvel 2
+            {'anuncio_id': self.anuncio2.id, 'data_checkin': str(hoje + timedelta(days=13)), 'data_checkout': str(hoje + timedelta(days=15))},
+            # Linha 6: anúncio inexistente
+            {'anuncio_id': 999, 'data_checkin': str(hoje + timedelta(days=1)), 'data_checkout': str(hoje + timedelta(days=2))},
+            # Linha 7: checkin posterior ao checkout
+            {'anuncio_id': self.anuncio.id, 'data_checkin': str(hoje + timedelta(days=30)), 'data_checkout': str(hoje + timedelta(days=29))},
+        ]
+        
+        # Faz uma requisição POST para o endpoint
+        response = self.client.post(reverse('reserva-reserva_bulk'), data, format='json')
+        
+        # Verifica se a resposta tem status code 207 (somente parte das reservas foi criada)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        
+        self.assertEqual(response.data['criadas'], 3)
+        self.assertListEqual([reserva['linha'] for reserva in response.data['reservas']], [1, 3, 5])
+        self.assertListEqual([erro['linha'] for erro in response.data['erros']], [2, 4, 6, 7])
+        self.assertIn('anuncio_id', response.data['erros'][2]['erros'])
+        
+        # Verifica se as reservas foram de fato criadas, com o imóvel e o código preenchidos
+        for reserva in response.data['reservas']:
+            self.assertTrue(Reserva.objects.filter(codigo=reserva['codigo'], ativo=True).exists())
+        self.assertEqual(Reserva.objects.filter(imovel=self.imovel2).count(), 2)
+        
+    '''
+        Teste que verifica a importação em massa de reservas no formato NDJSON
+    '''
+    def test_bulk_reservas_ndjson(self):
+        
+        hoje = timezone.now().date()
+        linhas = [
+            {'anuncio_id': self.anuncio2.id, 'data_checkin': str(hoje + timedelta(days=i)), 'data_checkout': str(hoje + timedelta(days=i + 1))}
+            for i in range(1, 4)
+        ]
+        body = '\n'.join(json.dumps(linha) for linha in linhas)
+        
+        response = self.client.post(reverse('reserva-reserva_bulk'), body, content_type='application/x-ndjson')
+        
+        # Verifica se a resposta tem status code 201 (todas as reservas criadas)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['criadas'], 3)
+        
+    '''
+        Teste que verifica que o número de consultas da importação não cresce com o tamanho do lote
+    '''
+    def test_bulk_reservas_query_count(self):
+        
+        hoje = timezone.now().date()
+        
+        def lote(tamanho, deslocamento):
+            return [
+                {'anuncio_id': anuncio.id, 'data_checkin': str(hoje + timedelta(days=deslocamento + i)), 'data_checkout': str(hoje + timedelta(days=deslocamento + i + 1))}
+                for i in range(tamanho) for anuncio in (self.anuncio, self.anuncio2)
+            ]
+        
+        # Requisição inicial para preencher o cache do usuário na autenticação
+        self.client.get(reverse('reserva-list'))
+        
+        with CaptureQueriesContext(connection) as pequeno:
+            self.client.post(reverse('reserva-reserva_bulk'), lote(2, 100), format='json')
+        with CaptureQueriesContext(connection) as grande:
+            response = self.client.post(reverse('reserva-reserva_bulk'), lote(40, 200), format='json')
+        
+        self.assertEqual(response.data['criadas'], 80)
+        self.assertEqual(len(pequeno), len(grande))
+        
+    '''
+        Teste que verifica a cotação de reservas, com os valores calculados em Decimal no servidor
+    '''
+    def test_cotacao_reservas(self):
+        
+        url = reverse('reserva-reserva_cotacao')
+        self.imovel2.valor_limpeza = 100.1
+        self.imovel2.save()
+        
+        linhas = [
+            {'anuncio_id': self.anuncio.id, 'data_checkin': '2030-01-01', 'data_checkout': '2030-01-04', 'valor_diaria': '199.99'},
+            {'anuncio_id': self.anuncio2.id, 'data_checkin': '2030-01-01', 'data_checkout': '2030-01-02'},
+            {'anuncio_id': self.anuncio.id, 'data_checkin': '2030-01-04', 'data_checkout': '2030-01-04'},
+            {'anuncio_id': 9999, 'data_checkin': '2030-01-01', 'data_checkout': '2030-01-02'},
+        ]
+        response = self.client.post(url, linhas, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        
+        # 3 noites de 199,99 (599,97) + limpeza de 100,00 + taxa de 50% sobre 699,97 (349,985, arredondado para 349,99)
+        cotacao = response.data['cotacoes'][0]
+        self.assertEqual(cotacao['linha'], 1)
+        self.assertEqual(cotacao['noites'], 3)
+        self.assertEqual(cotacao['diarias'], '599.97')
+        self.assertEqual(cotacao['limpeza'], '100.00')
+        self.assertEqual(cotacao['taxa'], '349.99')
+        self.assertEqual(cotacao['valor_total'], '1049.96')
+        
+        # Sem o valor da diária, somente limpeza e taxa (50% de 100,10 = 50,05)
+        cotacao = response.data['cotacoes'][1]
+        self.assertEqual((cotacao['limpeza'], cotacao['taxa'], cotacao['valor_total']), ('100.10', '50.05', '150.15'))
+        
+        self.assertEqual([erro['linha'] for erro in response.data['erros']], [3, 4])
+        self.assertIn('anuncio_id', response.data['erros'][1]['erros'])
+        
+        # Uma cotação isolada (objeto em vez de lista)
+        response = self.client.post(url, {'anuncio_id': self.anuncio.id, 'data_checkin': '2030-01-01', 'data_checkout': '2030-01-02', 'valor_diaria': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cotacoes'][0]['valor_total'], '165.00')
+        
+        # Somente linhas inválidas
+        response = self.client.post(url, [{'anuncio_id': self.anuncio.id}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que o número de consultas da cotação não cresce com o tamanho do lote
+    '''
+    def test_cotacao_reservas_query_count(self):
+        
+        def lote(tamanho):
+            return [
+                {'anuncio_id': anuncio.id, 'data_checkin': '2030-01-01', 'data_checkout': '2030-01-0%d' % (2 + i % 7), 'valor_diaria': '150.50'}
+                for i in range(tamanho) for anuncio in (self.anuncio, self.anuncio2)
+            ]
+        
+        # Requisição inicial para preencher o cache do usuário na autenticação
+        self.client.get(reverse('reserva-list'))
+        
+        with CaptureQueriesContext(connection) as pequeno:
+            self.client.post(reverse('reserva-reserva_cotacao'), lote(1), format='json')
+        with CaptureQueriesContext(connection) as grande:
+            response = self.client.post(reverse('reserva-reserva_cotacao'), lote(50), format='json')
+        
+        self.assertEqual(len(response.data['cotacoes']), 100)
+        self.assertEqual(len(pequeno), len(grande))
+        self.assertEqual(len(grande), 1)
+        
+    '''
+        Teste que verifica o relatório de ocupação e receita, pelo resumo materializado e direto das reservas
+    '''
+    def test_relatorio_reservas(self):
+        
+        url = reverse('reserva-reserva_relatorio')
+        
+        # Reserva com check-in em julho e checkout em agosto: conta inteira em julho
+        Reserva.objects.create(anuncio=self.anuncio, valor_total=300.1, data_checkin='2023-07-30', data_checkout='2023-08-02')
+        
+        params = {'agrupamento': 'mes', 'inicio': '2023-07-01', 'fim': '2023-09-01'}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['fonte'], 'resumo')
+        self.assertEqual(response.data['grupos'], [
+            {'mes': '2023-07-01', 'reservas': 4, 'noites': 6, 'receita': '800.10', 'noites_disponiveis': 62, 'taxa_ocupacao': 0.0968}
+        ])
+        
+        # O mesmo resultado somando as reservas
+        with override_settings(RELATORIO_RESUMO=False):
+            response_reservas = self.client.get(url, params)
+        self.assertEqual(response_reservas.data['fonte'], 'reservas')
+        self.assertEqual(response_reservas.data['grupos'], response.data['grupos'])
+        
+        # Período fora do mês inteiro: direto das reservas
+        response = self.client.get(url, {'agrupamento': 'imovel', 'inicio': '2023-07-01', 'fim': '2023-07-11'})
+        self.assertEqual(response.data['fonte'], 'reservas')
+        self.assertEqual(response.data['grupos'], [
+            {'imovel_id': self.imovel.id, 'reservas': 2, 'noites': 2, 'receita': '300.00', 'noites_disponiveis': 10, 'taxa_ocupacao': 0.2},
+            {'imovel_id': self.imovel2.id, 'reservas': 1, 'noites': 1, 'receita': '200.00', 'noites_disponiveis': 10, 'taxa_ocupacao': 0.1},
+        ])
+        
+        response = self.client.get(url, {'agrupamento': 'plataforma', 'inicio': '2023-07-01', 'fim': '2023-08-01', 'imovel': self.imovel.id})
+        self.assertEqual(response.data['grupos'], [
+            {'plataforma_id': self.anuncio.plataforma_id, 'reservas': 3, 'noites': 5, 'receita': '600.10', 'noites_disponiveis': 31, 'taxa_ocupacao': 0.1613}
+        ])
+        
+        # O resumo acompanha o cancelamento, a importação em massa e o cancelamento em cascata
+        self.reserva1.delete()
+        self.client.post(reverse('reserva-reserva_bulk'), [
+            {'anuncio_id': self.anuncio2.id, 'valor_total': 50, 'data_checkin': '2023-08-10', 'data_checkout': '2023-08-12'}
+        ], format='json')
+        grupos = self.client.get(url, params).data['grupos']
+        self.assertEqual([(grupo['mes'], grupo['reservas'], grupo['noites'], grupo['receita']) for grupo in grupos], [
+            ('2023-07-01', 3, 5, '700.10'), ('2023-08-01', 1, 2, '50.00')
+        ])
+        
+        self.imovel2.delete()
+        with CaptureQueriesContext(connection) as queries:
+            grupos = self.client.get(url, params).data['grupos']
+        self.assertEqual([(grupo['mes'], grupo['reservas'], grupo['noites'], grupo['receita']) for grupo in grupos], [
+            ('2023-07-01', 2, 4, '500.10')
+        ])
+        
+        # Uma consulta de agregação e uma da quantidade de imóveis, independente do número de reservas
+        self.assertEqual(len(queries), 2)
+        
+        # Reservas carregadas por loaddata (save "raw") também entram no resumo
+        fixture = serializers.serialize('json', [Reserva(
+            anuncio=self.anuncio, imovel=self.imovel, codigo='FIXTURE1', valor_total=10, data_checkin=date(2023, 8, 20), data_checkout=date(2023, 8, 21),
+            data_hora_criacao=timezone.now(), data_hora_atualizacao=timezone.now()
+        )])
+        for objeto in serializers.deserialize('json', fixture):
+            objeto.save()
+        grupos = self.client.get(url, params).data['grupos']
+        self.assertEqual([(grupo['mes'], grupo['reservas'], grupo['noites'], grupo['receita']) for grupo in grupos], [
+            ('2023-07-01', 2, 4, '500.10'), ('2023-08-01', 1, 1, '10.00')
+        ])
+        
+        # Parâmetros inválidos
+        response = self.client.get(url, {'agrupamento': 'semana', 'inicio': '2023-07-01', 'fim': '2023-08-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'agrupamento': 'mes', 'inicio': '2023-08-01', 'fim': '2023-07-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica a exportação das reservas em NDJSON, com filtros
+    '''
+    def test_export_reservas_ndjson(self):
+        
+        self.reserva2.delete()
+        
+        # Faz uma requisição GET para o endpoint
+        response = self.client.get(reverse('reserva-reserva_export'), {'imovel': self.imovel.id, 'inicio': "2023-07-01", 'fim': "2023-08-01"})
+        
+        # Testa se a resposta tem status code 200 (OK) e é um streaming
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        
+        # Somente a reserva1 é ativa e do imóvel 1
+        linhas = [json.loads(linha) for linha in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(linhas), 1)
+        self.assertEqual(linhas[0]['codigo'], self.reserva1.codigo)
+        self.assertEqual(linhas[0]['imovel_id'], self.imovel.id)
+        self.assertEqual(linhas[0]['plataforma'], "Airbnb")
+        self.assertEqual(linhas[0]['data_checkin'], "2023-07-01")
+        
+    '''
+        Teste que verifica a exportação das reservas em CSV, buscando o resultado em blocos
+    '''
+    def test_export_reservas_csv(self):
+        
+        # Com blocos de 2 linhas, as 3 reservas são buscadas em 2 consultas
+        with mock.patch('abstracts.exportacao.TAMANHO_BLOCO', 2):
+            response = self.client.get(reverse('reserva-reserva_export'), {'formato': 'csv'})
+            with CaptureQueriesContext(connection) as queries:
+                conteudo = b''.join(response.streaming_content).decode()
+        
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(queries), 2)
+        
+        linhas = conteudo.splitlines()
+        self.assertEqual(linhas[0].split(',')[:2], ['id', 'codigo'])
+        self.assertListEqual([int(linha.split(',')[0]) for linha in linhas[1:]], [self.reserva1.id, self.reserva2.id, self.reserva3.id])
+        
+        # Formato inválido
+        response = self.client.get(reverse('reserva-reserva_export'), {'formato': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que a leitura plana com todos os relacionamentos expandidos retorna o mesmo que o serializer
+    '''
+    def test_list_reservas_leitura_plana(self):
+        
+        url = reverse('reserva-list')
+        response_serializer = self.client.get(url)
+        response_plana = self.client.get(url, {'expand': 'anuncio,anuncio.imovel,anuncio.plataforma'})
+        
+        self.assertEqual(response_plana.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response_plana.content), json.loads(response_serializer.content))
+        
+    '''
+        Teste que verifica a leitura plana somente com alguns campos, sem JOIN com os relacionamentos
+    '''
+    def test_list_reservas_leitura_plana_fields(self):
+        
+        url = reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id})
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'data_checkin,data_checkout,anuncio', 'page_size': 1})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data['results'], [{'anuncio': self.anuncio.id, 'data_checkin': '2023-07-01', 'data_checkout': '2023-07-02'}])
+        self.assertNotIn('JOIN', queries.captured_queries[-1]['sql'])
+        
+        # A paginação por cursor continua funcionando com a leitura plana
+        response = self.client.get(response.data['next'])
+        self.assertListEqual(response.data['results'], [{'anuncio': self.anuncio.id, 'data_checkin': '2023-07-03', 'data_checkout': '2023-07-04'}])
+        
+        # Campos de objetos aninhados expandem o relacionamento automaticamente
+        response = self.client.get(url, {'fields': 'id,anuncio.imovel.limite_hospedes'})
+        self.assertEqual(response.data['results'][0], {'id': self.reserva1.id, 'anuncio': {'imovel': {'limite_hospedes': 2}}})
+        
+        # Campo desconhecido
+        response = self.client.get(url, {'fields': 'id,senha'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        
+    '''
+        Teste que verifica ?fields= e ?expand= na busca de uma reserva por id: a resposta é reduzida
+        e somente os relacionamentos expandidos são carregados (JOIN)
+    '''
+    def test_get_single_reserva_fields_expand(self):
+        
+        url = reverse('reserva-detail', kwargs={'pk': self.reserva1.id})
+        
+        # Relacionamento não expandido: somente o id do anúncio, sem JOIN
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,codigo,anuncio'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.reserva1.id, 'codigo': self.reserva1.codigo, 'anuncio': self.anuncio.id})
+        self.assertNotIn('JOIN', queries.captured_queries[-1]['sql'])
+        
+        # Anúncio expandido, com o imóvel e a plataforma somente pelo id
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id', 'expand': 'anuncio'})
+        self.assertEqual(response.data['anuncio']['imovel'], self.imovel.id)
+        self.assertEqual(response.data['anuncio']['plataforma'], self.anuncio.plataforma_id)
+        self.assertEqual(queries.captured_queries[-1]['sql'].count('JOIN'), 1)
+        
+        # Campos de objetos aninhados expandem o relacionamento automaticamente
+        response = self.client.get(url, {'fields': 'id,anuncio.imovel.limite_hospedes'})
+        self.assertEqual(response.data, {'id': self.reserva1.id, 'anuncio': {'imovel': {'limite_hospedes': 2}}})
+        
+        # A mesma resposta da leitura plana da listagem
+        response_lista = self.client.get(reverse('reserva-list'), {'fields': 'id,anuncio.imovel.limite_hospedes', 'expand': 'anuncio.plataforma'})
+        response = self.client.get(url, {'fields': 'id,anuncio.imovel.limite_hospedes', 'expand': 'anuncio.plataforma'})
+        self.assertEqual(response.data, response_lista.data['results'][0])
+        
+        # Relacionamento desconhecido
+        response = self.client.get(url, {'expand': 'hospede'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica o ETag / Last-Modified das listagens e da busca por id, com 304 nas requisições condicionais
+    '''
+    def test_list_reservas_etag(self):
+        
+        url = reverse('reserva-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        
+        # Versão atual: 304 sem serializar (somente a consulta da versão)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        
+        # Last-Modified somente na busca por id: na listagem a remoção de uma linha não aumenta a maior data
+        self.assertNotIn('Last-Modified', response)
+        url_detalhe = reverse('reserva-detail', kwargs={'pk': self.reserva1.id})
+        response = self.client.get(url_detalhe)
+        response = self.client.get(url_detalhe, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # Outros parâmetros são outra versão
+        response = self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Alterar um relacionamento retornado na resposta (imóvel do anúncio) muda a versão
+        self.imovel.limite_hospedes = 4
+        self.imovel.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        
+        # Soft delete de uma reserva também
+        etag = response['ETag']
+        self.reserva2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Busca por id e listagem por imóvel
+        for url in (reverse('reserva-detail', kwargs={'pk': self.reserva1.id}), reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id})):
+            response = self.client.get(url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+    '''
+        Teste que verifica que a listagem não responde 304 pelo If-Modified-Since depois do soft delete de uma reserva
+        (a reserva sai da listagem sem aumentar a maior data de atualização das restantes)
+    '''
+    def test_list_reservas_if_modified_since(self):
+        
+        url = reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id})
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotIn('Last-Modified', response)
+        
+        # Data que a listagem enviaria como Last-Modified: a da reserva mais recente
+        Reserva.objects.filter(pk=self.reserva1.pk).update(data_hora_atualizacao=timezone.now() - timedelta(days=1))
+        ultima_atualizacao = Reserva.objects.get(pk=self.reserva2.pk).data_hora_atualizacao
+        
+        self.reserva1.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(ultima_atualizacao.timestamp() + 1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([reserva['id'] for reserva in response.data['results']], [self.reserva2.id])
+        
+    '''
+        Teste que verifica a sincronização incremental das reservas: páginas com cursor de continuação e
+        as reservas removidas (soft delete) retornadas como tombstones
+    '''
+    @override_settings(SINCRONIZACAO_ATRASO=0)
+    def test_changes_reservas(self):
+        
+        url = reverse('reserva-changes')
+        
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertTrue(response.data['has_more'])
+        
+        # Os relacionamentos são retornados somente pelo id
+        reserva = response.data['results'][0]
+        self.assertEqual(reserva['id'], self.reserva1.id)
+        self.assertEqual(reserva['anuncio'], self.anuncio.id)
+        self.assertFalse(reserva['removido'])
+        
+        response = self.client.get(url, {'cursor': response.data['cursor']})
+        self.assertEqual([reserva['id'] for reserva in response.data['results']], [self.reserva2.id, self.reserva3.id])
+        self.assertFalse(response.data['has_more'])
+        cursor = response.data['cursor']
+        
+        # Sem alterações: nenhum registro e o mesmo cursor
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertListEqual(response.data['results'], [])
+        self.assertEqual(response.data['cursor'], cursor)
+        
+        # Alteração e remoção após o cursor
+        self.reserva2.comentario = 'Alterada'
+        self.reserva2.save()
+        self.reserva1.delete()
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertListEqual(response.data['results'], [
+            {**response.data['results'][0], 'id': self.reserva2.id, 'comentario': 'Alterada', 'removido': False},
+            {'id': self.reserva1.id, 'removido': True},
+        ])
+        
+        # Marca d'água por data/hora
+        response = self.client.get(url, {'since': (timezone.now() - timedelta(hours=1)).isoformat()})
+        self.assertEqual(len(response.data['results']), 3)
+        
+        # Parâmetros inválidos
+        response = self.client.get(url, {'cursor': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'since': 'ontem'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que o manager padrão retorna somente as reservas ativas, em todas as consultas
+    '''
+    def test_manager_somente_ativas(self):
+        
+        self.reserva1.delete()
+        
+        self.assertEqual(Reserva.objects.filter(imovel=self.imovel).count(), 1)
+        self.assertEqual(Reserva.all_objects.filter(imovel=self.imovel).count(), 2)
+        
+        # O acesso pelo relacionamento continua encontrando o anúncio de uma reserva inativa
+        self.assertEqual(Reserva.all_objects.get(id=self.reserva1.id).anuncio, self.anuncio)
+        
+        # A listagem por imóvel não retorna a reserva deletada
+        response = self.client.get(reverse('reserva-reserva_byimovel', kwargs={'id_imovel': self.imovel.id}))
+        self.assertListEqual([reserva['id'] for reserva in response.data['results']], [self.reserva2.id])
+        
+    '''
+        Teste que verifica pelo plano de execução que as consultas das reservas ativas usam os índices compostos
+    '''
+    def test_indices_reservas_ativas(self):
+        
+        self.assertUsaIndice(Reserva.objects.filter(imovel_id=self.imovel.id).order_by('id'), 'reserva_imovel_ativo_idx')
+        self.assertUsaIndice(Reserva.objects.filter(anuncio_id=self.anuncio.id).order_by('id'), 'reserva_anuncio_ativo_idx')
+        self.assertUsaIndice(reservas_conflitantes(self.imovel.id, timezone.now().date(), timezone.now().date() + timedelta(days=2)), 'reserva_imovel_periodo_idx')
+
+'''
+    Testes de concorrência da criação de reservas (requisições simultâneas em threads)
+    Precisa de um banco com SELECT ... FOR UPDATE (MySQL), por isso não roda no SQLite
+'''
+@skipUnlessDBFeature('has_select_for_update')
+class ReservaConcorrenciaTest(TransactionTestCase):
+    def setUp(self):
+        
+        # Configuração do JWT
+        self.user = User.objects.create_user(username='user_teste', password='teste@123')
+        self.access_token = AccessToken.for_user(self.user)
+        
+        # Cria 10 imóveis, cada um com um anúncio
+        plataforma_anuncio = PlataformaAnuncio.objects.create(
+            taxa=50,
+            nome="Airbnb"
+        )
+        self.anuncios = [
+            Anuncio.objects.create(imovel=Imovel.objects.create(limite_hospedes=2), plataforma=plataforma_anuncio)
+            for _ in range(10)
+        ]
+        
+        hoje = timezone.now().date()
+        self.data_checkin = str(hoje + timedelta(days=10))
+        self.data_checkout = str(hoje + timedelta(days=12))
+        
+    '''
+        Envia, ao mesmo tempo, uma reserva para cada anúncio da lista e retorna os status codes das respostas
+    '''
+    def envia_reservas(self, anuncios):
+        
+        # A barreira faz todas as threads enviarem a requisição no mesmo instante
+        barreira = threading.Barrier(len(anuncios))
+        status_codes = []
+        
+        def envia_reserva(anuncio):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(self.access_token))
+            try:
+                barreira.wait()
+                response = client.post(reverse('reserva-list'), {
+                    'anuncio_id': anuncio.id,
+                    'data_checkin': self.data_checkin,
+                    'data_checkout': self.data_checkout
+                })
+                status_codes.append(response.status_code)
+            finally:
+                # Cada thread possui a sua conexão com o banco
+                connection.close()
+        
+        threads = [threading.Thread(target=envia_reserva, args=(anuncio,)) for anuncio in anuncios]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        return status_codes
+        
+    '''
+        Teste que verifica que, de várias reservas simultâneas para o mesmo período do mesmo imóvel, somente uma é criada
+    '''
+    def test_reservas_simultaneas_mesmo_imovel(self):
+        
+        status_codes = self.envia_reservas([self.anuncios[0]] * 10)
+        
+        self.assertEqual(status_codes.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(status_codes.count(status.HTTP_400_BAD_REQUEST), 9)
+        self.assertEqual(Reserva.objects.filter(imovel=self.anuncios[0].imovel).count(), 1)
+        
+    '''
+        Teste que verifica que reservas simultâneas em imóveis diferentes não se bloqueiam
+    '''
+    def test_reservas_simultaneas_imoveis_diferentes(self):
+        
+        status_codes = self.envia_reservas(self.anuncios)
+        
+        self.assertListEqual(status_codes, [status.HTTP_201_CREATED] * 10)
+        self.assertEqual(Reserva.objects.count(), 10)
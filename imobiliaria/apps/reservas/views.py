@@ -1,18 +1,45 @@
 from rest_framework import viewsets
 from .models import Reserva
 from .serializers import *
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from abstracts.autenticacao import JWTStatelessAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from abstracts.parsers import NDJSONParser
+from abstracts.serializers import ExportacaoSerializer
+from abstracts.exportacao import exporta
+from .importacao import importa_reservas
+from .cotacao import cota_lote
+from .relatorios import RelatorioSerializer, monta_relatorio
+from abstracts.importacao import status_importacao
+from abstracts.views import LeituraPlanaMixin, SincronizacaoMixin
+
+# Colunas da exportação de reservas: {coluna no arquivo: campo}
+COLUNAS_EXPORTACAO = {
+    'id': 'id',
+    'codigo': 'codigo',
+    'anuncio_id': 'anuncio_id',
+    'imovel_id': 'imovel_id',
+    'plataforma_id': 'anuncio__plataforma_id',
+    'plataforma': 'anuncio__plataforma__nome',
+    'data_checkin': 'data_checkin',
+    'data_checkout': 'data_checkout',
+    'valor_total': 'valor_total',
+    'comentario': 'comentario',
+    'data_hora_criacao': 'data_hora_criacao',
+    'data_hora_atualizacao': 'data_hora_atualizacao',
+}
 
 '''
     CRUD de Reserva, sem incluir PUT ou PATCH
 '''
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(LeituraPlanaMixin, SincronizacaoMixin, viewsets.ModelViewSet):
     
     # Definindo a classe de autenticação
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTStatelessAuthentication]
 
     # Somente usuários autenticados podem acessar os métodos da ReservaViewSet
     permission_classes = [IsAuthenticated]
@@ -21,10 +48,11 @@ class ReservaViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete']
     
     '''
-        Definição do queryset para considerar que os que tenham ativo=0 "não existem"
+        Definição do queryset para considerar que os que tenham ativo=0 "não existem" (o manager padrão retorna somente os ativos)
+        (já carregando anúncio, imóvel e plataforma no mesmo SELECT)
     '''
     def get_queryset(self):
-        return Reserva.objects.filter(ativo=True)
+        return self.eager_load(Reserva.objects.all())
     
     '''
         Definição dos serializers para cada método da VIEW
@@ -45,13 +73,11 @@ class ReservaViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         # Busca as reservas pertencentes ao imóvel
-        id_imovel = serializer.validated_data['id']
-        reservas = Reserva.objects.filter(anuncio__imovel_id=id_imovel)
-        
-        # Serializa os dados para retornar
-        serializer = ReservaSerializer(reservas, many=True)
+        imovel = serializer.validated_data['id'] # Objeto já buscado e validado pelo RelacionadoField
+        reservas = Reserva.objects.filter(imovel=imovel)
         
-        return Response(serializer.data)
+        # Pagina (por cursor) e serializa os dados para retornar
+        return self.lista(reservas, ReservaSerializer)
     
     '''
         View referente a listagem de reservas a partir de um anúncio
@@ -64,10 +90,72 @@ class ReservaViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         # Busca as reservas pertencentes ao anuncio
-        id_anuncio = serializer.validated_data['id']
-        reservas = Reserva.objects.filter(anuncio_id=id_anuncio)
+        anuncio = serializer.validated_data['id'] # Objeto já buscado e validado pelo RelacionadoField
+        reservas = Reserva.objects.filter(anuncio=anuncio)
+        
+        # Pagina (por cursor) e serializa os dados para retornar
+        return self.lista(reservas, ReservaSerializer)
+    
+    '''
+        View referente a importação em massa de reservas, recebendo uma lista JSON ou um corpo NDJSON (uma reserva por linha)
+        As linhas válidas são criadas e as inválidas são retornadas com os seus erros (ver apps/reservas/importacao.py)
+    '''
+    @action(detail=False, methods=['POST'], url_path='bulk', url_name='reserva_bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        
+        if not isinstance(request.data, list):
+            raise ValidationError("Por favor, forneça uma lista de reservas.")
+        
+        relatorio = importa_reservas(request.data)
+        
+        # 201 se todas as reservas foram criadas, 207 se somente algumas e 400 se nenhuma
+        return Response(relatorio, status=status_importacao(relatorio['criadas'], relatorio['erros']))
+    
+    '''
+        View referente a cotação de reservas, recebendo uma cotação ou uma lista delas (JSON ou NDJSON)
+        Todos os anúncios do lote são buscados em uma consulta e os valores são calculados em Decimal (ver apps/reservas/cotacao.py)
+    '''
+    @action(detail=False, methods=['POST'], url_path='cotacao', url_name='reserva_cotacao', parser_classes=[JSONParser, NDJSONParser])
+    def cotacao(self, request):
+        
+        linhas = request.data if isinstance(request.data, list) else [request.data]
+        relatorio = cota_lote(linhas, self.get_serializer_context())
+        
+        # 200 se todas as linhas foram cotadas, 207 se somente algumas e 400 se nenhuma
+        return Response(relatorio, status=status_importacao(relatorio['cotacoes'], relatorio['erros'], sucesso=status.HTTP_200_OK))
+    
+    '''
+        View referente ao relatório de ocupação e receita por imóvel, plataforma ou mês, agregado no banco
+        Parâmetros: ?agrupamento=imovel|plataforma|mes&inicio=<data>&fim=<data>[&imovel=<id>][&plataforma=<id>]
+        (ver apps/reservas/relatorios.py)
+    '''
+    @action(detail=False, methods=['GET'], url_path='relatorio', url_name='reserva_relatorio')
+    def relatorio(self, request):
+        
+        # Usa o Serializer para validar a entrada
+        serializer = RelatorioSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        return Response(monta_relatorio(**serializer.validated_data))
+    
+    '''
+        View referente a exportação (CSV ou NDJSON) das reservas ativas, em streaming
+        Filtros opcionais: ?imovel=<id>&inicio=<data>&fim=<data> (reservas com checkin em [inicio, fim))
+    '''
+    @action(detail=False, methods=['GET'], url_path='export', url_name='reserva_export')
+    def export(self, request):
+        
+        # Usa o Serializer para validar a entrada
+        serializer = ExportacaoSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        parametros = serializer.validated_data
         
-        # Serializa os dados para retornar
-        serializer = ReservaSerializer(reservas, many=True)
+        reservas = Reserva.objects.all()
+        if 'imovel' in parametros:
+            reservas = reservas.filter(imovel_id=parametros['imovel'])
+        if 'inicio' in parametros:
+            reservas = reservas.filter(data_checkin__gte=parametros['inicio'])
+        if 'fim' in parametros:
+            reservas = reservas.filter(data_checkin__lt=parametros['fim'])
         
-        return Response(serializer.data)
\ No newline at end of file
+        return exporta(reservas, COLUNAS_EXPORTACAO, parametros['formato'], 'reservas')
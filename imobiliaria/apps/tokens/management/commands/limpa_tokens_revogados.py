@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.tokens.models import TokenRevogado
+
+'''
+    Remove as revogações de tokens já expirados (que deixam de ser aceitos pela própria expiração)
+
+    Uso: python manage.py limpa_tokens_revogados
+'''
+class Command(BaseCommand):
+    help = 'Remove as revogações de tokens já expirados'
+
+    def handle(self, *args, **options):
+        removidos, _ = TokenRevogado.objects.filter(expira_em__lte=timezone.now()).delete()
+        self.stdout.write('%d revogações expiradas removidas' % removidos)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevogado',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='Identificador (claim jti) do token revogado')),
+                ('expira_em', models.DateTimeField(db_index=True, verbose_name='Expiracao do token (claim exp), a partir da qual o registro pode ser removido')),
+                ('data_hora_criacao', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data e hora da revogacao')),
+            ],
+            options={
+                'db_table': 'token_revogado',
+            },
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import models
+
+'''
+    Tokens JWT revogados (refresh ou access), identificados pela claim "jti"
+    Guardados somente até a expiração do token, depois disso o próprio token deixa de ser aceito
+'''
+class TokenRevogado(models.Model):
+    id = models.AutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True, verbose_name="Identificador (claim jti) do token revogado")
+    expira_em = models.DateTimeField(db_index=True, verbose_name="Expiracao do token (claim exp), a partir da qual o registro pode ser removido")
+    data_hora_criacao = models.DateTimeField(auto_now_add=True, editable=False, db_index=True, verbose_name="Data e hora da revogacao")
+    
+    class Meta:
+        db_table = 'token_revogado'
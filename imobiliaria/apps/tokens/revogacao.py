@@ -0,0 +1,158 @@
+import hashlib
+import time
+from datetime import timedelta
+from threading import Lock
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from abstracts.cache_local import CacheTTL
+from .models import TokenRevogado
+
+'''
+    Revogação de tokens JWT com custo quase zero por requisição
+
+    Os JTIs revogados ficam no banco (TokenRevogado), mas a verificação é feita em memória, em cada processo:
+        - filtro de bloom com todos os JTIs revogados e ainda não expirados: um token fora do filtro
+          (o caso de quase todas as requisições) certamente não foi revogado, sem consulta ao banco;
+        - conjunto com TTL dos JTIs confirmados: revogados recentemente (sincronização incremental)
+          ou já consultados no banco após um acerto do filtro, o que resolve os falsos positivos.
+
+    A cada REVOGACAO_SINCRONIZACAO segundos o processo lê do banco as revogações novas (de outros processos)
+    e a cada REVOGACAO_RECONSTRUCAO segundos reconstrói o filtro, descartando os tokens já expirados.
+    Revogações feitas no próprio processo valem imediatamente.
+'''
+
+# Sobreposição da sincronização incremental, para não perder revogações gravadas em transações
+# que terminaram depois da leitura anterior
+MARGEM_SINCRONIZACAO = timedelta(seconds=60)
+
+'''
+    Filtro de bloom simples sobre um bytearray, com "hashes" posições por valor (double hashing do blake2b)
+'''
+class FiltroBloom:
+
+    def __init__(self, bits, hashes=7):
+        self.bits = bits
+        self.hashes = hashes
+        self._mapa = bytearray(bits // 8 + 1)
+
+    def _posicoes(self, valor):
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def adiciona(self, valor):
+        for posicao in self._posicoes(valor):
+            self._mapa[posicao >> 3] |= 1 << (posicao & 7)
+
+    def __contains__(self, valor):
+        return all(self._mapa[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(valor))
+
+'''
+    Estado da revogação em memória de um processo
+'''
+class Revogacoes:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._filtro = None
+        self._confirmados = None
+        self._sincronizado_em = 0
+        self._reconstruido_em = 0
+        self._lido_ate = None
+
+    '''
+        Verifica se o JTI foi revogado (consulta o banco somente em um acerto do filtro ainda não confirmado)
+    '''
+    def revogado(self, jti):
+        self._atualiza()
+
+        if jti not in self._filtro:
+            return False
+
+        revogado = self._confirmados.get(jti)
+        if revogado is None:
+            revogado = TokenRevogado.objects.filter(jti=jti, expira_em__gt=timezone.now()).exists()
+            self._confirmados.set(jti, revogado)
+        return revogado
+
+    '''
+        Grava a revogação do JTI e a aplica imediatamente neste processo
+    '''
+    def revoga(self, jti, expira_em):
+        TokenRevogado.objects.get_or_create(jti=jti, defaults={'expira_em': expira_em})
+
+        self._atualiza()
+        with self._lock:
+            self._adiciona(jti)
+
+    '''
+        Descarta o estado em memória, que será reconstruído na próxima verificação
+    '''
+    def limpa(self):
+        with self._lock:
+            self._filtro = None
+
+    def _adiciona(self, jti):
+        self._filtro.adiciona(jti)
+        self._confirmados.set(jti, True)
+
+    def _atualiza(self):
+        agora = time.monotonic()
+        if self._filtro is not None and agora - self._sincronizado_em < settings.REVOGACAO_SINCRONIZACAO:
+            return
+
+        with self._lock:
+            # Outra thread pode ter sincronizado enquanto esta aguardava o lock
+            if self._filtro is not None and agora - self._sincronizado_em < settings.REVOGACAO_SINCRONIZACAO:
+                return
+
+            if self._filtro is None or agora - self._reconstruido_em >= settings.REVOGACAO_RECONSTRUCAO:
+                self._reconstroi()
+                self._reconstruido_em = agora
+            else:
+                self._sincroniza()
+            self._sincronizado_em = agora
+
+    '''
+        Monta um novo filtro com todos os JTIs revogados e ainda não expirados
+    '''
+    def _reconstroi(self):
+        lido_ate = timezone.now()
+        filtro = FiltroBloom(settings.REVOGACAO_BLOOM_BITS)
+        for jti in TokenRevogado.objects.filter(expira_em__gt=lido_ate).values_list('jti', flat=True).iterator():
+            filtro.adiciona(jti)
+
+        self._filtro = filtro
+        self._confirmados = CacheTTL(settings.REVOGACAO_RECONSTRUCAO)
+        self._lido_ate = lido_ate
+
+    '''
+        Adiciona ao filtro as revogações gravadas desde a última leitura (inclusive por outros processos)
+    '''
+    def _sincroniza(self):
+        lido_ate = timezone.now()
+        novos = TokenRevogado.objects.filter(
+            data_hora_criacao__gte=self._lido_ate - MARGEM_SINCRONIZACAO,
+            expira_em__gt=lido_ate
+        ).values_list('jti', flat=True)
+        for jti in novos:
+            self._adiciona(jti)
+        self._lido_ate = lido_ate
+
+revogacoes = Revogacoes()
+
+'''
+    Verifica se o token (refresh ou access do simplejwt) foi revogado
+'''
+def token_revogado(token):
+    jti = token.get(api_settings.JTI_CLAIM)
+    return jti is not None and revogacoes.revogado(jti)
+
+'''
+    Revoga o token (refresh ou access do simplejwt) até a sua expiração
+'''
+def revoga_token(token):
+    revogacoes.revoga(token[api_settings.JTI_CLAIM], datetime_from_epoch(token['exp']))
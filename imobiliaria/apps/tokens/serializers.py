@@ -0,0 +1,31 @@
+from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revogacao import token_revogado
+
+'''
+    Serializer do refresh que recusa os refresh tokens revogados
+'''
+class TokenRefreshRevogavelSerializer(TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        if token_revogado(self.token_class(attrs['refresh'])):
+            raise InvalidToken('O token foi revogado.')
+        return super().validate(attrs)
+
+'''
+    Serializer responsável por validar o refresh token a ser revogado
+'''
+class RevogacaoSerializer(serializers.Serializer):
+
+    refresh = serializers.CharField(required=True, error_messages={
+        'required': 'Por favor, forneça o refresh token que deseja revogar.',
+        'blank': 'O refresh token não pode estar em branco.'
+    })
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError:
+            raise serializers.ValidationError("O refresh token é inválido ou expirou.")
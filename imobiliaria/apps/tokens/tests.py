@@ -0,0 +1,108 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import TokenRevogado
+from .revogacao import FiltroBloom, revogacoes
+
+
+class TokenRevogacaoTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        
+        # Descarta o estado em memória de outros testes
+        revogacoes.limpa()
+        
+        # Configuração do JWT
+        self.user = User.objects.create_user(username='user_teste', password='teste@123')
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access_token = self.refresh.access_token
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(self.access_token))
+
+    '''
+        Teste que verifica a revogação do refresh token e do access token usado na requisição
+    '''
+    def test_revoga_token(self):
+        
+        # Antes da revogação o refresh funciona
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        response = self.client.post(reverse('token_revogar'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(TokenRevogado.objects.count(), 2)
+        
+        # Refresh token revogado
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        # Access token revogado
+        response = self.client.get(reverse('imovel-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        # Um novo login continua funcionando
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        response = self.client.get(reverse('imovel-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+    '''
+        Teste que verifica a validação do refresh token a ser revogado
+    '''
+    def test_revoga_token_invalido(self):
+        
+        response = self.client.post(reverse('token_revogar'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(reverse('token_revogar'), {'refresh': 'abc'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    '''
+        Teste que verifica que um token não revogado é aceito sem consultar as revogações no banco
+    '''
+    def test_verificacao_sem_consulta(self):
+        
+        url = reverse('imovel-list')
+        
+        # A primeira requisição monta o filtro (e verifica o usuário)
+        self.client.get(url)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries.captured_queries if 'token_revogado' in query['sql']])
+        
+    '''
+        Teste que verifica que revogações gravadas por outro processo são aplicadas na sincronização
+    '''
+    def test_sincronizacao_revogacoes(self):
+        
+        url = reverse('imovel-list')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        
+        # Revogação gravada diretamente no banco, como por outro processo
+        TokenRevogado.objects.create(jti=self.access_token['jti'], expira_em=timezone.now() + timedelta(hours=1))
+        
+        # Antes do intervalo de sincronização o processo ainda não conhece a revogação
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        
+        with override_settings(REVOGACAO_SINCRONIZACAO=0):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    '''
+        Teste que verifica que o filtro de bloom não possui falsos negativos e poucos falsos positivos
+    '''
+    def test_filtro_bloom(self):
+        
+        filtro = FiltroBloom(2 ** 16)
+        for i in range(1000):
+            filtro.adiciona('revogado-%d' % i)
+        
+        self.assertTrue(all('revogado-%d' % i in filtro for i in range(1000)))
+        falsos_positivos = sum('valido-%d' % i in filtro for i in range(10000))
+        self.assertLess(falsos_positivos, 100)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('refresh/', views.TokenRefreshRevogavelView.as_view(), name='token_refresh'),
+    path('revogar/', views.RevogacaoView.as_view(), name='token_revogar'),
+]
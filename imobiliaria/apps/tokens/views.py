@@ -0,0 +1,37 @@
+from rest_framework import status
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenRefreshView
+from abstracts.autenticacao import JWTStatelessAuthentication
+from .serializers import TokenRefreshRevogavelSerializer, RevogacaoSerializer
+from .revogacao import revoga_token
+
+'''
+    Refresh do token, recusando os refresh tokens revogados
+'''
+class TokenRefreshRevogavelView(TokenRefreshView):
+    serializer_class = TokenRefreshRevogavelSerializer
+
+'''
+    Revogação (logout) do refresh token informado e, se a requisição estiver autenticada, do access token usado nela
+'''
+class RevogacaoView(GenericAPIView):
+
+    # Como no refresh, basta o próprio refresh token para revogá-lo
+    authentication_classes = [JWTStatelessAuthentication]
+    permission_classes = [AllowAny]
+    serializer_class = RevogacaoSerializer
+
+    def post(self, request):
+
+        # Usa o Serializer para validar a entrada
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revoga_token(serializer.validated_data['refresh'])
+
+        if request.auth is not None:
+            revoga_token(request.auth)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
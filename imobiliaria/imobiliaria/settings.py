@@ -13,8 +13,12 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import sys
 from datetime import timedelta
 
+# Carrega as variáveis de ambiente
+load_dotenv()
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,7 +55,8 @@ INSTALLED_APPS = [
     # Apps
     'apps.anuncios',
     'apps.imoveis',
-    'apps.reservas'
+    'apps.reservas',
+    'apps.tokens'
 ]
 
 # Aumentando o tempo de duração do token
@@ -60,14 +65,79 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
 }
 
+# Tempo (segundos) em que a situação do usuário (existe/ativo) fica em memória na autenticação JWT
+# (ver abstracts/autenticacao.py)
+AUTENTICACAO_CACHE_TTL = 60
+
+# Revogação de tokens (ver apps/tokens/revogacao.py): intervalo (segundos) da sincronização incremental
+# com o banco, da reconstrução completa do filtro de bloom e o tamanho do filtro em bits
+REVOGACAO_SINCRONIZACAO = 30
+REVOGACAO_RECONSTRUCAO = 3600
+REVOGACAO_BLOOM_BITS = 2 ** 20
+
+# Cache do Django (locmem por padrão, pode ser trocado por Redis/Memcached sem alterar o código)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache das respostas dos endpoints de leitura (ver abstracts/cache_respostas.py): alias do CACHES e validade em segundos
+RESPOSTAS_CACHE = 'default'
+RESPOSTAS_CACHE_TIMEOUT = 300
+
+# Atraso (segundos) dos endpoints de sincronização incremental "changes/" (ver abstracts/sincronizacao.py)
+SINCRONIZACAO_ATRASO = 5
+
+# Validade (segundos) do mapa de ocupação dos imóveis no cache (ver apps/reservas/ocupacao.py)
+OCUPACAO_CACHE_TIMEOUT = 300
+
+# Resumo materializado das reservas usado pelos relatórios (ver apps/reservas/resumo.py)
+# A migração que cria a tabela resume as reservas existentes; as gravações com o resumo desabilitado não o atualizam,
+# então ao habilitá-lo depois execute "manage.py reconstroi_resumo_reservas"
+RELATORIO_RESUMO = True
+
+# Instrumentação das requisições (ver abstracts/instrumentacao.py): janela (segundos) dos histogramas por rota
+# e envio do cabeçalho Server-Timing para todos os clientes (com False, somente para administradores)
+INSTRUMENTACAO_JANELA = 900
+INSTRUMENTACAO_SERVER_TIMING = False
+
+# Log estruturado das requisições (uma linha JSON por requisição, ver abstracts/instrumentacao.py) na saída padrão
+# Nível pelo INSTRUMENTACAO_LOG_NIVEL do .env (ex: WARNING desliga as linhas); nos testes ("manage.py test")
+# o padrão é WARNING, para não misturar as linhas das requisições com a saída dos testes
+INSTRUMENTACAO_LOG_NIVEL = os.getenv('INSTRUMENTACAO_LOG_NIVEL') or ('WARNING' if sys.argv[1:2] == ['test'] else 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'imobiliaria.instrumentacao': {
+            'handlers': ['console'],
+            'level': INSTRUMENTACAO_LOG_NIVEL,
+            'propagate': False,
+        },
+    },
+}
+
 # Configuração para utilizar o JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'abstracts.autenticacao.JWTStatelessAuthentication',
+    ),
+    
+    # Paginação por cursor (keyset) em todas as listagens
+    'DEFAULT_PAGINATION_CLASS': 'abstracts.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
 }
 
 MIDDLEWARE = [
+    # Primeiro, para medir as demais etapas da requisição (ver abstracts/instrumentacao.py)
+    'abstracts.instrumentacao.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -101,8 +171,6 @@ WSGI_APPLICATION = 'imobiliaria.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# Carrega as variáveis de ambiente
-load_dotenv()
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -16,10 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenObtainPairView
+from abstracts.views import EstatisticasCacheView, MetricasRotasView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,7 +29,13 @@ urlpatterns = [
     
     # JWT
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', include('apps.tokens.urls')),
+    
+    # Estatísticas do cache de respostas (somente administradores)
+    path('api/cache/', EstatisticasCacheView.as_view(), name='cache_estatisticas'),
+    
+    # Métricas das requisições por rota (somente administradores)
+    path('api/metricas/', MetricasRotasView.as_view(), name='metricas_rotas'),
     
     # Documentação automática
     path('', include('swagger_config')),